@@ -42,7 +42,14 @@ setup(
     #
     #   py_modules=["my_module"],
     #
-    packages=find_namespace_packages(include=['tradeframework.*'])
+    packages=find_namespace_packages(include=['tradeframework.*']),
+
+    # Console script for batch runs, see tradeframework/api/insights/batch.py
+    entry_points={
+        'console_scripts': [
+            'tradeframework-insights=tradeframework.api.insights.batch:main',
+        ],
+    },
 
 
 )
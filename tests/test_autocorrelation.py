@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from statsmodels.stats.diagnostic import acorr_ljungbox
+
+from tradeframework.operations.autocorrelation import Correlogram
+from tradeframework.operations.diagnostics import batchLjungBox, rollingLjungBox
+
+rng = np.random.default_rng(3)
+SERIES = rng.standard_t(5, 1000) * 0.01
+
+
+@pytest.mark.parametrize("model_df", [0, 2, 5])
+def test_ljungBox_matches_statsmodels(model_df):
+    lags = [1, 2, 3, 5, 10, 20]
+    expected = acorr_ljungbox(SERIES, lags=lags, boxpierce=True, model_df=model_df)
+    result = Correlogram(SERIES, nlags=20).ljungBox(
+        lags=lags, boxpierce=True, model_df=model_df
+    )
+    for actual, column in zip(result, ["lb_stat", "lb_pvalue", "bp_stat", "bp_pvalue"]):
+        np.testing.assert_allclose(actual, expected[column].values, rtol=1e-8)
+
+
+def test_no_degrees_of_freedom_is_nan():
+    _, pvalue = Correlogram(SERIES, nlags=5).ljungBox(lags=[1, 2, 3], model_df=2)
+    assert np.isnan(pvalue[:2]).all() and not np.isnan(pvalue[2])
+
+    _, pvalue = batchLjungBox(SERIES[:, None], lags=2, model_df=2)
+    assert np.isnan(pvalue).all()
+
+    statistic, pvalue = rollingLjungBox(SERIES, lags=2, window=100, model_df=3)
+    assert not np.isnan(statistic[-1]) and np.isnan(pvalue).all()
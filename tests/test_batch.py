@@ -0,0 +1,143 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights.batch import _checkpoint, _shards, runBatch
+
+DERIVATIVE = {"name": "Strategy", "path": "snapshots/strategy.pkl"}
+GENERATOR = {"class": "PerfSummary", "opts": {"window": 20}}
+
+
+def test_checkpoint_keyed_by_spec():
+    path = _checkpoint("out", DERIVATIVE, GENERATOR)
+    assert path == _checkpoint("out", dict(DERIVATIVE), dict(GENERATOR))
+    assert path != _checkpoint("out", DERIVATIVE, {**GENERATOR, "opts": {"window": 60}})
+    assert path != _checkpoint("out", DERIVATIVE, {**GENERATOR, "module": "custom"})
+    assert path != _checkpoint("out", {**DERIVATIVE, "path": "other.pkl"}, GENERATOR)
+
+
+def test_checkpoint_names_sanitized():
+    path = _checkpoint(
+        "out", {"name": "a/b:c", "path": "x.pkl"}, {"class": "X", "name": "d/e"}
+    )
+    assert os.path.dirname(path) == os.path.join("out", "checkpoints")
+    assert os.path.basename(path).startswith("a_b_c__d_e__")
+
+
+def test_edited_spec_is_rerun(tmp_path):
+    spec = {"derivatives": [DERIVATIVE], "generators": [GENERATOR]}
+    os.makedirs(tmp_path / "checkpoints")
+    open(_checkpoint(str(tmp_path), DERIVATIVE, GENERATOR), "wb").close()
+    assert _shards(spec, str(tmp_path), 1) == []
+
+    edited = {**GENERATOR, "opts": {"window": 60}}
+    spec["generators"] = [edited]
+    assert _shards(spec, str(tmp_path), 1) == [(DERIVATIVE, [edited])]
+
+
+def test_duplicate_generator_names_rejected(tmp_path):
+    spec = {"derivatives": [DERIVATIVE], "generators": [GENERATOR, dict(GENERATOR)]}
+    with pytest.raises(Exception, match="Duplicate generator names"):
+        runBatch(spec, output=str(tmp_path))
+
+
+class Snapshot:
+    def __init__(self, name, returns):
+        self.name = name
+        self.returns = returns
+
+    def getName(self):
+        return self.name
+
+
+class Total(InsightGenerator):
+    inputs = ("returns",)
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("scale", 1)
+
+    def getInsight(self, derivative, display=True):
+        # Record every run, so the test can tell which pairs were resumed
+        with open(self.opts["log"], "a") as f:
+            f.write(f"{derivative.getName()} {self.getName()}\n")
+        if self.opts["scale"] is None:
+            raise Exception("No scale")
+        return {"total": derivative.returns.sum() * self.opts["scale"]}
+
+
+def _snapshot(path, name, seed):
+    returns = pd.Series(np.random.default_rng(seed).normal(size=100))
+    with open(path, "wb") as f:
+        pickle.dump(Snapshot(name, returns), f)
+    return returns.sum()
+
+
+def _runs(log):
+    with open(log) as f:
+        return sorted(f.read().split("\n")[:-1])
+
+
+def _totals(output):
+    scalars = pd.read_parquet(os.path.join(output, "scalars.parquet"))
+    return {(row.derivative, row.generator): row.value for row in scalars.itertuples()}
+
+
+def test_run_resume_and_refresh(tmp_path):
+    log, output = str(tmp_path / "runs.log"), str(tmp_path / "out")
+    totals = {
+        name: _snapshot(tmp_path / f"{name}.pkl", name, seed)
+        for seed, name in enumerate(["a", "b"])
+    }
+    generators = [
+        {
+            "class": "Total",
+            "module": __name__,
+            "name": f"x{scale}",
+            "opts": {"scale": scale, "log": log},
+        }
+        for scale in (1, 2, 3)
+    ]
+    spec = {
+        "derivatives": [str(tmp_path / "a.pkl"), {"path": str(tmp_path / "b.pkl")}],
+        "generators": generators,
+    }
+
+    # Two derivatives and four workers: each derivative's generators are split in two
+    shards = _shards(spec, output, 4)
+    assert len(shards) == 4
+    assert sorted(len(g) for _, g in shards) == [1, 1, 2, 2]
+
+    assert runBatch(spec, output=output, workers=4) == {}
+    expected = {
+        (name, f"x{scale}"): total * scale
+        for name, total in totals.items()
+        for scale in (1, 2, 3)
+    }
+    assert _totals(output) == pytest.approx(expected)
+    assert len(_runs(log)) == 6
+
+    # Resumed: nothing is rerun
+    assert runBatch(spec, output=output, workers=4) == {}
+    assert len(_runs(log)) == 6
+
+    # A refreshed snapshot reruns its pairs only
+    os.remove(log)
+    totals["b"] = _snapshot(tmp_path / "b.pkl", "b", 10)
+    assert runBatch(spec, output=output, workers=4) == {}
+    assert _runs(log) == ["b x1", "b x2", "b x3"]
+    expected.update({("b", f"x{scale}"): totals["b"] * scale for scale in (1, 2, 3)})
+    assert _totals(output) == pytest.approx(expected)
+
+    # Failures are reported per pair and not checkpointed
+    failing = {**generators[0], "name": "bad", "opts": {"scale": None, "log": log}}
+    spec["generators"] = generators + [failing]
+    errors = runBatch(spec, output=output, workers=2)
+    assert set(errors) == {("a", "bad"), ("b", "bad")}
+    assert "No scale" in errors[("a", "bad")]
+    assert len(_totals(output)) == 6
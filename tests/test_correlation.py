@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations.correlation import (
+    blockCorrelation,
+    clusterLabels,
+    clusterOrder,
+    correlatedPairs,
+    correlation,
+    selectPairs,
+)
+
+rng = np.random.default_rng(0)
+FACTORS = rng.normal(size=(250, 8))
+DATA = FACTORS[:, rng.integers(0, 8, 300)] + rng.normal(size=(250, 300)) * 0.8
+DATA[rng.random(DATA.shape) < 0.02] = np.nan
+
+
+def test_correlation_matches_pandas():
+    expected = pd.DataFrame(DATA).corr().values
+    np.testing.assert_allclose(correlation(DATA, blockSize=32), expected, atol=1e-12)
+
+
+@pytest.fixture(scope="module")
+def dense():
+    corr = correlation(DATA, blockSize=32)
+    a, b = np.triu_indices(DATA.shape[1], k=1)
+    return pd.DataFrame({"a": a, "b": b, "correlation": corr[a, b]})
+
+
+def _pairs(edges):
+    return set(zip(edges["a"], edges["b"]))
+
+
+def test_threshold_pairs(dense):
+    edges = correlatedPairs(DATA, threshold=0.5, blockSize=32)
+    expected = dense[dense["correlation"].abs() >= 0.5]
+    assert _pairs(edges) == _pairs(expected)
+    assert (np.diff(edges["correlation"].abs()) <= 0).all()
+
+
+@pytest.mark.parametrize("threshold", [None, 0.4])
+def test_top_partners(dense, threshold):
+    topK = 3
+    edges = correlatedPairs(DATA, threshold=threshold, topK=topK, blockSize=32)
+    candidates = dense[dense["correlation"].abs() >= (threshold or 0)]
+    both = pd.concat(
+        [
+            candidates.assign(node=candidates["a"]),
+            candidates.assign(node=candidates["b"]),
+        ]
+    )
+    both["strength"] = both["correlation"].abs()
+    top = both.sort_values("strength", ascending=False).groupby("node").head(topK)
+    assert _pairs(edges) == _pairs(top)
+
+
+def test_focus(dense):
+    edges = correlatedPairs(DATA, threshold=0.3, focus=[0, 7], blockSize=32)
+    involved = dense[dense["a"].isin([0, 7]) | dense["b"].isin([0, 7])]
+    assert _pairs(edges) == _pairs(involved[involved["correlation"].abs() >= 0.3])
+
+
+@pytest.mark.parametrize("threshold, topK", [(0.5, None), (None, 3), (0.4, 3)])
+def test_select_pairs_matches_search(threshold, topK):
+    # Pairs picked from a computed matrix (as annotated by correlationPlot) are the ones
+    # the sparse search keeps
+    selected = selectPairs(correlation(DATA, blockSize=32), threshold, topK)
+    edges = correlatedPairs(DATA, threshold=threshold, topK=topK, blockSize=32)
+    assert _pairs(selected) == _pairs(edges)
+    assert (np.diff(selected["correlation"].abs()) <= 0).all()
+
+
+def _clustered(noise=0.5):
+    rng = np.random.default_rng(1)
+    groups = rng.permutation(np.repeat(np.arange(6), 10))
+    data = rng.normal(size=(500, 6))[:, groups] + noise * rng.normal(size=(500, 60))
+    return pd.DataFrame(data).corr(), groups
+
+
+def test_cluster_labels_recover_groups():
+    corr, groups = _clustered()
+    labels = clusterLabels(corr, 6)
+    # Same partition as the planted groups, whatever the numbering
+    assert len(set(zip(labels, groups))) == len(set(labels)) == 6
+
+    order = clusterOrder(corr)
+    assert sorted(order) == list(range(60))
+    # Each group occupies a contiguous run of the order
+    assert (np.diff(groups[order]) != 0).sum() == 5
+
+
+def test_block_correlation_matches_loop():
+    corr, groups = _clustered(noise=2)
+    labels = clusterLabels(corr, 8)
+    labels[0] = labels.max() + 1  # a single asset cluster
+    blocks = blockCorrelation(corr, labels)
+
+    values = corr.values
+    clusters = np.unique(labels)
+    assert len(blocks) == len(clusters)
+    for i, a in enumerate(clusters):
+        for j, b in enumerate(clusters):
+            pairs = [
+                values[x, y]
+                for x in np.flatnonzero(labels == a)
+                for y in np.flatnonzero(labels == b)
+                if x != y
+            ]
+            expected = np.mean(pairs) if pairs else 1.0
+            np.testing.assert_allclose(blocks.iloc[i, j], expected, atol=1e-12)
+    assert blocks.index[0] == f"C{clusters[0]} ({(labels == clusters[0]).sum()})"
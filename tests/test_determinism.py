@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from tradeframework.api.insights import InsightGenerator, InsightManager
+
+
+class Derivative:
+    def __init__(self, name, returns):
+        self.name = name
+        self.returns = returns
+
+    def getName(self):
+        return self.name
+
+
+def _derivatives(count=8):
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", periods=500, freq="D")
+    return [
+        Derivative(f"d{i}", pd.Series(rng.normal(0, 0.01, 500), index=index))
+        for i in range(count)
+    ]
+
+
+class RollingMean(InsightGenerator):
+    inputs = ("returns",)
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("window", 20)
+
+    def getInsight(self, derivative, display=True):
+        return derivative.returns.rolling(self.opts["window"]).mean()
+
+
+def _compare(value, other):
+    if isinstance(value, dict):
+        assert value.keys() == other.keys()
+        for key in value:
+            _compare(value[key], other[key])
+    elif isinstance(value, (list, tuple)):
+        assert len(value) == len(other)
+        for v, o in zip(value, other):
+            _compare(v, o)
+    elif isinstance(value, pd.DataFrame):
+        pdt.assert_frame_equal(value, other)
+    elif isinstance(value, pd.Series):
+        pdt.assert_series_equal(value, other)
+    elif isinstance(value, np.ndarray):
+        np.testing.assert_array_equal(value, other)
+    else:
+        assert value == other or (pd.isna(value) and pd.isna(other))
+
+
+def _runTwice(generator, derivatives, run):
+    sequential = [run(generator, d) for d in derivatives]
+    again = [run(generator, d) for d in derivatives]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = list(pool.map(lambda d: run(generator, d), derivatives))
+    for results in (again, threaded):
+        for first, second in zip(sequential, results):
+            _compare(first, second)
+
+
+def test_opts_frozen():
+    generator = RollingMean("mean", {})
+    assert generator.opts["window"] == 20
+    with pytest.raises(TypeError):
+        generator.opts["window"] = 60
+    with pytest.raises(TypeError):
+        generator.opts |= {"window": 60}
+
+
+def test_opts_frozen_deeply():
+    opts = {"sm_opts": {"lags": [1, 5]}, "edges": np.linspace(0, 1, 5)}
+    generator = RollingMean("mean", opts)
+    with pytest.raises(TypeError):
+        generator.opts["sm_opts"]["lags"] = 10
+    assert generator.opts["sm_opts"]["lags"] == (1, 5)
+    with pytest.raises(ValueError):
+        generator.opts["edges"][0] = 1
+    # The caller's opts are left as given
+    assert opts["edges"].flags.writeable
+    assert opts["sm_opts"] == {"lags": [1, 5]}
+
+
+def test_generator_deterministic():
+    def run(generator, derivative):
+        return {"mean": generator.getInsight(derivative, display=False)}
+
+    _runTwice(RollingMean("mean", {"window": 30}), _derivatives(), run)
+
+
+def test_manager_deterministic():
+    generator = RollingMean("mean", {})
+
+    def run(generator, derivative):
+        manager = InsightManager(derivative)
+        manager.addInsightGenerator(generator)
+        return manager.generateInsights(display=False)
+
+    _runTwice(generator, _derivatives(), run)
+
+
+def _generators(insights, derivatives):
+    panel = pd.concat({d.getName(): d.returns for d in derivatives}, axis=1)
+    return [
+        insights.StationarityTest("adf", {}),
+        insights.AutoCorrelationPlot("acf", {"lags": 10}),
+        insights.MACFPlot("macf", {"window": 20}),
+        insights.ConfusionMatrix("confusion", {"baseline": derivatives[0]}),
+        insights.Drawdowns("drawdowns", {"returns": panel}),
+    ]
+
+
+@pytest.mark.parametrize(
+    "index", range(5), ids=["adf", "acf", "macf", "confusion", "drawdowns"]
+)
+def test_insights_deterministic(index):
+    insights = pytest.importorskip("tradeframework.insights")
+    derivatives = _derivatives()
+    generator = _generators(insights, derivatives)[index]
+
+    def run(generator, derivative):
+        return generator.getInsight(derivative, display=False)
+
+    _runTwice(generator, derivatives, run)
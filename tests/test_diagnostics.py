@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from scipy import stats as scipy_stats
+from scipy.stats import jarque_bera
+from statsmodels.stats.diagnostic import acorr_ljungbox
+from statsmodels.tsa.stattools import adfuller
+
+from tradeframework.operations.diagnostics import (
+    batchADF,
+    batchJarqueBera,
+    batchLjungBox,
+    rollingADF,
+    rollingLjungBox,
+)
+
+rng = np.random.default_rng(5)
+N = 600
+RETURNS = rng.standard_t(5, N) * 0.01 + 0.2 * np.r_[0, rng.normal(0, 0.01, N - 1)]
+PRICES = np.cumsum(RETURNS) + 0.002 * np.arange(N)
+BARS = [99, 250, 400, N - 1]
+
+
+def _rows(t, window, expanding):
+    return slice(0 if expanding else t + 1 - window, t + 1)
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+@pytest.mark.parametrize("model_df", [0, 2])
+def test_rolling_ljung_box_matches_statsmodels(expanding, model_df):
+    lags, window = 10, 100
+    statistic, pvalue = rollingLjungBox(
+        RETURNS, lags=lags, window=window, expanding=expanding, model_df=model_df
+    )
+    assert np.isnan(statistic[: window - 1]).all()
+    for t in BARS:
+        expected = acorr_ljungbox(
+            RETURNS[_rows(t, window, expanding)], lags=[lags], model_df=model_df
+        )
+        np.testing.assert_allclose(statistic[t], expected["lb_stat"].iloc[0], rtol=1e-8)
+        np.testing.assert_allclose(pvalue[t], expected["lb_pvalue"].iloc[0], rtol=1e-8)
+
+
+# adfuller's tuple result is deprecated in newer statsmodels
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+@pytest.mark.parametrize("expanding", [False, True])
+@pytest.mark.parametrize("maxlag", [0, 1, 3])
+def test_rolling_adf_matches_statsmodels(expanding, maxlag):
+    window = 100
+    statistic, pvalue, nobs = rollingADF(
+        PRICES, maxlag=maxlag, window=window, expanding=expanding, workers=2
+    )
+    assert np.isnan(statistic[: window - 1]).all()
+    for t in BARS:
+        expected = adfuller(
+            PRICES[_rows(t, window, expanding)], maxlag=maxlag, autolag=None
+        )
+        np.testing.assert_allclose(statistic[t], expected[0], rtol=1e-7)
+        # p-values are interpolated from a grid of MacKinnon p-values
+        np.testing.assert_allclose(pvalue[t], expected[1], atol=1e-4)
+        assert nobs[t] == expected[3]
+
+
+def test_rolling_adf_chunks():
+    whole = rollingADF(PRICES, window=100, chunkSize=10000)
+    chunked = rollingADF(PRICES, window=100, chunkSize=7, workers=3)
+    for a, b in zip(whole, chunked):
+        np.testing.assert_array_equal(a, b)
+
+
+def _panel():
+    # Random walks and noise of different lengths, with gaps
+    n = 400
+    panel = np.column_stack(
+        [np.cumsum(rng.normal(size=n)) for _ in range(3)]
+        + [rng.standard_t(4, n) for _ in range(3)]
+        + [0.5 * np.r_[0, RETURNS[: n - 1]] + rng.normal(size=n)]
+    )
+    panel[rng.random(panel.shape) < 0.05] = np.nan
+    panel[:150, 1] = np.nan
+    panel[300:, 4] = np.nan
+    return panel
+
+
+def _columns(panel):
+    return [column[~np.isnan(column)] for column in panel.T]
+
+
+def test_batch_jarque_bera_matches_scipy():
+    panel = _panel()
+    statistic, pvalue, skew, kurtosis = batchJarqueBera(panel)
+    for j, column in enumerate(_columns(panel)):
+        expected = jarque_bera(column)
+        np.testing.assert_allclose(statistic[j], expected.statistic, rtol=1e-9)
+        np.testing.assert_allclose(pvalue[j], expected.pvalue, rtol=1e-7, atol=1e-300)
+        np.testing.assert_allclose(skew[j], scipy_stats.skew(column), rtol=1e-9)
+        np.testing.assert_allclose(
+            kurtosis[j], scipy_stats.kurtosis(column, fisher=False), rtol=1e-9
+        )
+
+
+@pytest.mark.parametrize("lags, model_df", [(10, 0), (20, 2)])
+def test_batch_ljung_box_matches_statsmodels(lags, model_df):
+    panel = _panel()
+    statistic, pvalue = batchLjungBox(panel, lags=lags, model_df=model_df)
+    for j, column in enumerate(_columns(panel)):
+        expected = acorr_ljungbox(column, lags=[lags], model_df=model_df)
+        np.testing.assert_allclose(statistic[j], expected["lb_stat"].iloc[0], rtol=1e-8)
+        np.testing.assert_allclose(pvalue[j], expected["lb_pvalue"].iloc[0], rtol=1e-8)
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+@pytest.mark.parametrize("maxlag", [0, 1, 4])
+def test_batch_adf_matches_statsmodels(maxlag):
+    panel = _panel()
+    statistic, pvalue, nobs = batchADF(panel, maxlag=maxlag, workers=2, chunkSize=3)
+    for j, column in enumerate(_columns(panel)):
+        expected = adfuller(column, maxlag=maxlag, autolag=None)
+        np.testing.assert_allclose(statistic[j], expected[0], rtol=1e-7)
+        np.testing.assert_allclose(pvalue[j], expected[1], atol=1e-4)
+        assert nobs[j] == expected[3]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import (
+    confusion_matrix,
+    mean_absolute_error,
+    mean_squared_error,
+    precision_score,
+    r2_score,
+    recall_score,
+)
+
+from tradeframework.operations.evaluation import (
+    classify,
+    rollingClassificationMetrics,
+    rollingRegressionMetrics,
+)
+
+rng = np.random.default_rng(3)
+N = 300
+INDEX = pd.date_range("2020-01-01", periods=N, freq="D")
+ACTUAL = pd.Series(rng.normal(0, 0.01, N), index=INDEX)
+PREDICTIONS = pd.Series(
+    0.3 * ACTUAL.values + rng.normal(0, 0.01, N), index=INDEX
+).round(3)
+ACTUAL.iloc[::25] = 0
+
+
+def _rows(t, window, expanding):
+    return slice(0 if expanding else max(t + 1 - window, 0), t + 1)
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+def test_regression_metrics_match_windows(expanding):
+    window, ddof = 40, 1
+    result = rollingRegressionMetrics(
+        ACTUAL, PREDICTIONS, window=window, expanding=expanding, ddof=ddof
+    )
+    assert result.iloc[: window - 1].isna().all().all()
+
+    a, p = ACTUAL.values, PREDICTIONS.values
+    for t in range(window - 1, N):
+        rows = _rows(t, window, expanding)
+        e = a[rows] - p[rows]
+        # Direction needs the previous actual, which may precede the window
+        bars = np.arange(N)[rows]
+        bars = bars[bars > 0]
+        direction = np.sign(a[bars] - a[bars - 1]) == np.sign(p[bars] - a[bars - 1])
+        expected = [
+            e.mean(),
+            mean_absolute_error(a[rows], p[rows]),
+            mean_squared_error(a[rows], p[rows]),
+            np.std(e, ddof=ddof),
+            r2_score(a[rows], p[rows]),
+            direction.mean(),
+            np.mean(np.sign(a[rows]) == np.sign(p[rows])),
+        ]
+        np.testing.assert_allclose(
+            result.iloc[t][["mfe", "mae", "mse", "rse", "r2", "mda", "msa"]],
+            expected,
+            rtol=1e-7,
+            atol=1e-12,
+        )
+
+
+@pytest.mark.parametrize("noHold", [False, True])
+@pytest.mark.parametrize("expanding", [False, True])
+def test_classification_metrics_match_windows(noHold, expanding):
+    window = 40
+    result = rollingClassificationMetrics(
+        ACTUAL, PREDICTIONS, window=window, expanding=expanding, noHold=noHold
+    )
+    actual, predictions, labels = classify(ACTUAL, PREDICTIONS, True, noHold)
+    assert result.index.equals(actual.index)
+    assert result.iloc[: window - 1].isna().all().all()
+
+    for t in range(window - 1, len(actual), 3):
+        rows = _rows(t, window, expanding)
+        a, p = actual.values[rows], predictions.values[rows]
+        accuracy = np.trace(confusion_matrix(a, p, labels=labels)) / len(a)
+        expected = {"accuracy": accuracy, "ic": accuracy * 2 - 1}
+        for name, label in [("buy", 1), ("sell", -1)]:
+            for metric, score in [
+                ("precision", precision_score),
+                ("recall", recall_score),
+            ]:
+                expected[f"{metric}_{name}"] = score(
+                    a, p, labels=[label], average=None, zero_division=np.nan
+                )[0]
+        np.testing.assert_allclose(
+            result.iloc[t][list(expected)].astype(float),
+            list(expected.values()),
+            rtol=1e-12,
+        )
@@ -0,0 +1,59 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from tradeframework.api.insights import InsightResult, resultFrames
+
+
+def _isNumber(v):
+    return isinstance(v, (numbers.Number, np.number)) and not isinstance(
+        v, (bool, np.bool_)
+    )
+
+
+def _reference(table):
+    # Cell by cell flattening, row by row
+    values = table.values.ravel()
+    return (
+        [float(v) if _isNumber(v) else np.nan for v in values],
+        [None if _isNumber(v) else str(v) for v in values],
+    )
+
+
+def _result(tables):
+    return InsightResult("generator", derivative="derivative", tables=tables)
+
+
+def test_tables_flattened_row_by_row():
+    table = pd.DataFrame(
+        {
+            "float": [1.5, np.nan, -2.0],
+            "int": [1, 2, 3],
+            "flag": [True, False, True],
+            "label": ["a", "b", "c"],
+            "mixed": [1, "x", 2.5],
+            "date": pd.to_datetime(["2020-01-01", "2020-01-02", "2020-01-03"]),
+        },
+        index=["r0", "r1", "r2"],
+    )
+    frame = resultFrames([_result({"t": table})])["tables"]
+    value, text = _reference(table)
+    assert list(frame["row"]) == list(np.repeat(["r0", "r1", "r2"], table.shape[1]))
+    assert list(frame["column"]) == list(table.columns) * 3
+    np.testing.assert_array_equal(frame["value"].values, value)
+    assert [None if pd.isna(t) else t for t in frame["text"]] == text
+
+
+def test_nullable_columns_are_numbers():
+    table = pd.DataFrame({"n": pd.array([1, None, 3], dtype="Int64")})
+    frame = resultFrames([_result({"t": table})])["tables"]
+    np.testing.assert_array_equal(frame["value"].values, [1, np.nan, 3])
+    assert frame["text"].isna().all()
+
+
+def test_large_numeric_table():
+    table = pd.DataFrame(np.random.default_rng(0).normal(size=(200000, 10)))
+    frame = resultFrames([_result({"t": table})])["tables"]
+    np.testing.assert_array_equal(frame["value"].values, table.values.ravel())
+    assert frame["text"].isna().all()
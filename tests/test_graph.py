@@ -0,0 +1,86 @@
+import threading
+import weakref
+
+import pytest
+
+from tradeframework.api.insights.graph import (
+    Intermediate,
+    IntermediateGraph,
+    registerIntermediate,
+)
+
+_live = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+class Block:
+    def __init__(self, size):
+        self.data = bytearray(size)
+
+
+def _track(block):
+    with _lock:
+        _live.add(block)
+    return block
+
+
+@registerIntermediate("test.block")
+def _block(derivative, deps, i):
+    return _track(Block(1024))
+
+
+@registerIntermediate(
+    "test.derived",
+    requires=lambda derivative, i: {"block": Intermediate("test.block", i=i)},
+)
+def _derived(derivative, deps, i):
+    return _track(Block(len(deps["block"].data)))
+
+
+class Generator:
+    def __init__(self, name, intermediates):
+        self.name = name
+        self.intermediates = intermediates
+
+    def requires(self):
+        return self.intermediates
+
+
+def _liveCounts(generators, lookahead):
+    counts = []
+    outputs = []
+
+    def consume(generator, intermediates):
+        counts.append(len(_live))
+        outputs.append((generator.name, sorted(intermediates)))
+
+    IntermediateGraph(None, generators, workers=4, lookahead=lookahead).run(consume)
+    return counts, outputs
+
+
+@pytest.mark.parametrize("lookahead", [0, 1, 3])
+def test_live_intermediates_bounded_by_lookahead(lookahead):
+    generators = [
+        Generator(f"g{i}", {"derived": Intermediate("test.derived", i=i)})
+        for i in range(20)
+    ]
+    counts, outputs = _liveCounts(generators, lookahead)
+    assert [name for name, _ in outputs] == [f"g{i}" for i in range(20)]
+    # The running generator's intermediate and at most lookahead others; a block is
+    # freed as soon as its derived intermediate is computed
+    assert max(counts) <= lookahead + 1
+    assert len(_live) == 0
+
+
+def test_shared_intermediate_freed_after_last_consumer():
+    shared = Intermediate("test.block", i="shared")
+    generators = [Generator("a", {"x": shared})]
+    generators += [
+        Generator(f"g{i}", {"derived": Intermediate("test.derived", i=i)})
+        for i in range(5)
+    ]
+    generators.append(Generator("b", {"x": shared}))
+    counts, _ = _liveCounts(generators, 1)
+    # The shared block stays alive until its last consumer, next to at most two others
+    assert max(counts) <= 3
+    assert len(_live) == 0
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.api.insights import InsightGenerator, InsightManager
+from tradeframework.api.insights.insights import INPUTS
+
+
+def _series(n, start="2020-01-01"):
+    index = pd.date_range(start, periods=n, freq="D")
+    return pd.Series(np.random.default_rng(n).normal(size=n), index=index)
+
+
+class Asset:
+    def __init__(self, name, returns):
+        self.name = name
+        self.returns = returns
+        self.values = returns.to_frame("Close")
+
+    def getName(self):
+        return self.name
+
+
+class Store:
+    def __init__(self, assets):
+        self.store = {asset.getName(): asset for asset in assets}
+
+
+class Env:
+    def __init__(self, store):
+        self.store = store
+
+    def getAssetStore(self):
+        return self.store
+
+
+class Derivative(Asset):
+    def __init__(self, name, returns, store):
+        Asset.__init__(self, name, returns)
+        self.weights = None
+        self.env = Env(store)
+
+
+class Counter(InsightGenerator):
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("inputs", ("returns",))
+        self.inputs = self.opts["inputs"]
+        self.runs = 0
+
+    def getInsight(self, derivative, display=True):
+        self.runs += 1
+        return self.runs
+
+
+def _manager():
+    store = Store([Asset("a", _series(10)), Asset("b", _series(10))])
+    derivative = Derivative("d", _series(10), store)
+    returns = Counter("returns", {"inputs": ("returns",)})
+    assets = Counter("assets", {"inputs": ("assetStore",)})
+    manager = InsightManager(derivative)
+    manager.addInsightGenerator(returns).addInsightGenerator(assets)
+    return manager, derivative, store, returns, assets
+
+
+def test_live_mode_reruns_changed_inputs():
+    manager, derivative, _, returns, assets = _manager()
+    assert manager.updateInsights(display=False) == {"returns": 1, "assets": 1}
+    assert manager.updateInsights(display=False) == {"returns": 1, "assets": 1}
+
+    derivative.returns = _series(11)
+    assert manager.updateInsights(display=False) == {"returns": 2, "assets": 1}
+
+    manager.touch("assetStore")
+    assert manager.updateInsights(display=False) == {"returns": 2, "assets": 2}
+
+
+def test_new_bars_on_store_asset_detected():
+    manager, _, store, returns, assets = _manager()
+    manager.updateInsights(display=False)
+
+    # New bars on an existing asset: same store, same membership
+    asset = store.store["a"]
+    asset.returns = pd.concat([asset.returns, _series(1, start="2021-01-01")])
+    assert manager.updateInsights(display=False) == {"returns": 1, "assets": 2}
+
+    store.store["c"] = Asset("c", _series(5))
+    assert manager.updateInsights(display=False) == {"returns": 1, "assets": 3}
+    assert manager.updateInsights(display=False) == {"returns": 1, "assets": 3}
+
+
+class Reader(InsightGenerator):
+    # Reads exactly its declared inputs, so a full recompute is the reference
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("inputs", INPUTS)
+        self.opts.setdefault("baseline", None)
+        self.inputs = self.opts["inputs"]
+
+    def getInsight(self, derivative, display=True):
+        read = {
+            "returns": lambda: derivative.returns.sum(),
+            "values": lambda: derivative.values.values.sum(),
+            "weights": lambda: derivative.weights.values.sum(),
+            "baseline": lambda: self.opts["baseline"].returns.sum(),
+            "assetStore": lambda: sum(
+                asset.returns.sum() for asset in derivative.env.store.store.values()
+            ),
+        }
+        return tuple(read[name]() for name in self.inputs)
+
+
+def test_live_mode_matches_full_recompute():
+    store = Store([Asset("a", _series(10)), Asset("b", _series(12))])
+    derivative = Derivative("d", _series(10), store)
+    derivative.weights = _series(10).to_frame("a")
+    baseline = Asset("baseline", _series(10))
+    generators = [
+        Reader(name, {"inputs": inputs, "baseline": baseline})
+        for name, inputs in [
+            ("returns", ("returns",)),
+            ("values", ("values",)),
+            ("weights", ("weights",)),
+            ("baseline", ("baseline",)),
+            ("assetStore", ("assetStore",)),
+            ("all", INPUTS),
+        ]
+    ]
+    manager = InsightManager(derivative)
+    for generator in generators:
+        manager.addInsightGenerator(generator)
+
+    def step(mutate, touched=()):
+        before = manager.updateInsights(display=False)
+        mutate()
+        if touched:
+            manager.touch(*touched)
+        after = manager.updateInsights(display=False)
+        assert after == manager.generateInsights(display=False)
+        return {name for name in after if after[name] != before[name]}
+
+    def append():
+        derivative.returns = pd.concat([derivative.returns, _series(1, "2021-01-01")])
+
+    def newWeights():
+        derivative.weights = derivative.weights * 2
+
+    def inPlace():
+        baseline.returns.iloc[-1] += 1
+
+    assert step(append) == {"returns", "all"}
+    assert step(newWeights) == {"weights", "all"}
+    # In-place edits keep the fingerprint, so they need a touch
+    assert step(inPlace, ("baseline",)) == {"baseline", "all"}
+    assert step(lambda: None) == set()
+
+
+def test_touch_unknown_input():
+    manager = _manager()[0]
+    with pytest.raises(Exception, match="Unknown input"):
+        manager.touch("prices")
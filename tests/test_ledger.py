@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from tradeframework.operations.ledger import (
+    allocationChanges,
+    tradeLedger,
+    tradeSummary,
+)
+
+INDEX = pd.date_range("2020-01-01", periods=12, freq="D")
+# Long, flip straight to short, flat, scaled long; short from the first bar, flat, then
+# long to the end (open); NaN weights as flat
+WEIGHTS = pd.DataFrame(
+    {
+        "a": [0, 1, 1, -1, -1, -2, 0, 0, 0.5, 1, 0, 0],
+        "b": [-1, -1, 0, np.nan, 0, 2, 2, 1, 1, 1, 1, 3],
+        "c": [0.0] * 12,
+    },
+    index=INDEX,
+)
+rng = np.random.default_rng(0)
+CLOSES = pd.DataFrame(
+    100 * np.exp(np.cumsum(rng.normal(0, 0.01, (12, 3)), axis=0)),
+    index=INDEX,
+    columns=WEIGHTS.columns,
+)
+OPENS = CLOSES.shift(1).fillna(100) * (1 + rng.normal(0, 0.002, (12, 3)))
+
+
+def _referenceTrades(weights, opens, closes):
+    # Per-trade loop: walk every asset bar by bar, closing the trade when the direction
+    # changes
+    rows = []
+    for asset in weights.columns:
+        w = weights[asset].fillna(0).values
+        o, c = opens[asset].values, closes[asset].values
+        trade = None
+        for t in range(len(w)):
+            direction = int(np.sign(w[t]))
+            if trade is not None and direction != trade["direction"]:
+                rows.append(trade)
+                trade = None
+            if direction == 0:
+                continue
+            if trade is None:
+                trade = {
+                    "asset": asset,
+                    "direction": direction,
+                    "entry": weights.index[t],
+                    "positions": [],
+                    "entryPrice": o[t],
+                    "pnl": 0.0,
+                    "return": 0.0,
+                }
+            trade["positions"].append(w[t])
+            trade["exit"] = weights.index[t]
+            trade["exitPrice"] = c[t]
+            trade["pnl"] += w[t] * (c[t] - o[t])
+            trade["return"] += w[t] * (c[t] / o[t] - 1)
+            trade["open"] = t == len(w) - 1
+        if trade is not None:
+            rows.append(trade)
+    for trade in rows:
+        positions = trade.pop("positions")
+        trade["bars"] = len(positions)
+        trade["position"] = np.mean(positions)
+        trade["maxPosition"] = np.max(np.abs(positions))
+    return pd.DataFrame(rows)
+
+
+def test_ledger_matches_trade_loop():
+    trades = tradeLedger(WEIGHTS, OPENS, CLOSES)
+    expected = _referenceTrades(WEIGHTS, OPENS, CLOSES)
+    assert list(trades["direction"]) == [1, -1, 1, -1, 1]
+    pd.testing.assert_frame_equal(
+        trades[expected.columns].astype({"asset": str, "direction": int}),
+        expected,
+        check_dtype=False,
+    )
+    # The flip from long to short closes one trade and opens the next on the next bar
+    flip = trades[trades["asset"] == "a"].iloc[:2]
+    assert list(flip["direction"]) == [1, -1]
+    assert flip["exit"].iloc[0] + pd.Timedelta("1D") == flip["entry"].iloc[1]
+    # Only the trade still held at the last bar is open
+    assert trades["open"].tolist() == [False, False, False, False, True]
+
+
+def test_allocation_changes():
+    changes = allocationChanges(WEIGHTS)
+    expected = []
+    for t, bar in enumerate(INDEX):
+        for asset in WEIGHTS.columns:
+            w = WEIGHTS[asset].fillna(0).values
+            previous = w[t - 1] if t else 0
+            if w[t] != previous:
+                expected.append((bar, asset, previous, w[t], w[t] - previous))
+    assert [tuple(row) for row in changes.astype({"asset": str}).values] == expected
+
+
+def test_trade_summary():
+    trades = tradeLedger(WEIGHTS, OPENS, CLOSES)
+    summary = tradeSummary(trades)
+    assert list(summary.index) == ["a", "b", "c"]
+    assert list(summary["trades"]) == [3, 2, 0]
+    a = trades[trades["asset"] == "a"]
+    assert summary.loc["a", "pnl"] == a["pnl"].sum()
+    assert summary.loc["a", "winRate"] == (a["pnl"] > 0).mean()
+    assert summary.loc["b", "meanBars"] == trades[trades["asset"] == "b"]["bars"].mean()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations.correlation import selectPairs
+
+plotter = pytest.importorskip("tradeframework.operations.plot")
+
+
+def test_heatmap_labels_actual_lags():
+    lags = [1, 5, 20]
+    index = pd.date_range("2020-01-01", periods=50, freq="D")
+    surface = pd.DataFrame(np.random.default_rng(0).uniform(-1, 1, (3, 50)), index=lags)
+    surface.columns = index
+    ax = plotter.heatmapPlot(surface, y_axis="lag").axes[0]
+    assert [label.get_text() for label in ax.get_yticklabels()] == ["1", "5", "20"]
+    np.testing.assert_array_equal(ax.get_yticks(), [0, 1, 2])
+    assert ax.images[0].get_extent()[2:] == [-0.5, 2.5]
+
+
+@pytest.mark.parametrize("threshold, topK", [(None, None), (None, 2), (0.3, 2)])
+def test_correlation_plot_annotates_selected_pairs(threshold, topK):
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(200, 3))[:, rng.integers(0, 3, 80)]
+    corr = pd.DataFrame(
+        np.corrcoef(data + 0.4 * rng.normal(size=(200, 80)), rowvar=False)
+    )
+    fig = plotter.correlationPlot(corr, threshold=threshold, topK=topK)
+    annotated = {
+        (int(t.get_position()[1]), int(t.get_position()[0])) for t in fig.axes[0].texts
+    }
+    pairs = selectPairs(corr, threshold if threshold or topK else 0.8, topK).iloc[:100]
+    assert annotated == set(zip(pairs["a"], pairs["b"]))
+
+
+def _referenceOHLC(frame, maxBars):
+    # Equal-count bins, reduced per bin by pandas
+    starts = np.unique(np.linspace(0, len(frame), maxBars, endpoint=False).astype(int))
+    bins = np.searchsorted(starts, np.arange(len(frame)), side="right") - 1
+    grouped = frame.groupby(bins)
+    result = pd.DataFrame(
+        {
+            "Open": grouped["Open"].first(),
+            "High": grouped["High"].max(),
+            "Low": grouped["Low"].min(),
+            "Close": grouped["Close"].last(),
+            "Volume": grouped["Volume"].sum(),
+        }
+    )
+    result.index = frame.index[starts]
+    return result
+
+
+@pytest.mark.parametrize("n, maxBars", [(1000, 7), (1000, 300), (999, 1000), (50, 49)])
+def test_aggregate_ohlc_matches_per_bin_reference(n, maxBars):
+    rng = np.random.default_rng(n)
+    index = pd.date_range("2020-01-01", periods=n, freq="min")
+    close = 100 + np.cumsum(rng.normal(size=n))
+    frame = pd.DataFrame(
+        {
+            "Open": close + rng.normal(size=n),
+            "High": close + 2,
+            "Low": close - 2,
+            "Close": close,
+            "Volume": rng.integers(0, 100, n).astype(float),
+        },
+        index=index,
+    )
+    # Missing bars, including a whole missing run
+    frame.iloc[rng.integers(0, n, n // 10)] = np.nan
+    frame.iloc[n // 2 : n // 2 + 5] = np.nan
+
+    result = plotter.aggregateOHLC(frame.values, frame.index, frame.columns, maxBars)
+    expected = frame if n <= maxBars else _referenceOHLC(frame, maxBars)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+class Series:
+    def __init__(self, name, returns, values=None):
+        self.name = name
+        self.returns = returns
+        self.values = values
+        self.assets = []
+
+
+def _referencePnl(x, derivative, log):
+    # The original per-asset pipeline
+    returns = plotter.utils.getPeriodReturns(
+        x.returns[np.prod(derivative.values, axis=1) != 1]
+    )["period"]
+    compounded = (returns + 1).resample("B").agg("prod")
+    return np.cumsum(np.log(compounded)) if log else np.cumprod(compounded)
+
+
+# The reference aligns the derivative's traded mask to the shorter custom series
+@pytest.mark.filterwarnings("ignore:Boolean Series key")
+@pytest.mark.parametrize("log", [True, False])
+@pytest.mark.parametrize("normalise", [False, True])
+def test_plot_returns_matches_per_asset_pnl(log, normalise):
+    rng = np.random.default_rng(2)
+    index = pd.date_range("2020-01-01", periods=24 * 60, freq="h")
+
+    def returns(rows):
+        return pd.DataFrame(
+            rng.normal(0, 0.002, (len(rows), 2)), index=rows, columns=["Open", "Close"]
+        )
+
+    values = pd.DataFrame(
+        rng.uniform(90, 110, (len(index), 4)),
+        index=index,
+        columns=["Open", "High", "Low", "Close"],
+    )
+    # Untraded bars
+    values.iloc[rng.integers(0, len(index), 300)] = 1
+    derivative = Series("derivative", returns(index), values)
+    derivative.assets = [Series("component", returns(index))]
+    baseline = Series("baseline", returns(index))
+    # A custom series over a shorter range than the derivative
+    custom = Series("custom", returns(index[200:900]))
+
+    fig = plotter.plotReturns(
+        derivative,
+        baseline,
+        log=log,
+        includeComponents=True,
+        normalise=normalise,
+        custom=[custom],
+    )
+    assets = derivative.assets + [derivative, baseline, custom]
+    lines = fig.axes[0].get_lines()
+    assert [line.get_label() for line in lines] == [asset.name for asset in assets]
+    for asset, line in zip(assets, lines):
+        expected = _referencePnl(asset, derivative, log)
+        if normalise:
+            expected = expected / expected.iloc[-1]
+        plotted = np.asarray(line.get_ydata(), dtype=float)
+        np.testing.assert_allclose(plotted[~np.isnan(plotted)], expected, rtol=1e-10)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations import correlation, diagnostics, rolling, tearsheet
+from tradeframework.operations.precision import CompensatedPrefix, precision
+
+rng = np.random.default_rng(1)
+RETURNS = rng.standard_t(4, 50000) * 0.01
+PANEL = rng.standard_t(4, (2000, 40)) * 0.01 + rng.standard_t(4, (2000, 1)) * 0.003
+PANEL[rng.random(PANEL.shape) < 0.05] = np.nan
+
+
+def _both(func):
+    expected = func()
+    with precision(np.float32):
+        actual = func()
+    return expected, actual
+
+
+def _close(expected, actual, **tolerance):
+    for e, a in zip(expected, actual):
+        np.testing.assert_allclose(np.asarray(a, dtype=float), e, **tolerance)
+
+
+def test_prefix_memory():
+    with precision(np.float32):
+        compensated = rolling.prefixSum(RETURNS)
+    with precision(np.float32, compensated=False):
+        plain = rolling.prefixSum(RETURNS)
+    assert isinstance(compensated, CompensatedPrefix)
+    assert compensated.hi.dtype == compensated.lo.dtype == np.float32
+    assert isinstance(plain, np.ndarray) and plain.dtype == np.float32
+    np.testing.assert_array_equal(plain, compensated.hi)
+
+
+def test_rolling_moments():
+    expected, actual = _both(lambda: tearsheet._rollingMoments(RETURNS, 250))
+    _close(expected[:1], actual[:1], atol=1e-8)
+    _close(expected[1:], actual[1:], rtol=1e-6)
+
+
+def test_rolling_performance():
+    returns = pd.Series(RETURNS[:20000])
+    expected, actual = _both(
+        lambda: tearsheet.rollingPerformance(returns, windows=(20, 250)).values
+    )
+    _close([expected], [actual], rtol=1e-3, atol=1e-4)
+
+
+def test_moving_autocorrelation():
+    expected, actual = _both(
+        lambda: rolling.movingAutocorrelation(RETURNS, [1, 2, 5], 250)
+    )
+    _close([expected], [actual], atol=1e-6)
+
+
+def test_correlation():
+    expected, actual = _both(lambda: correlation.correlation(PANEL, blockSize=16))
+    assert actual.dtype == np.float32
+    _close([expected], [actual], atol=1e-6)
+
+
+def test_rolling_ljung_box():
+    expected, actual = _both(
+        lambda: diagnostics.rollingLjungBox(RETURNS[:20000], lags=10, window=500)
+    )
+    statistic, pvalue = expected
+    _close([statistic], actual[:1], atol=1e-4)
+    _close([pvalue], actual[1:], atol=1e-5)
+
+
+def test_rolling_adf():
+    prices = np.cumsum(RETURNS[:20000])
+    expected, actual = _both(lambda: diagnostics.rollingADF(prices, window=500))
+    _close(expected[:2], actual[:2], atol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "test", [diagnostics.batchJarqueBera, diagnostics.batchLjungBox]
+)
+def test_batch_diagnostics(test):
+    expected, actual = _both(lambda: test(PANEL))
+    _close(expected, actual, rtol=1e-5, atol=1e-6)
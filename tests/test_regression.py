@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from tradeframework.operations.regression import rollingBeta, rollingRegression
+
+rng = np.random.default_rng(7)
+N = 400
+X = rng.normal(0, 0.01, (N, 2))
+Y = 0.0005 + X @ [0.8, -0.3] + rng.normal(0, 0.005, N)
+
+
+def _design(rows):
+    return sm.add_constant(X[rows], has_constant="add")
+
+
+@pytest.mark.parametrize("expanding", [False, True])
+def test_window_matches_ols(expanding):
+    window = 60
+    coef, tstat, nobs = rollingRegression(Y, X, window=window, expanding=expanding)
+    assert np.isnan(coef[: window - 1]).all()
+    for t in [window - 1, 150, N - 1]:
+        rows = slice(0 if expanding else t + 1 - window, t + 1)
+        fit = sm.OLS(Y[rows], _design(rows)).fit()
+        np.testing.assert_allclose(coef[t], fit.params, rtol=1e-8)
+        np.testing.assert_allclose(tstat[t], fit.tvalues, rtol=1e-7)
+        assert nobs[t] == fit.nobs
+
+
+def test_halflife_matches_wls():
+    halflife = 40
+    coef, tstat, nobs = rollingRegression(Y, X, halflife=halflife)
+    decay = 0.5 ** (1 / halflife)
+    for t in [10, 200, N - 1]:
+        rows = slice(0, t + 1)
+        weights = decay ** np.arange(t, -1, -1)
+        fit = sm.WLS(Y[rows], _design(rows), weights=weights).fit()
+        np.testing.assert_allclose(coef[t], fit.params, rtol=1e-8)
+        np.testing.assert_allclose(tstat[t], fit.tvalues, rtol=1e-7)
+        assert nobs[t] == fit.nobs
+
+
+def test_rollingBeta_timing():
+    index = pd.date_range("2020-01-01", periods=N, freq="D")
+    baseline = pd.Series(X[:, 0], index=index)
+    returns = pd.Series(Y, index=index)
+    result = rollingBeta(returns, baseline, timing=True, window=100)
+    assert list(result.columns) == [
+        "alpha",
+        "beta",
+        "timing",
+        "alpha_t",
+        "beta_t",
+        "timing_t",
+        "nobs",
+    ]
+    rows = slice(N - 100, N)
+    design = np.column_stack([X[rows, 0], np.maximum(0, -X[rows, 0])])
+    fit = sm.OLS(Y[rows], sm.add_constant(design)).fit()
+    np.testing.assert_allclose(
+        result[["alpha", "beta", "timing"]].iloc[-1], fit.params, rtol=1e-8
+    )
+    np.testing.assert_allclose(
+        result[["alpha_t", "beta_t", "timing_t"]].iloc[-1], fit.tvalues, rtol=1e-7
+    )
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations.risk import rollingVaR
+
+
+@pytest.mark.parametrize(
+    "window, level, chunkSize",
+    [
+        (20, 0.95, None),
+        (100, 0.95, None),
+        (250, 0.99, None),
+        (500, 0.99, None),
+        (1000, 0.95, None),
+        (37, 0.9, None),
+        (20, 0.95, 7),
+        (100, 0.99, 64),
+    ],
+)
+def test_rollingVaR_matches_sorted_windows(window, level, chunkSize):
+    rng = np.random.default_rng(window)
+    returns = pd.Series(
+        rng.standard_t(4, window + 300) * 0.01,
+        index=pd.date_range("2020-01-01", periods=window + 300, freq="D"),
+    )
+    result = rollingVaR(returns, window=window, levels=(level,), chunkSize=chunkSize)
+
+    tail = int(np.ceil(round(window * (1 - level), 9)))
+    windows = np.lib.stride_tricks.sliding_window_view(returns.values, window)
+    smallest = np.sort(windows, axis=1)[:, :tail]
+
+    assert result["VaR"][level].iloc[: window - 1].isna().all()
+    np.testing.assert_array_equal(
+        result["VaR"][level].values[window - 1 :], -smallest[:, -1]
+    )
+    np.testing.assert_allclose(
+        result["ES"][level].values[window - 1 :],
+        -smallest.mean(axis=1),
+        rtol=1e-12,
+        atol=1e-15,
+    )
+
+
+def test_rollingVaR_tail_sizes():
+    # Whole tail sizes must not pick up an extra observation from rounding error
+    returns = pd.Series(np.arange(500, dtype=float))
+    result = rollingVaR(returns, window=500, levels=(0.99, 0.95))
+    assert result["VaR"][0.99].iloc[-1] == -4
+    assert result["VaR"][0.95].iloc[-1] == -24
@@ -0,0 +1,150 @@
+import pickle
+import subprocess
+import sys
+import textwrap
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations.sharedmemory import SharedDerivative
+
+SCRIPT = textwrap.dedent("""
+    import os
+    import sys
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    import numpy as np
+    import pandas as pd
+
+    from tradeframework.operations.sharedmemory import SharedDerivative
+
+
+    class Asset:
+        def __init__(self, name, returns, values, weightedAssets=()):
+            self.name = name
+            self.returns = returns
+            self.values = values
+            self.weights = returns.to_frame()
+            self.weightedAssets = list(weightedAssets)
+
+        def getName(self):
+            return self.name
+
+
+    def total(handle):
+        view = handle.open()
+        assert not view.returns.values.flags.writeable
+        return (
+            float(view.returns.sum()),
+            float(view.values["Close"].sum()),
+            [float(a.returns.sum()) for a in view.weightedAssets],
+            str(view.returns.index.tz),
+        )
+
+
+    if __name__ == "__main__":
+        method, mode = sys.argv[1], sys.argv[2]
+        index = pd.date_range("2020-01-01", periods=5000, freq="min", tz="UTC")
+        rng = np.random.default_rng(0)
+        underlyings = [
+            Asset(
+                f"a{i}",
+                pd.Series(rng.normal(size=5000), index=index),
+                pd.DataFrame({"Close": rng.random(5000)}, index=index),
+            )
+            for i in range(3)
+        ]
+        derivative = Asset(
+            "d", underlyings[0].returns, underlyings[1].values, underlyings
+        )
+        expected = (
+            float(derivative.returns.sum()),
+            float(derivative.values["Close"].sum()),
+            [float(a.returns.sum()) for a in underlyings],
+            "UTC",
+        )
+
+        shared = SharedDerivative(derivative)
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(2, mp_context=context) as pool:
+            results = list(pool.map(total, [shared.handle] * 4))
+        assert all(result == expected for result in results), results
+        print(shared.segment.name, flush=True)
+        if mode == "crash":
+            os._exit(1)
+        shared.close()
+    """)
+
+
+def _exists(name):
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    return True
+
+
+def _run(tmp_path, method, mode="close"):
+    script = tmp_path / "roundtrip.py"
+    script.write_text(SCRIPT)
+    return subprocess.run(
+        [sys.executable, str(script), method, mode],
+        capture_output=True,
+        text=True,
+        timeout=120,
+        env={"PYTHONPATH": ":".join(p for p in sys.path if p)},
+    )
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn", "forkserver"])
+def test_process_pool_roundtrip(tmp_path, method):
+    result = _run(tmp_path, method)
+    assert result.returncode == 0, result.stderr
+    # Workers leave the owner's registration alone: no tracker errors or leaks
+    assert "KeyError" not in result.stderr
+    assert "leaked" not in result.stderr
+    assert not _exists(result.stdout.split()[-1])
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_segment_removed_if_owner_dies(tmp_path, method):
+    result = _run(tmp_path, method, mode="crash")
+    assert result.returncode == 1, result.stderr
+    assert not _exists(result.stdout.split()[-1])
+
+
+def test_independent_process_does_not_unlink():
+    class Asset:
+        returns = pd.Series(np.arange(100.0))
+
+        def getName(self):
+            return "a"
+
+    with SharedDerivative(Asset()) as shared:
+        code = "import pickle, sys; h = pickle.loads(sys.stdin.buffer.read()); "
+        code += "print(h.open().returns.sum())"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            input=pickle.dumps(shared.handle),
+            capture_output=True,
+            env={"PYTHONPATH": ":".join(p for p in sys.path if p)},
+        )
+        assert result.returncode == 0, result.stderr
+        assert float(result.stdout) == 4950
+        assert _exists(shared.segment.name)
+    assert not _exists(shared.segment.name)
+
+
+def test_mixed_dtype_frame_raises():
+    class Asset:
+        values = pd.DataFrame({"Close": np.arange(3.0), "Volume": np.arange(3)})
+
+        def getName(self):
+            return "a"
+
+    with pytest.raises(Exception, match="mixed dtype data: float64, int64"):
+        SharedDerivative(Asset())
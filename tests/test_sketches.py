@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from tradeframework.operations.sketches import (
+    DistributionSketch,
+    FixedHistogram,
+    QuantileSketch,
+    SketchStore,
+)
+
+EDGES = np.linspace(-0.05, 0.05, 201)
+QUANTILES = [0.001, 0.01, 0.05, 0.5, 0.95, 0.99, 0.999]
+
+
+def _returns(seed, scale=0.01, periods=20 * 390):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2020-01-01", periods=periods, freq="min")
+    return pd.Series(rng.standard_t(4, periods) * scale, index=index)
+
+
+def test_histogram_matches_numpy():
+    values = _returns(0, scale=0.02).values
+    histogram = FixedHistogram(EDGES).update(values)
+    np.testing.assert_array_equal(histogram.counts, np.histogram(values, EDGES)[0])
+    assert histogram.underflow == np.sum(values < EDGES[0])
+    assert histogram.overflow == np.sum(values > EDGES[-1])
+    assert histogram.total() == len(values)
+
+
+def test_quantiles_accurate():
+    values = _returns(1).values
+    sketch = QuantileSketch(500).update(values)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(QUANTILES)) / len(values)
+    # Rank error is relative to the tail distance
+    tail = np.minimum(QUANTILES, 1 - np.array(QUANTILES))
+    assert (np.abs(ranks - QUANTILES) <= 0.002 + 0.05 * tail).all()
+    assert sketch.count() == len(values)
+
+
+def test_merged_chunks_match_single_sketch():
+    values = _returns(2).values
+    chunks = [
+        DistributionSketch(EDGES).update(chunk) for chunk in np.array_split(values, 20)
+    ]
+    merged = chunks[0].merge(*chunks[1:])
+    single = DistributionSketch(EDGES).update(values)
+    np.testing.assert_array_equal(merged.histogram.counts, single.histogram.counts)
+    np.testing.assert_allclose(
+        merged.quantiles.quantile(QUANTILES),
+        np.quantile(values, QUANTILES),
+        rtol=0.05,
+    )
+
+
+def test_store_reload_only_sketches_new_periods(tmp_path):
+    returns = _returns(3)
+    path = str(tmp_path / "store.npz")
+    first = SketchStore(EDGES, path=path, key="a").update(returns[: 10 * 390])
+
+    reloaded = SketchStore(EDGES, path=path, key="a")
+    assert list(reloaded.sketches) == list(first.sketches)
+    before = dict(reloaded.sketches)
+    reloaded.update(returns)
+    # Earlier complete periods are reused, the latest stored period is re-sketched
+    latest = max(before)
+    assert all(reloaded.sketches[p] is before[p] for p in before if p != latest)
+    assert reloaded.sketches[latest] is not before[latest]
+
+    expected = SketchStore(EDGES).update(returns).summary()
+    np.testing.assert_array_equal(
+        reloaded.summary().histogram.counts, expected.histogram.counts
+    )
+    assert os.listdir(tmp_path) == ["store.npz"]
+
+
+def test_store_rejects_other_key_and_freq(tmp_path):
+    path = str(tmp_path / "store.npz")
+    calm, volatile = _returns(4, scale=0.002), _returns(5, scale=0.02)
+    SketchStore(EDGES, path=path, key="calm").update(calm)
+
+    for store in [
+        SketchStore(EDGES, path=path, key="volatile"),
+        SketchStore(EDGES, path=path, key="calm", freq="h"),
+    ]:
+        assert store.sketches == {}
+
+    store = SketchStore(EDGES, path=path, key="volatile").update(volatile)
+    np.testing.assert_allclose(
+        store.summary().quantiles.quantile(0.01),
+        np.quantile(volatile, 0.01),
+        rtol=0.05,
+    )
+
+
+def test_store_default_edges(tmp_path):
+    prices = np.log(100 + _returns(6).cumsum())
+    path = str(tmp_path / "prices")
+    store = SketchStore(path=path, key="prices").update(prices)
+    sketch = store.summary()
+    assert sketch.histogram.total() == sketch.histogram.counts.sum() == len(prices)
+
+    reloaded = SketchStore(path=path, key="prices")
+    np.testing.assert_array_equal(reloaded.edges, store.edges)
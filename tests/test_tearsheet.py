@@ -0,0 +1,199 @@
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradeframework.operations import tearsheet
+
+rng = np.random.default_rng(0)
+RETURNS = pd.Series(
+    rng.standard_t(4, 2520) * 0.01 + 0.0003,
+    index=pd.bdate_range("2010-01-01", periods=2520),
+)
+
+# performanceStats keys and the pyfolio perf_stats names
+PYFOLIO_STATS = {
+    "annual_return": "Annual return",
+    "cumulative_returns": "Cumulative returns",
+    "annual_volatility": "Annual volatility",
+    "sharpe_ratio": "Sharpe ratio",
+    "calmar_ratio": "Calmar ratio",
+    "stability": "Stability",
+    "max_drawdown": "Max drawdown",
+    "omega_ratio": "Omega ratio",
+    "sortino_ratio": "Sortino ratio",
+    "skew": "Skew",
+    "kurtosis": "Kurtosis",
+    "tail_ratio": "Tail ratio",
+    "daily_value_at_risk": "Daily value at risk",
+}
+
+
+@pytest.fixture(scope="module")
+def timeseries():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pytest.importorskip("pyfolio.timeseries")
+
+
+def test_performance_stats_match_pyfolio(timeseries):
+    expected = timeseries.perf_stats(RETURNS)
+    stats = tearsheet.performanceStats(RETURNS)
+    for key, name in PYFOLIO_STATS.items():
+        assert stats[key] == pytest.approx(expected[name], rel=1e-10), key
+
+
+def test_drawdowns_match_pyfolio(timeseries):
+    expected = timeseries.gen_drawdown_table(RETURNS, top=5)
+    table = tearsheet.drawdownPeriods(RETURNS, top=5)
+    np.testing.assert_allclose(
+        table["net_drawdown"], expected["Net drawdown in %"].astype(float)
+    )
+    for column, name in [
+        ("peak", "Peak date"),
+        ("valley", "Valley date"),
+        ("recovery", "Recovery date"),
+    ]:
+        pd.testing.assert_series_equal(
+            pd.Series(pd.to_datetime(table[column]).values),
+            pd.Series(pd.to_datetime(expected[name]).values),
+            check_names=False,
+        )
+    recovered = table["recovery"].notna()
+    np.testing.assert_array_equal(
+        table["duration"][recovered], expected["Duration"][recovered].astype(int)
+    )
+
+
+def test_rolling_match_pyfolio(timeseries):
+    np.testing.assert_allclose(
+        tearsheet.rollingSharpe(RETURNS.values, 126),
+        timeseries.rolling_sharpe(RETURNS, 126).values,
+        atol=1e-10,
+    )
+    np.testing.assert_allclose(
+        tearsheet.rollingVolatility(RETURNS.values, 126),
+        timeseries.rolling_volatility(RETURNS, 126).values,
+        atol=1e-10,
+    )
+
+
+# Wall-clock comparison, run on demand with BENCHMARK=1
+@pytest.mark.skipif(not os.environ.get("BENCHMARK"), reason="benchmark")
+def test_benchmark_against_pyfolio(timeseries):
+    def elapsed(func, repeat=10):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat
+
+    native = elapsed(lambda: tearsheet.performanceStats(RETURNS))
+    reference = elapsed(lambda: timeseries.perf_stats(RETURNS))
+    assert native < reference, f"{native * 1e3:.2f}ms, pyfolio {reference * 1e3:.2f}ms"
+
+
+def test_drawdown_analysis_matches_periods():
+    panel = pd.DataFrame(
+        rng.normal(0.0002, 0.01, (1000, 20)),
+        index=pd.bdate_range("2015-01-01", periods=1000),
+    )
+    summary, episodes, underwater = tearsheet.drawdownAnalysis(panel, top=3)
+    for column in panel.columns:
+        expected = tearsheet.drawdownPeriods(panel[column], top=3)
+        actual = episodes[episodes["strategy"] == column].drop(
+            columns=["strategy", "rank"]
+        )
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected)
+        assert summary.loc[column, "max_drawdown"] == underwater[column].min()
+
+
+def test_rolling_performance_matches_pandas_rolling():
+    panel = pd.DataFrame(
+        rng.normal(0.0005, 0.01, (600, 3)),
+        index=pd.bdate_range("2018-01-01", periods=600),
+        columns=["a", "b", "c"],
+    )
+    panel.iloc[rng.integers(0, 600, 15), 1] = np.nan
+    windows = (5, 60, 252)
+    result = tearsheet.rollingPerformance(panel, windows=windows)
+
+    for column in panel.columns:
+        for window in windows:
+            rolling = panel[column].rolling(window)
+            mean = rolling.mean() * 252
+            volatility = rolling.std() * np.sqrt(252)
+            downside = panel[column].clip(upper=0).pow(2).rolling(window).mean().pow(
+                0.5
+            ) * np.sqrt(252)
+            expected = pd.DataFrame(
+                {
+                    "mean": mean,
+                    "volatility": volatility,
+                    "downside": downside,
+                    "sharpe": mean / volatility,
+                    "sortino": mean / downside,
+                }
+            )
+            pd.testing.assert_frame_equal(
+                result[column][window], expected, check_names=False, rtol=1e-8
+            )
+
+    # A series gives (window, metric) columns
+    series = tearsheet.rollingPerformance(panel["a"], windows=windows)
+    pd.testing.assert_frame_equal(series, result["a"])
+
+
+def _referenceDrawdowns(returns):
+    # Bar by bar loop over one strategy: underwater curve and (start, valley, end, depth)
+    # of each episode. As pyfolio, the first peak is the wealth after the first bar
+    peak, value, curve, episodes = -np.inf, 1.0, [], []
+    for t, r in enumerate(np.nan_to_num(returns)):
+        value *= 1 + r
+        peak = max(peak, value)
+        curve.append(value / peak - 1)
+        if curve[-1] < 0:
+            if not episodes or episodes[-1][2] is not None:
+                episodes.append([t, t, None, curve[-1]])
+            if curve[-1] < episodes[-1][3]:
+                episodes[-1][1], episodes[-1][3] = t, curve[-1]
+        elif episodes and episodes[-1][2] is None:
+            episodes[-1][2] = t
+    for episode in episodes:
+        if episode[2] is None:
+            episode[2] = len(curve)
+    return np.array(curve), episodes
+
+
+def test_drawdown_analysis_matches_loop():
+    n = 500
+    panel = pd.DataFrame(
+        {
+            "noisy": rng.normal(0.0002, 0.01, n),
+            "rising": np.full(n, 0.001),
+            "underwater": np.r_[np.full(n // 2, 0.001), np.full(n - n // 2, -0.001)],
+            "gaps": np.where(rng.random(n) < 0.1, np.nan, rng.normal(0, 0.01, n)),
+        },
+        index=pd.bdate_range("2015-01-01", periods=n),
+    )
+    summary, _, underwater = tearsheet.drawdownAnalysis(panel, top=3)
+    for column in panel.columns:
+        curve, episodes = _referenceDrawdowns(panel[column].values)
+        np.testing.assert_allclose(underwater[column], curve, atol=1e-12)
+        row = summary.loc[column]
+        assert row["max_drawdown"] == pytest.approx(min(curve.min(), 0))
+        assert row["current_drawdown"] == pytest.approx(curve[-1])
+        assert row["episodes"] == len(episodes)
+        durations = [min(end, n - 1) - start + 2 for start, _, end, _ in episodes]
+        assert row["max_duration"] == max(durations, default=0)
+        if episodes:
+            _, valley, end, _ = min(episodes, key=lambda episode: episode[3])
+            expected = end - valley if end < n else np.nan
+            np.testing.assert_equal(row["recovery"], expected)
+        else:
+            assert np.isnan(row["recovery"])
+    # Ordered from the smallest max drawdown
+    assert summary["max_drawdown"].is_monotonic_decreasing
+    assert summary.index[0] == "rising"
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from tradeframework.operations.ledger import (
+    barWeights,
+    currentSignals,
+    underlyingPrices,
+)
+from tradeframework.operations.views import TailView
+
+
+class Asset:
+    def __init__(self, name, values, returns=None, weights=None, weightedAssets=()):
+        self.name = name
+        self.values = values
+        self.returns = returns
+        self.weights = weights
+        self.weightedAssets = list(weightedAssets)
+
+    def getName(self):
+        return self.name
+
+    def lastClose(self):
+        return self.values["Close"].iloc[0]
+
+    def bars(self):
+        return len(self.values)
+
+
+def _derivative(n, assets=50):
+    rng = np.random.default_rng(n)
+    index = pd.date_range("2000-01-01", periods=n, freq="min")
+    underlyings = []
+    for i in range(assets):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+        values = pd.DataFrame({"Open": close, "Close": close}, index=index)
+        underlyings.append(Asset(f"a{i}", values))
+    weights = pd.DataFrame(
+        rng.integers(-1, 2, (n, assets)).astype(float),
+        index=index,
+        columns=pd.MultiIndex.from_product([[a.name for a in underlyings], ["bar"]]),
+    )
+    values = pd.DataFrame({"Close": np.ones(n)}, index=index)
+    return Asset("derivative", values, weights=weights, weightedAssets=underlyings)
+
+
+def _signals(derivative):
+    weights = barWeights(derivative)
+    _, closes = underlyingPrices(derivative, weights.columns, weights.index)
+    return currentSignals(weights, closes, capital=10)
+
+
+def test_methods_read_the_tail():
+    derivative = _derivative(100, assets=2)
+    view = TailView(derivative, 10)
+    assert view.bars() == 10
+    assert view.lastClose() == derivative.values["Close"].iloc[90]
+    assert view.getName() == "derivative"
+    assert [a.bars() for a in view.weightedAssets] == [10, 10]
+
+
+def test_current_signals():
+    derivative = _derivative(100, assets=5)
+    signals = _signals(TailView(derivative, 2))
+    weights = barWeights(derivative)
+    np.testing.assert_array_equal(signals["weight"], weights.iloc[-1])
+    np.testing.assert_array_equal(signals["previous"], weights.iloc[-2])
+    change = weights.iloc[-1] - weights.iloc[-2]
+    expected = np.where(change > 0, "BUY", np.where(change < 0, "SELL", "HOLD"))
+    np.testing.assert_array_equal(signals["signal"], expected)
+    np.testing.assert_array_equal(signals["allocation"], 10 * weights.iloc[-1])
+    pd.testing.assert_frame_equal(signals, _signals(derivative))
+
+
+def test_tail_reads_only_the_last_bars():
+    derivative = _derivative(20000)
+    view = TailView(derivative, 2)
+    weights = barWeights(view)
+    _, closes = underlyingPrices(view, weights.columns, weights.index)
+    assert weights.shape == closes.shape == (2, 50)
+    assert all(len(asset.values) == 2 for asset in view.weightedAssets)
+    pd.testing.assert_frame_equal(
+        currentSignals(weights, closes, capital=10), _signals(derivative)
+    )
@@ -1 +1,4 @@
 from .insights import InsightManager, InsightGenerator
+from .graph import Intermediate, registerIntermediate, evaluate
+from .results import InsightResult
+from .export import exportResults, resultFrames
@@ -0,0 +1,300 @@
+import os
+import re
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .insights import InsightManager
+from .graph import IntermediateGraph
+from .export import exportResults
+from tradeframework.operations.precision import precision
+
+# Batch runner. A spec (JSON or YAML) lists derivative snapshots (pickled derivatives) and
+# generator specs:
+#
+#   derivatives:
+#     - name: MyStrategy
+#       path: snapshots/mystrategy.pkl
+#   generators:
+#     - class: PerfSummary
+#       name: Performance            (optional, defaults to the class)
+#       module: tradeframework.insights  (optional)
+#       opts:
+#         baseline: {snapshot: snapshots/spx.pkl}
+#   output: results/
+#   format: parquet
+#   workers: 8
+#   dtype: float32                  (optional compute precision)
+#
+# Opts of the form {snapshot: path} are replaced by the unpickled snapshot. Work is sharded
+# across a process pool; each finished (derivative, generator) pair is checkpointed under
+# output/checkpoints, keyed by its spec and snapshot files, so a rerun only does the
+# remaining work, and an edited spec or refreshed snapshot is rerun. Derivative and
+# generator names must be unique within a spec. The results of the spec's pairs are then exported with
+# exportResults.
+
+_snapshots = {}
+
+
+def loadSpec(path):
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def loadSnapshot(path):
+    # Cached per process, so a worker loads each snapshot once
+    if path not in _snapshots:
+        with open(path, "rb") as f:
+            _snapshots[path] = pickle.load(f)
+    return _snapshots[path]
+
+
+def _resolveOpts(opts):
+    if isinstance(opts, dict):
+        if set(opts) == {"snapshot"}:
+            return loadSnapshot(opts["snapshot"])
+        return {k: _resolveOpts(v) for k, v in opts.items()}
+    if isinstance(opts, list):
+        return [_resolveOpts(v) for v in opts]
+    return opts
+
+
+def _generatorName(spec):
+    return spec.get("name", spec["class"])
+
+
+def _derivativeName(spec):
+    return spec.get("name", os.path.splitext(os.path.basename(spec["path"]))[0])
+
+
+def _safeName(name):
+    return re.sub(r"[^\w.-]", "_", str(name))
+
+
+def _snapshotPaths(spec):
+    if isinstance(spec, dict):
+        if set(spec) == {"snapshot"}:
+            return [spec["snapshot"]]
+        return [p for v in spec.values() for p in _snapshotPaths(v)]
+    if isinstance(spec, list):
+        return [p for v in spec for p in _snapshotPaths(v)]
+    return []
+
+
+def _snapshotStamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _checkpoint(output, derivativeSpec, generatorSpec):
+    # Keyed by a digest of the derivative and generator specs (class, module, name and
+    # opts) and of the size and mtime of every snapshot they read, so neither editing a
+    # spec nor refreshing a snapshot ever resumes from a stale result
+    paths = [derivativeSpec["path"]] + _snapshotPaths(generatorSpec.get("opts", {}))
+    stamps = {path: _snapshotStamp(path) for path in paths}
+    key = json.dumps(
+        [derivativeSpec, generatorSpec, stamps], sort_keys=True, default=str
+    ).encode()
+    name = "__".join(
+        [
+            _safeName(_derivativeName(derivativeSpec)),
+            _safeName(_generatorName(generatorSpec)),
+            hashlib.sha1(key).hexdigest()[:16],
+        ]
+    )
+    return os.path.join(output, "checkpoints", f"{name}.pkl")
+
+
+def _save(path, obj):
+    # Write then rename, so a crash never leaves a partial checkpoint behind
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def runShard(derivativeSpec, generatorSpecs, output, dtype=None):
+    """
+    Run a list of generators against one derivative, checkpointing each result.
+    Returns {generatorName: error} for the generators that failed.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    derivativeName = _derivativeName(derivativeSpec)
+    checkpoints = {
+        _generatorName(spec): _checkpoint(output, derivativeSpec, spec)
+        for spec in generatorSpecs
+    }
+    derivative = loadSnapshot(derivativeSpec["path"])
+    manager = InsightManager(derivative)
+    generators = [
+        manager.createInsightGenerator(
+            spec["class"],
+            _generatorName(spec),
+            spec.get("module", "tradeframework.insights"),
+            _resolveOpts(spec.get("opts", {})),
+        )
+        for spec in generatorSpecs
+    ]
+
+    errors = {}
+
+    def consume(generator, intermediates):
+        try:
+            result = generator.getResult(derivative, intermediates=intermediates)
+        except Exception:
+            errors[generator.getName()] = traceback.format_exc()
+            return
+        result.derivative = derivativeName
+        # Figures and raw values are not exported, and may not pickle
+        result.figures = {}
+        result.raw = None
+        _save(checkpoints[generator.getName()], result)
+
+    try:
+        with precision(dtype) if dtype else contextlib.nullcontext():
+            IntermediateGraph(derivative, generators).run(consume)
+    except Exception:
+        error = traceback.format_exc()
+        for generator in generators:
+            if generator.getName() not in errors and not os.path.exists(
+                checkpoints[generator.getName()]
+            ):
+                errors[generator.getName()] = error
+    return errors
+
+
+def _derivativeSpecs(spec):
+    return [{"path": d} if isinstance(d, str) else d for d in spec["derivatives"]]
+
+
+def validateSpec(spec):
+    """
+    Check that derivative and generator names are unique: results and checkpoints are
+    keyed by name, so duplicates would overwrite each other.
+    """
+    for kind, names in [
+        ("derivative", [_derivativeName(d) for d in _derivativeSpecs(spec)]),
+        ("generator", [_generatorName(g) for g in spec["generators"]]),
+    ]:
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise Exception(
+                f"Duplicate {kind} names in batch spec: {', '.join(duplicates)}"
+            )
+    return spec
+
+
+def _shards(spec, output, workers):
+    # Pending generators per derivative, split so that every worker has work when there
+    # are fewer derivatives than workers. Generators of a shard share intermediates.
+    pending = []
+    for derivativeSpec in _derivativeSpecs(spec):
+        generatorSpecs = [
+            g
+            for g in spec["generators"]
+            if not os.path.exists(_checkpoint(output, derivativeSpec, g))
+        ]
+        if generatorSpecs:
+            pending.append((derivativeSpec, generatorSpecs))
+
+    shards = []
+    splits = max(1, -(-workers // max(len(pending), 1)))
+    for derivativeSpec, generatorSpecs in pending:
+        size = -(-len(generatorSpecs) // splits)
+        for i in range(0, len(generatorSpecs), size):
+            shards.append((derivativeSpec, generatorSpecs[i : i + size]))
+    return shards
+
+
+def runBatch(spec, output=None, workers=None, resume=True):
+    """
+    Run a batch spec across a process pool and export the results. Returns
+    {(derivative, generator): error} for the pairs that failed.
+    """
+    validateSpec(spec)
+    output = output or spec.get("output", "insights")
+    workers = workers or spec.get("workers") or os.cpu_count()
+    checkpoints = os.path.join(output, "checkpoints")
+    os.makedirs(checkpoints, exist_ok=True)
+    if not resume:
+        for f in os.listdir(checkpoints):
+            os.remove(os.path.join(checkpoints, f))
+
+    errors = {}
+    shards = _shards(spec, output, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                runShard, derivativeSpec, generatorSpecs, output, spec.get("dtype")
+            ): (
+                _derivativeName(derivativeSpec),
+                generatorSpecs,
+            )
+            for derivativeSpec, generatorSpecs in shards
+        }
+        for future in as_completed(futures):
+            derivativeName, generatorSpecs = futures[future]
+            try:
+                failed = future.result()
+            except Exception:
+                # The worker itself died (e.g. the snapshot failed to load)
+                error = traceback.format_exc()
+                failed = {_generatorName(g): error for g in generatorSpecs}
+            for generatorName, error in failed.items():
+                errors[(derivativeName, generatorName)] = error
+
+    # Only the pairs of this spec: the directory may hold results of other specs
+    results = []
+    for derivativeSpec in _derivativeSpecs(spec):
+        for generatorSpec in spec["generators"]:
+            path = _checkpoint(output, derivativeSpec, generatorSpec)
+            if os.path.exists(path):
+                with open(path, "rb") as fh:
+                    results.append(pickle.load(fh))
+    exportResults(results, output, format=spec.get("format", "parquet"))
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate insights for a batch of derivative snapshots"
+    )
+    parser.add_argument("spec", help="JSON or YAML batch spec")
+    parser.add_argument("--output", help="Output directory (overrides the spec)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="Discard existing checkpoints and rerun everything",
+    )
+    args = parser.parse_args(argv)
+
+    errors = runBatch(
+        loadSpec(args.spec),
+        output=args.output,
+        workers=args.workers,
+        resume=args.resume,
+    )
+    for (derivativeName, generatorName), error in errors.items():
+        print(f"FAILED {derivativeName} / {generatorName}", file=sys.stderr)
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import numbers
+import numpy as np
+import pandas as pd
+
+# Long format export of InsightResults. Every batch is written with the same schema,
+# one table per kind of result, so a whole run is ingested with a single columnar write
+# per table. Figures and raw values are not exported.
+
+COLUMNS = {
+    "scalars": ["derivative", "generator", "name", "value"],
+    "series": ["derivative", "generator", "name", "timestamp", "value"],
+    "tables": ["derivative", "generator", "name", "row", "column", "value", "text"],
+}
+
+
+def _schema(kind):
+    import pyarrow as pa
+
+    types = {
+        "derivative": pa.string(),
+        "generator": pa.string(),
+        "name": pa.string(),
+        "value": pa.float64(),
+        "timestamp": pa.timestamp("ns"),
+        "row": pa.string(),
+        "column": pa.string(),
+        "text": pa.string(),
+    }
+    return pa.schema([(column, types[column]) for column in COLUMNS[kind]])
+
+
+def _results(results):
+    if isinstance(results, dict):
+        results = results.values()
+    return list(results)
+
+
+def _isNumber(value):
+    return isinstance(value, (numbers.Number, np.number)) and not isinstance(
+        value, (bool, np.bool_)
+    )
+
+
+def _cells(column):
+    # Values (numbers) and text (anything else) of the cells of a table column. Numeric
+    # columns are converted whole; only other columns are inspected cell by cell.
+    if column.dtype.kind in "iuf":
+        return (
+            column.to_numpy(dtype=float, na_value=np.nan),
+            np.full(len(column), None, dtype=object),
+        )
+    cells = column.to_numpy(dtype=object)
+    number = np.fromiter(map(_isNumber, cells), dtype=bool, count=len(cells))
+    values = np.full(len(cells), np.nan)
+    values[number] = cells[number].astype(float)
+    text = np.full(len(cells), None, dtype=object)
+    text[~number] = cells[~number].astype(str)
+    return values, text
+
+
+def _timestamps(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index
+
+
+def resultFrames(results):
+    """
+    Flatten InsightResults (a list, or a {name: result} dict as returned by
+    InsightManager.generateResults) into long format scalars, series and tables frames.
+    """
+    frames = {kind: [] for kind in COLUMNS}
+    for result in _results(results):
+        keys = {"derivative": result.derivative, "generator": result.generator}
+
+        if result.scalars:
+            frames["scalars"].append(
+                pd.DataFrame(
+                    {
+                        **keys,
+                        "name": list(result.scalars.keys()),
+                        "value": list(result.scalars.values()),
+                    }
+                )
+            )
+
+        for name, series in result.series.items():
+            frames["series"].append(
+                pd.DataFrame(
+                    {
+                        **keys,
+                        "name": name,
+                        "timestamp": _timestamps(series.index),
+                        "value": pd.to_numeric(series.values, errors="coerce").astype(float),
+                    }
+                )
+            )
+
+        for name, table in result.tables.items():
+            table = pd.DataFrame(table)
+            # Filled a column at a time, flattened row by row
+            values = np.empty(table.shape)
+            text = np.empty(table.shape, dtype=object)
+            for i in range(table.shape[1]):
+                values[:, i], text[:, i] = _cells(table.iloc[:, i])
+            frames["tables"].append(
+                pd.DataFrame(
+                    {
+                        **keys,
+                        "name": name,
+                        "row": np.repeat(table.index.astype(str), table.shape[1]),
+                        "column": np.tile(table.columns.astype(str), table.shape[0]),
+                        "value": values.ravel(),
+                        "text": text.ravel(),
+                    }
+                )
+            )
+
+    return {
+        kind: (
+            pd.concat(parts, ignore_index=True)[COLUMNS[kind]]
+            if parts
+            else pd.DataFrame(columns=COLUMNS[kind])
+        )
+        for kind, parts in frames.items()
+    }
+
+
+def exportResults(results, path, format="parquet"):
+    """
+    Write InsightResults to path/scalars, path/series and path/tables as Parquet
+    ("parquet") or Arrow IPC ("arrow") files. Returns the paths written.
+    """
+    import pyarrow as pa
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+    elif format != "arrow":
+        raise Exception(f"Unknown format: {format}")
+
+    os.makedirs(path, exist_ok=True)
+    paths = {}
+    for kind, frame in resultFrames(results).items():
+        schema = _schema(kind)
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+        paths[kind] = os.path.join(path, f"{kind}.{format}")
+        if format == "parquet":
+            pq.write_table(table, paths[kind])
+        else:
+            with pa.OSFile(paths[kind], "wb") as sink:
+                with pa.ipc.new_file(sink, schema) as writer:
+                    writer.write_table(table)
+    return paths
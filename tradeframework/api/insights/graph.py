@@ -0,0 +1,207 @@
+import threading
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Named intermediates shared between generators (period returns, return panels, ACFs...).
+# Generators declare the intermediates they need; the InsightManager builds a DAG of them,
+# computes each one once per run, and frees it when its last consumer has finished.
+
+_registry = {}
+
+
+def registerIntermediate(name, requires=None):
+    """
+    Register a function computing a named intermediate.
+
+    The function is called as func(derivative, deps, **params), where deps maps aliases to
+    the values of the intermediates returned by requires(derivative, **params).
+    """
+
+    def decorator(func):
+        _registry[name] = (func, requires)
+        return func
+
+    return decorator
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        # Data (series, frames, arrays) is keyed by identity
+        return ("id", id(value))
+
+
+class Intermediate:
+    """
+    Request for a named intermediate with parameters. Requests with the same name and
+    parameters share a single node in the graph.
+    """
+
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+        self.key = (name,) + tuple(sorted((k, _hashable(v)) for k, v in params.items()))
+
+    def _definition(self):
+        if self.name not in _registry:
+            raise Exception(f"Unknown intermediate: {self.name}")
+        return _registry[self.name]
+
+    def dependencies(self, derivative):
+        _, requires = self._definition()
+        return requires(derivative, **self.params) if requires else {}
+
+    def compute(self, derivative, deps):
+        func, _ = self._definition()
+        return func(derivative, deps, **self.params)
+
+
+def evaluate(intermediate, derivative):
+    """
+    Evaluate an intermediate and its dependencies directly, outside of a graph.
+    """
+    deps = {
+        alias: evaluate(dependency, derivative)
+        for alias, dependency in intermediate.dependencies(derivative).items()
+    }
+    return intermediate.compute(derivative, deps)
+
+
+class IntermediateGraph:
+    """
+    DAG of the intermediates required by a list of generators.
+
+    Generators are run in order on the calling thread (plotting is not thread safe) as
+    soon as their own intermediates are ready. Intermediates are computed on a thread pool
+    once their dependencies are ready and their first consuming generator is at most
+    lookahead generators ahead of the one running, so only the intermediates of the next
+    few generators are held at once. Each intermediate is released once every generator
+    and intermediate consuming it has finished.
+    """
+
+    def __init__(self, derivative, generators, workers=None, lookahead=1):
+        self.derivative = derivative
+        self.workers = workers
+        self.lookahead = lookahead
+        self.nodes = {}
+        self.edges = {}
+        self.refs = defaultdict(int)
+        self.requirements = []
+        # Index of the first generator consuming each intermediate (directly or not)
+        self.first = {}
+        for step, generator in enumerate(generators):
+            keys = {
+                alias: self._add(intermediate)
+                for alias, intermediate in generator.requires().items()
+            }
+            for key in keys.values():
+                self.refs[key] += 1
+                self._schedule(key, step)
+            self.requirements.append((generator, keys))
+
+    def _add(self, intermediate):
+        key = intermediate.key
+        if key not in self.nodes:
+            self.nodes[key] = intermediate
+            self.edges[key] = {
+                alias: self._add(dependency)
+                for alias, dependency in intermediate.dependencies(
+                    self.derivative
+                ).items()
+            }
+            for dependency in self.edges[key].values():
+                self.refs[dependency] += 1
+        return key
+
+    def _schedule(self, key, step):
+        if key not in self.first:
+            self.first[key] = step
+            for dependency in self.edges[key].values():
+                self._schedule(dependency, step)
+
+    def run(self, consume):
+        """
+        Call consume(generator, intermediates) for each generator, where intermediates maps
+        the generator's aliases to computed values.
+        """
+        lock = threading.Lock()
+        results = {}
+        errors = {}
+        done = {key: threading.Event() for key in self.nodes}
+        refs = dict(self.refs)
+        waiting = {key: set(edges.values()) for key, edges in self.edges.items()}
+        dependents = defaultdict(list)
+        for key, edges in self.edges.items():
+            for dependency in set(edges.values()):
+                dependents[dependency].append(key)
+        # Intermediates with their dependencies ready, beyond the lookahead
+        deferred = {key for key, pending in waiting.items() if not pending}
+        horizon = -1
+
+        def release(key):
+            refs[key] -= 1
+            if refs[key] == 0:
+                results.pop(key, None)
+
+        def fail(key, error):
+            if key not in errors:
+                errors[key] = error
+                done[key].set()
+                for dependent in dependents[key]:
+                    fail(dependent, error)
+
+        def submit():
+            # Called with the lock held
+            ready = [key for key in deferred if self.first[key] <= horizon]
+            for key in sorted(ready, key=self.first.get):
+                deferred.discard(key)
+                if key not in errors:
+                    # Run in a copy of the caller's context, e.g. to keep its precision
+                    pool.submit(contextvars.copy_context().run, compute, key)
+
+        def compute(key):
+            try:
+                with lock:
+                    deps = {
+                        alias: results[dependency]
+                        for alias, dependency in self.edges[key].items()
+                    }
+                value = self.nodes[key].compute(self.derivative, deps)
+            except Exception as e:
+                with lock:
+                    fail(key, e)
+                return
+            # Dropped here so the dependencies released below are freed right away
+            deps = None
+            with lock:
+                results[key] = value
+                for dependency in self.edges[key].values():
+                    release(dependency)
+                for dependent in dependents[key]:
+                    waiting[dependent].discard(key)
+                    if not waiting[dependent] and dependent not in errors:
+                        deferred.add(dependent)
+                submit()
+            done[key].set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for step, (generator, keys) in enumerate(self.requirements):
+                with lock:
+                    horizon = step + self.lookahead
+                    submit()
+                for key in keys.values():
+                    done[key].wait()
+                    if key in errors:
+                        raise errors[key]
+                with lock:
+                    intermediates = {alias: results[key] for alias, key in keys.items()}
+                consume(generator, intermediates)
+                intermediates = None
+                with lock:
+                    for key in keys.values():
+                        release(key)
@@ -1,24 +1,144 @@
 import importlib
+import contextlib
+import numpy as np
+import pandas as pd
+from tradeframework.operations.precision import precision
+from .graph import IntermediateGraph, evaluate
+from .results import InsightResult
 
+# Inputs a generator can read from the derivative (and its opts). Live mode tracks a version
+# per input and only reruns generators whose declared inputs have changed.
+INPUTS = ("returns", "values", "weights", "baseline", "assetStore")
 
-class InsightGenerator:
+
+class FrozenOpts(dict):
+    """
+    Read-only generator opts. Generators fill in their defaults in __init__, after which
+    the opts are frozen so getInsight has no side effects and an instance can be reused
+    across derivatives and threads.
+
+    Freezing is deep for plain containers: nested dicts are frozen, lists become tuples
+    and numpy arrays become read-only views. Other objects (series, frames, assets) are
+    shared with the caller as given and must not be modified.
+    """
+
+    def __init__(self, opts=()):
+        dict.__init__(self, ((k, _freeze(v)) for k, v in dict(opts).items()))
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Generator opts are read-only once constructed")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    setdefault = update = pop = popitem = clear = _readonly
+
+    def __reduce__(self):
+        return (FrozenOpts, (dict(self),))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenOpts(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    elif isinstance(value, np.ndarray) and value.flags.writeable:
+        value = value.view()
+        value.flags.writeable = False
+    return value
+
+
+class _GeneratorType(type):
+    def __call__(cls, *args, **kwargs):
+        generator = super().__call__(*args, **kwargs)
+        generator.opts = FrozenOpts(generator.opts)
+        return generator
+
+
+class InsightGenerator(metaclass=_GeneratorType):
+
+    # Inputs read by getInsight. Generators override this to narrow it; the default of all
+    # inputs means the generator is rerun on any change.
+    inputs = INPUTS
 
     def __init__(self, name, opts):
         self.name = name
-        self.opts = opts
+        # Copied (with nested dicts), so defaults are not written back into the caller's
+        self.opts = {
+            k: dict(v) if isinstance(v, dict) else v for k, v in dict(opts or {}).items()
+        }
 
     def getName(self):
         return self.name
 
+    def getInputs(self):
+        return self.inputs
+
+    def requires(self):
+        """
+        Named intermediates used by getInsight, as {alias: Intermediate}. When run by an
+        InsightManager these are computed once per run and passed in as `intermediates`.
+        """
+        return {}
+
+    def resolve(self, alias, derivative, intermediates=None):
+        if intermediates is not None and alias in intermediates:
+            return intermediates[alias]
+        return evaluate(self.requires()[alias], derivative)
+
     def getInsight(self, derivative, display=True):
         pass
 
+    def structure(self, insight):
+        """
+        Convert the value returned by getInsight into an InsightResult. Generators
+        returning tuples or model objects override this.
+        """
+        return InsightResult.fromInsight(self.getName(), insight)
+
+    def getResult(self, derivative, display=False, intermediates=None):
+        if intermediates:
+            insight = self.getInsight(derivative, display=display, intermediates=intermediates)
+        else:
+            insight = self.getInsight(derivative, display=display)
+        result = self.structure(insight)
+        result.derivative = derivative.getName()
+        return result
+
+
+def _fingerprint(obj):
+    # Cheap change detector: identity, shape and last index label of a pandas object
+    if obj is None:
+        return None
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return (id(obj), obj.shape, obj.index[-1] if len(obj) else None)
+    return (id(obj),)
+
+
+def _storeFingerprint(store):
+    # Membership of the store, and the data of each asset: new bars on an existing asset
+    # change it as well as added or removed assets
+    return (id(store),) + tuple(
+        (
+            name,
+            _fingerprint(getattr(asset, "returns", None)),
+            _fingerprint(getattr(asset, "values", None)),
+        )
+        for name, asset in store.store.items()
+    )
+
 
 class InsightManager:
 
-    def __init__(self, derivative):
+    def __init__(self, derivative, workers=None, dtype=None):
         self.derivative = derivative
         self.generators = []
+        self.workers = workers
+        # Compute dtype for the kernels, e.g. np.float32 to screen large panels
+        self.dtype = dtype
+        self.versions = dict.fromkeys(INPUTS, 0)
+        self.fingerprints = {}
+        self.cache = {}
 
     def createInsightGenerator(self, generatorClass, generatorName=None, generatorModule="tradeframework.insights", opts=None):
         if not opts:
@@ -34,7 +154,84 @@ class InsightManager:
         self.generators.append(generator)
         return self
 
-    def generateInsights(self, display=True):
+    def _runGenerators(self, generators, display, structured=False):
+        # Shared intermediates are computed once (concurrently) and freed after use
         insights = {}
-        [insights.update({generator.getName(): generator.getInsight(self.derivative, display=display)}) for generator in self.generators]
+
+        def consume(generator, intermediates):
+            if structured:
+                insight = generator.getResult(self.derivative, display=display, intermediates=intermediates)
+            elif intermediates:
+                insight = generator.getInsight(self.derivative, display=display, intermediates=intermediates)
+            else:
+                insight = generator.getInsight(self.derivative, display=display)
+            insights[generator.getName()] = insight
+
+        with precision(self.dtype) if self.dtype else contextlib.nullcontext():
+            IntermediateGraph(self.derivative, generators, self.workers).run(consume)
         return insights
+
+    def generateInsights(self, display=True):
+        return self._runGenerators(self.generators, display)
+
+    def generateResults(self, display=False):
+        """
+        Run all generators and return {name: InsightResult}, e.g. for exportResults.
+        """
+        return self._runGenerators(self.generators, display, structured=True)
+
+    # Live mode
+
+    def touch(self, *inputs):
+        """
+        Mark inputs as changed (all inputs if none are given), e.g. after a new bar
+        has been appended in place.
+        """
+        for name in inputs or INPUTS:
+            if name not in self.versions:
+                raise Exception(f"Unknown input: {name}")
+            self.versions[name] += 1
+        return self
+
+    def _inputFingerprints(self):
+        store = None
+        env = getattr(self.derivative, "env", None)
+        if env is not None:
+            store = env.getAssetStore()
+        baselines = [generator.opts.get("baseline") for generator in self.generators]
+        return {
+            "returns": _fingerprint(self.derivative.returns),
+            "values": _fingerprint(self.derivative.values),
+            "weights": _fingerprint(getattr(self.derivative, "weights", None)),
+            "baseline": tuple(
+                _fingerprint(getattr(baseline, "returns", None)) for baseline in baselines
+            ),
+            "assetStore": None if store is None else _storeFingerprint(store),
+        }
+
+    def updateInsights(self, display=True):
+        """
+        Live mode: rerun only the generators whose declared inputs have changed since
+        they last ran, reusing cached insights for the rest.
+
+        Inputs are versioned; a version is bumped by touch() or when the input's
+        fingerprint (identity, shape, last index) changes.
+        """
+        fingerprints = self._inputFingerprints()
+        for name, fingerprint in fingerprints.items():
+            if name in self.fingerprints and self.fingerprints[name] != fingerprint:
+                self.versions[name] += 1
+        self.fingerprints = fingerprints
+
+        versions = {
+            generator.getName(): tuple(self.versions[name] for name in generator.getInputs())
+            for generator in self.generators
+        }
+        stale = [
+            generator
+            for generator in self.generators
+            if self.cache.get(generator.getName(), (None,))[0] != versions[generator.getName()]
+        ]
+        for name, insight in self._runGenerators(stale, display).items():
+            self.cache[name] = (versions[name], insight)
+        return {generator.getName(): self.cache[generator.getName()][1] for generator in self.generators}
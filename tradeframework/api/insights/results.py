@@ -0,0 +1,80 @@
+import numbers
+import numpy as np
+import pandas as pd
+
+
+def _key(name, key):
+    # Nested names are dotted, except under the top level "value"
+    return str(key) if name == "value" else f"{name}.{key}"
+
+
+class InsightResult:
+    """
+    Structured result of an insight generator.
+
+    scalars     {name: number}
+    tables      {name: DataFrame}
+    series      {name: Series} indexed by timestamp
+    figures     {name: Figure}
+    raw         The value returned by getInsight
+    """
+
+    def __init__(
+        self,
+        generator,
+        derivative=None,
+        scalars=None,
+        tables=None,
+        series=None,
+        figures=None,
+        raw=None,
+    ):
+        self.generator = generator
+        self.derivative = derivative
+        self.scalars = scalars if scalars is not None else {}
+        self.tables = tables if tables is not None else {}
+        self.series = series if series is not None else {}
+        self.figures = figures if figures is not None else {}
+        self.raw = raw
+
+    @classmethod
+    def fromInsight(cls, generator, insight):
+        """
+        Structure a plain insight: numbers (and flags) become scalars, time indexed data becomes
+        series, other frames become tables and figures are kept as figures. Dicts are
+        structured per key. Anything else is only kept as raw.
+        """
+        result = cls(generator, raw=insight)
+        result._add("value", insight)
+        return result
+
+    def _add(self, name, value):
+        if value is None:
+            return
+        if isinstance(value, (numbers.Number, np.number, np.bool_)):
+            self.scalars[name] = float(value)
+        elif isinstance(value, pd.Series):
+            if isinstance(value.index, pd.DatetimeIndex):
+                self.series[name] = value
+            else:
+                self.tables[name] = value.to_frame(name)
+        elif isinstance(value, pd.DataFrame):
+            if isinstance(value.index, pd.DatetimeIndex):
+                for column in value.columns:
+                    self.series[_key(name, column)] = value[column]
+            else:
+                self.tables[name] = value
+        elif hasattr(value, "savefig"):
+            self.figures[name] = value
+        elif hasattr(value, "get_figure"):
+            self.figures[name] = value.get_figure()
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self._add(_key(name, key), item)
+
+    def __repr__(self):
+        return (
+            f"InsightResult({self.generator}, scalars={list(self.scalars)}, "
+            f"tables={list(self.tables)}, series={list(self.series)}, "
+            f"figures={list(self.figures)})"
+        )
@@ -4,10 +4,15 @@ import tradeframework.operations.plot as plotter
 
 class OHLCPlot(InsightGenerator):
 
+    inputs = ("values",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("options", None)
+        self.opts.setdefault("maxBars", 2000)  # None for full resolution
+        self.opts.setdefault("start", None)
+        self.opts.setdefault("end", None)
 
     def getInsight(self, derivative, display=True):
         return plotter.plotAsset(asset=derivative, **self.opts)
@@ -15,6 +20,8 @@ class OHLCPlot(InsightGenerator):
 
 class OHLCPlotByName(InsightGenerator):
 
+    inputs = ("values", "assetStore")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -22,6 +29,9 @@ class OHLCPlotByName(InsightGenerator):
             raise Exception("Missing parameter: assetName")
 
         self.opts.setdefault("options", None)
+        self.opts.setdefault("maxBars", 2000)  # None for full resolution
+        self.opts.setdefault("start", None)
+        self.opts.setdefault("end", None)
 
     def getInsight(self, derivative, display=True):
         return plotter.plotAssetByName(derivative=derivative, **self.opts)
@@ -29,6 +39,8 @@ class OHLCPlotByName(InsightGenerator):
 
 class OHLCPlotWeightedUnderlying(InsightGenerator):
 
+    inputs = ("weights", "assetStore")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -36,6 +48,9 @@ class OHLCPlotWeightedUnderlying(InsightGenerator):
             raise Exception("Missing parameter: underlyingName")
 
         self.opts.setdefault("options", None)
+        self.opts.setdefault("maxBars", 2000)  # None for full resolution
+        self.opts.setdefault("start", None)
+        self.opts.setdefault("end", None)
 
     def getInsight(self, derivative, display=True):
         return plotter.plotWeightedUnderlying(derivative=derivative, **self.opts)
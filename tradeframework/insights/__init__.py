@@ -1,6 +1,25 @@
-from .timeseries import TimeSeriesPlot, AutoCorrelationPlot, MACFPlot, MarkovRegimeFit
-from .analysis import StationarityTest, WhiteNoiseTest, NormalityTest
-from .correlation import CorrelationMap, CorrelationMatrix, CorrelationPairPlot
+from . import intermediates
+from .timeseries import (
+    TimeSeriesPlot,
+    AutoCorrelationPlot,
+    MACFPlot,
+    MACFSurface,
+    MarkovRegimeFit,
+)
+from .analysis import (
+    StationarityTest,
+    WhiteNoiseTest,
+    NormalityTest,
+    BatchStatisticalTests,
+    RollingStationarityTest,
+    RollingWhiteNoiseTest,
+)
+from .correlation import (
+    CorrelationMap,
+    CorrelationMatrix,
+    CorrelationPairPlot,
+    CorrelatedPairs,
+)
 from .basicPlot import BasicPlot
 from .OHLCPlot import OHLCPlot, OHLCPlotByName, OHLCPlotWeightedUnderlying
 from .tradeInfo import TradeInfo, UnderlyingAllocations
@@ -8,6 +27,24 @@ from .signals import Signals, UnderlyingSignals
 from .predictions import Predictions
 from .returns import RollingReturns, ReturnsPlot
 from .prices import RollingPrice
-from .performance import PerfSummary, Merton, PyfolioSummary, StatisticalTests
+from .performance import (
+    PerfSummary,
+    Merton,
+    RollingBeta,
+    RollingMerton,
+    PyfolioSummary,
+    TearSheet,
+    RollingPerformance,
+    Drawdowns,
+    StatisticalTests,
+)
 from .models import ARIMAFit
-from .metrics import PredictionPlot, PredictionMetrics, ConfusionMatrix
+from .metrics import (
+    PredictionPlot,
+    PredictionMetrics,
+    ConfusionMatrix,
+    RollingPredictionMetrics,
+    RollingConfusionMatrix,
+)
+from .distribution import ReturnDistribution
+from .risk import RollingRisk
@@ -1,9 +1,17 @@
 import pandas as pd
 import numpy as np
-from tradeframework.api.insights import InsightGenerator
-import tradeframework.operations.utils as utils
+from tradeframework.api.insights import InsightGenerator, InsightResult, Intermediate
 import statsmodels.api as sm
 import quantutils.core.statistics as stats
+from tradeframework.operations.diagnostics import (
+    rollingADF,
+    rollingLjungBox,
+    batchADF,
+    batchJarqueBera,
+    batchLjungBox,
+)
+from IPython.display import display as displayResult
+import tradeframework.operations.plot as plotter
 
 
 class StationarityTest(InsightGenerator):
@@ -16,21 +24,21 @@ class StationarityTest(InsightGenerator):
     c) Constant covariance (No autocorrelation)
     """
 
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("series", "returns")
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
 
-        del self.opts["series"]
-        result = stats.adf_test(series, self.opts)
+        opts = {k: v for k, v in self.opts.items() if k != "series"}
+        result = stats.adf_test(series, opts)
         if display:
             print()
             print("=============================================")
@@ -68,15 +76,31 @@ class StationarityTest(InsightGenerator):
                 print("Conclusion: Data is stationary")
         return result
 
+    def structure(self, insight):
+        scalars = {
+            "adf": insight[0],
+            "pvalue": insight[1],
+            "lags": insight[2],
+            "nobs": insight[3],
+        }
+        scalars.update({f"critical_{k}": v for k, v in insight[4].items()})
+        return InsightResult(self.getName(), scalars=scalars, raw=insight)
+
 
 class WhiteNoiseTest(InsightGenerator):
     """
     Test for AutoCorrelations
 
-    Utilises the Ljung-Box test
+    Utilises the Ljung-Box test, computed from the shared FFT correlogram. Other
+    acorr_ljungbox options in sm_opts (e.g. period, auto_lag) are run by statsmodels.
     https://www.statsmodels.org/dev/generated/statsmodels.stats.diagnostic.acorr_ljungbox.html
     """
 
+    inputs = ("returns", "values")
+
+    # sm_opts answered from the correlogram
+    NATIVE_OPTS = ("lags", "boxpierce", "model_df")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -84,17 +108,34 @@ class WhiteNoiseTest(InsightGenerator):
         self.opts.setdefault("series", "returns")
         self.opts.setdefault("sm_opts", {"lags": [20], "boxpierce": False})
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
+    def _smOpts(self):
+        # The result is always in the array layout (return_df=False)
+        return {k: v for k, v in self.opts["sm_opts"].items() if k != "return_df"}
 
-        result = sm.stats.diagnostic.acorr_ljungbox(
-            series, **self.opts["sm_opts"], return_df=False
-        )
+    def _native(self):
+        return set(self._smOpts()) <= set(self.NATIVE_OPTS)
+
+    def requires(self):
+        if not self._native():
+            return {"series": Intermediate("series", series=self.opts["series"])}
+        return {
+            "correlogram": Intermediate(
+                "correlogram",
+                series=self.opts["series"],
+                lags=int(np.max(self._smOpts().get("lags", 10))),
+            )
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self._native():
+            correlogram = self.resolve("correlogram", derivative, intermediates)
+            result = correlogram.ljungBox(**self._smOpts())
+        else:
+            series = self.resolve("series", derivative, intermediates)
+            table = sm.stats.diagnostic.acorr_ljungbox(
+                series.dropna(), **self._smOpts()
+            )
+            result = tuple(np.asarray(table[c]) for c in table.columns)
         if display:
             print()
             print("=============================================")
@@ -115,6 +156,23 @@ class WhiteNoiseTest(InsightGenerator):
 
         return result
 
+    def structure(self, insight):
+        lags = self.opts["sm_opts"].get("lags", 10)
+        lags = np.arange(1, lags + 1) if np.isscalar(lags) else np.asarray(lags)
+        if len(lags) != len(insight[0]):
+            # Chosen by statsmodels (auto_lag)
+            lags = np.arange(1, len(insight[0]) + 1)
+        columns = ["lb_stat", "lb_pvalue", "bp_stat", "bp_pvalue"][: len(insight)]
+        table = pd.DataFrame(
+            dict(zip(columns, insight)), index=pd.Index(lags, name="lag")
+        )
+        return InsightResult(
+            self.getName(),
+            scalars={"lb_stat": insight[0][0], "lb_pvalue": insight[1][0]},
+            tables={"ljung_box": table},
+            raw=insight,
+        )
+
 
 class NormalityTest(InsightGenerator):
     """
@@ -124,6 +182,8 @@ class NormalityTest(InsightGenerator):
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.jarque_bera.html
     """
 
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -131,13 +191,11 @@ class NormalityTest(InsightGenerator):
         self.opts.setdefault("series", "returns")
         self.opts.setdefault("sm_opts", {})
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
 
         result = sm.stats.stattools.jarque_bera(series, **self.opts["sm_opts"])
         if display:
@@ -159,3 +217,181 @@ class NormalityTest(InsightGenerator):
                 print("Conclusion: Data is Normally distributed")
 
         return result
+
+    def structure(self, insight):
+        return InsightResult(
+            self.getName(),
+            scalars=dict(zip(["jb", "pvalue", "skew", "kurtosis"], insight)),
+            raw=insight,
+        )
+
+
+class BatchStatisticalTests(InsightGenerator):
+    """
+    Jarque-Bera, Ljung-Box and Augmented Dickey-Fuller tests of the derivative and every
+    asset in the asset store (or asset_list) at once
+
+    One row per series with each statistic, p-value and verdict at the given level.
+    Missing values are dropped per series. With series="prices" the ADF test is run on
+    cumulative log returns (log prices) rather than returns.
+    """
+
+    inputs = ("returns", "assetStore")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("level", 0.95)
+        self.opts.setdefault("series", "returns")
+        self.opts.setdefault("asset_list", None)
+        self.opts.setdefault("lags", 20)
+        self.opts.setdefault("maxlag", 1)
+        self.opts.setdefault("workers", None)
+
+    def requires(self):
+        return {
+            "panel": Intermediate("returnsPanel", asset_list=self.opts["asset_list"])
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        panel = self.resolve("panel", derivative, intermediates)
+        alpha = 1 - self.opts["level"]
+
+        jb, jbPvalue, skew, kurtosis = batchJarqueBera(panel)
+        lb, lbPvalue = batchLjungBox(panel, lags=self.opts["lags"])
+        series = panel
+        if self.opts["series"] == "prices":
+            series = panel.cumsum().where(panel.notna())
+        adf, adfPvalue, nobs = batchADF(
+            series, maxlag=self.opts["maxlag"], workers=self.opts["workers"]
+        )
+
+        result = pd.DataFrame(
+            {
+                "jb": jb,
+                "jb_pvalue": jbPvalue,
+                "skew": skew,
+                "kurtosis": kurtosis,
+                "normal": jbPvalue >= alpha,
+                "lb_stat": lb,
+                "lb_pvalue": lbPvalue,
+                "white_noise": lbPvalue >= alpha,
+                "adf": adf,
+                "adf_pvalue": adfPvalue,
+                "stationary": adfPvalue < alpha,
+                "nobs": panel.notna().sum().values,
+            },
+            index=panel.columns,
+        )
+        if display:
+            displayResult(result)
+        return result
+
+
+class RollingStationarityTest(InsightGenerator):
+    """
+    Augmented Dickey-Fuller test over rolling (or expanding) windows
+
+    Shows when a series stops being stationary. Each window uses a constant and a fixed
+    lag order (no autolag), equivalent to adfuller(window, maxlag, autolag=None).
+    """
+
+    inputs = ("returns", "values")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("level", 0.95)
+        self.opts.setdefault("series", "returns")
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("expanding", False)
+        self.opts.setdefault("minPeriods", None)
+        self.opts.setdefault("maxlag", 1)
+        self.opts.setdefault("workers", None)
+
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        series = series.dropna()
+        statistic, pvalue, nobs = rollingADF(
+            series.values,
+            maxlag=self.opts["maxlag"],
+            window=self.opts["window"],
+            expanding=self.opts["expanding"],
+            minPeriods=self.opts["minPeriods"],
+            workers=self.opts["workers"],
+        )
+        result = pd.DataFrame(
+            {"adf": statistic, "pvalue": pvalue, "nobs": nobs}, index=series.index
+        )
+        result["stationary"] = result["pvalue"] < (1 - self.opts["level"])
+
+        if display:
+            feeds = [
+                {"data": result["pvalue"], "opts": {"label": "ADF p-value"}},
+                {
+                    "data": pd.Series(1 - self.opts["level"], index=result.index),
+                    "opts": {"label": f"{1 - self.opts['level']:.0%} level"},
+                },
+            ]
+            plotter.basicPlot(
+                title=f"Rolling Stationarity (ADF): {derivative.getName()}",
+                feeds=feeds,
+            )
+        return result
+
+
+class RollingWhiteNoiseTest(InsightGenerator):
+    """
+    Ljung-Box test for AutoCorrelations over rolling (or expanding) windows
+
+    Shows when a series starts to exhibit autocorrelation.
+    """
+
+    inputs = ("returns", "values")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("level", 0.95)
+        self.opts.setdefault("series", "returns")
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("expanding", False)
+        self.opts.setdefault("minPeriods", None)
+        self.opts.setdefault("lags", 20)
+
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        series = series.dropna()
+        statistic, pvalue = rollingLjungBox(
+            series.values,
+            lags=self.opts["lags"],
+            window=self.opts["window"],
+            expanding=self.opts["expanding"],
+            minPeriods=self.opts["minPeriods"],
+        )
+        result = pd.DataFrame(
+            {"lb_stat": statistic, "lb_pvalue": pvalue}, index=series.index
+        )
+        result["autocorrelated"] = result["lb_pvalue"] < (1 - self.opts["level"])
+
+        if display:
+            feeds = [
+                {"data": result["lb_pvalue"], "opts": {"label": "Ljung-Box p-value"}},
+                {
+                    "data": pd.Series(1 - self.opts["level"], index=result.index),
+                    "opts": {"label": f"{1 - self.opts['level']:.0%} level"},
+                },
+            ]
+            plotter.basicPlot(
+                title=f"Rolling White Noise (Ljung-Box): {derivative.getName()}",
+                feeds=feeds,
+            )
+        return result
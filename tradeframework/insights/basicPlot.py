@@ -4,6 +4,8 @@ import tradeframework.operations.plot as plotter
 
 class BasicPlot(InsightGenerator):
 
+    inputs = ("returns", "values", "baseline", "assetStore")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
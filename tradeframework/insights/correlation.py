@@ -1,112 +1,108 @@
-import pandas as pd
 import numpy as np
-from tradeframework.api.insights import InsightGenerator
-import tradeframework.operations.utils as utils
+from tradeframework.api.insights import InsightGenerator, Intermediate
+import tradeframework.operations.plot as plotter
+from tradeframework.operations.correlation import (
+    correlationMatrix,
+    correlatedPairs,
+    clusterOrder,
+    clusterLabels,
+    blockCorrelation,
+)
 from IPython.display import display as displayResult
 import seaborn
 import matplotlib.pyplot as plt
 
 
 class CorrelationMatrix(InsightGenerator):
+    inputs = ("returns", "baseline", "assetStore")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("baseline", None)
         self.opts.setdefault("asset_list", None)
         self.opts.setdefault("alt_series", None)
-
-    def getInsight(self, derivative, display=True):
-        result = utils.getPeriodLogReturns(derivative.returns).rename(
-            columns={"period": derivative.getName()}
-        )
-        if self.opts["baseline"] is not None:
-            result = result.join(
-                utils.getPeriodLogReturns(self.opts["baseline"].returns).rename(
-                    columns={"period": "Baseline"}
-                )
-            )
-        if self.opts["asset_list"]:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(
-                            derivative.env.findAsset(assetName).returns
-                        ).rename(columns={"period": assetName})
-                        for assetName in self.opts["asset_list"]
-                    ],
-                    axis=1,
-                )
-            )
-        else:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(asset.returns).rename(
-                            columns={"period": asset.getName()}
-                        )
-                        for asset in list(derivative.env.getAssetStore().store.values())
-                    ],
-                    axis=1,
-                )
+        self.opts.setdefault("blockSize", 512)  # Assets per tile of the correlation
+        self.opts.setdefault("workers", None)
+        self.opts.setdefault("path", None)  # Memory-map the matrix to this .npy file
+
+    def requires(self):
+        if self.opts["alt_series"] is not None:
+            return {}
+        return {
+            "panel": Intermediate(
+                "returnsPanel",
+                baseline=self.opts["baseline"],
+                asset_list=self.opts["asset_list"],
             )
+        }
 
-        if self.opts["alt_series"]:
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["alt_series"] is not None:
             result = self.opts["alt_series"]
+        else:
+            result = self.resolve("panel", derivative, intermediates)
 
-        corr = result.corr()
+        corr = correlationMatrix(
+            result,
+            blockSize=self.opts["blockSize"],
+            workers=self.opts["workers"],
+            path=self.opts["path"],
+        )
         if display:
             displayResult(corr)
         return corr
 
 
 class CorrelationMap(InsightGenerator):
+    inputs = ("returns", "baseline", "assetStore")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("baseline", None)
         self.opts.setdefault("asset_list", None)
         self.opts.setdefault("alt_series", None)
-        self.opts.setdefault("threshold", 0.8)
-
-    def getInsight(self, derivative, display=True):
-        result = utils.getPeriodLogReturns(derivative.returns).rename(
-            columns={"period": derivative.getName()}
-        )
-        if self.opts["baseline"] is not None:
-            result = result.join(
-                utils.getPeriodLogReturns(self.opts["baseline"].returns).rename(
-                    columns={"period": "Baseline"}
-                )
-            )
-        if self.opts["asset_list"]:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(
-                            derivative.env.findAsset(assetName).returns
-                        ).rename(columns={"period": assetName})
-                        for assetName in self.opts["asset_list"]
-                    ],
-                    axis=1,
-                )
-            )
-        else:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(asset.returns).rename(
-                            columns={"period": asset.getName()}
-                        )
-                        for asset in list(derivative.env.getAssetStore().store.values())
-                    ],
-                    axis=1,
-                )
+        self.opts.setdefault("blockSize", 512)  # Assets per tile of the correlation
+        self.opts.setdefault("workers", None)
+        self.opts.setdefault("path", None)  # Memory-map the matrix to this .npy file
+        # Large universes are drawn as a clustered raster with sparse annotations
+        self.opts.setdefault("largeUniverse", 50)  # Assets above which to use it
+        self.opts.setdefault("cluster", True)  # Reorder by hierarchical clustering
+        self.opts.setdefault("topK", None)  # Annotate the topK partners of each asset
+        self.opts.setdefault("threshold", None if self.opts["topK"] else 0.8)
+        self.opts.setdefault("maxAnnotations", 100)
+        self.opts.setdefault("blocks", None)  # Collapse into this many clusters
+
+    def requires(self):
+        if self.opts["alt_series"] is not None:
+            return {}
+        return {
+            "panel": Intermediate(
+                "returnsPanel",
+                baseline=self.opts["baseline"],
+                asset_list=self.opts["asset_list"],
             )
+        }
 
-        if self.opts["alt_series"]:
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["alt_series"] is not None:
             result = self.opts["alt_series"]
+        else:
+            result = self.resolve("panel", derivative, intermediates)
+
+        corr = correlationMatrix(
+            result,
+            blockSize=self.opts["blockSize"],
+            workers=self.opts["workers"],
+            path=self.opts["path"],
+        )
+        if len(corr) > self.opts["largeUniverse"] or self.opts["blocks"]:
+            fig = self.largeUniverse(corr)
+            if display:
+                displayResult(fig)
+            return fig
 
-        corr = result.corr()
         with plt.style.context("seaborn-darkgrid"):
             _, ax = plt.subplots(figsize=(15, 10))
             seaborn.heatmap(
@@ -123,53 +119,117 @@ class CorrelationMap(InsightGenerator):
 
         return ax.get_figure()
 
+    def largeUniverse(self, corr):
+        title = "Correlation Map"
+        if self.opts["blocks"]:
+            labels = clusterLabels(corr, self.opts["blocks"])
+            corr = blockCorrelation(corr, labels)
+            title = f"Correlation Map ({len(corr)} clusters)"
+        if self.opts["cluster"]:
+            order = clusterOrder(corr)
+            corr = corr.iloc[order, order]
+        return plotter.correlationPlot(
+            corr,
+            threshold=self.opts["threshold"],
+            topK=self.opts["topK"],
+            maxAnnotations=self.opts["maxAnnotations"],
+            title=title,
+        )
+
+
+class CorrelatedPairs(InsightGenerator):
+    """
+    Find the pairs of assets (and the derivative) that are highly correlated
+
+    Keeps the pairs with |correlation| above the threshold (default 0.8, or none with
+    topK), and with topK only the topK partners of each asset, without building the full
+    correlation matrix. With derivativeOnly, only pairs with the derivative's column are
+    searched. Returns a sparse edge list.
+    """
+
+    inputs = ("returns", "baseline", "assetStore")
 
-class CorrelationPairPlot(InsightGenerator):
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("baseline", None)
         self.opts.setdefault("asset_list", None)
         self.opts.setdefault("alt_series", None)
-        self.opts.setdefault("threshold", 0.8)
-
-    def getInsight(self, derivative, display=True):
-        result = utils.getPeriodLogReturns(derivative.returns).rename(
-            columns={"period": derivative.getName()}
-        )
-        if self.opts["baseline"] is not None:
-            result = result.join(
-                utils.getPeriodLogReturns(self.opts["baseline"].returns).rename(
-                    columns={"period": "Baseline"}
-                )
-            )
-        if self.opts["asset_list"]:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(
-                            derivative.env.findAsset(assetName).returns
-                        ).rename(columns={"period": assetName})
-                        for assetName in self.opts["asset_list"]
-                    ],
-                    axis=1,
-                )
+        self.opts.setdefault("topK", None)
+        self.opts.setdefault("threshold", None if self.opts["topK"] else 0.8)
+        self.opts.setdefault("derivativeOnly", False)
+        self.opts.setdefault("blockSize", 512)
+        self.opts.setdefault("workers", None)
+
+    def requires(self):
+        if self.opts["alt_series"] is not None:
+            return {}
+        return {
+            "panel": Intermediate(
+                "returnsPanel",
+                baseline=self.opts["baseline"],
+                asset_list=self.opts["asset_list"],
             )
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["alt_series"] is not None:
+            result = self.opts["alt_series"]
         else:
-            result = result.join(
-                pd.concat(
-                    [
-                        utils.getPeriodLogReturns(asset.returns).rename(
-                            columns={"period": asset.getName()}
-                        )
-                        for asset in list(derivative.env.getAssetStore().store.values())
-                    ],
-                    axis=1,
+            result = self.resolve("panel", derivative, intermediates)
+
+        focus = None
+        if self.opts["derivativeOnly"]:
+            if derivative.getName() not in result.columns:
+                raise Exception(
+                    f"derivativeOnly needs a {derivative.getName()} column in the series"
                 )
+            focus = [result.columns.get_loc(derivative.getName())]
+
+        edges = correlatedPairs(
+            result.values,
+            threshold=self.opts["threshold"],
+            topK=self.opts["topK"],
+            focus=focus,
+            blockSize=self.opts["blockSize"],
+            workers=self.opts["workers"],
+        )
+        names = np.asarray(result.columns)
+        edges["a"] = names[edges["a"].values]
+        edges["b"] = names[edges["b"].values]
+
+        if display:
+            displayResult(edges)
+        return edges
+
+
+class CorrelationPairPlot(InsightGenerator):
+    inputs = ("returns", "baseline", "assetStore")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("baseline", None)
+        self.opts.setdefault("asset_list", None)
+        self.opts.setdefault("alt_series", None)
+        self.opts.setdefault("threshold", 0.8)
+
+    def requires(self):
+        if self.opts["alt_series"] is not None:
+            return {}
+        return {
+            "panel": Intermediate(
+                "returnsPanel",
+                baseline=self.opts["baseline"],
+                asset_list=self.opts["asset_list"],
             )
+        }
 
-        if self.opts["alt_series"]:
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["alt_series"] is not None:
             result = self.opts["alt_series"]
+        else:
+            result = self.resolve("panel", derivative, intermediates)
 
         with plt.style.context("seaborn-darkgrid"):
             pairMap = seaborn.PairGrid(result)
@@ -0,0 +1,96 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from tradeframework.api.insights import InsightGenerator, Intermediate
+import tradeframework.operations.plot as plotter
+from tradeframework.operations.sketches import SketchStore
+from IPython.display import display as displayResult
+
+
+class ReturnDistribution(InsightGenerator):
+    """
+    Summarise the distribution of a series with mergeable sketches
+
+    The series is sketched per period (default daily) into a fixed-edge histogram and a
+    t-digest quantile sketch. If a path (directory) is given the sketches are persisted,
+    one file per derivative, series and freq, and later runs only sketch periods that
+    have not been seen before.
+
+    Edges default to +/-5% for returns, and to a spread around the first data sketched for
+    other series.
+    """
+
+    inputs = ("returns", "values")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("series", "returns")
+        returns = (
+            isinstance(self.opts["series"], str) and self.opts["series"] == "returns"
+        )
+        self.opts.setdefault(
+            "edges", np.linspace(-0.05, 0.05, 201) if returns else None
+        )
+        self.opts.setdefault("compression", 500)
+        self.opts.setdefault("freq", "D")
+        self.opts.setdefault("path", None)
+        self.opts.setdefault("start", None)
+        self.opts.setdefault("end", None)
+        self.opts.setdefault(
+            "quantiles", [0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999]
+        )
+
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        # Stored sketches are per derivative, series and freq
+        seriesName = self.opts["series"]
+        if not isinstance(seriesName, str):
+            seriesName = getattr(seriesName, "name", None) or "series"
+        key = f"{derivative.getName()}__{seriesName}__{self.opts['freq']}"
+        path = self.opts["path"]
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, re.sub(r"[^\w.-]", "_", key) + ".npz")
+
+        store = SketchStore(
+            self.opts["edges"],
+            compression=self.opts["compression"],
+            freq=self.opts["freq"],
+            path=path,
+            key=key,
+        ).update(series)
+        sketch = store.summary(start=self.opts["start"], end=self.opts["end"])
+
+        edges = sketch.histogram.edges
+        histogram = pd.DataFrame(
+            {"left": edges[:-1], "right": edges[1:], "count": sketch.histogram.counts}
+        )
+        quantiles = pd.Series(
+            sketch.quantiles.quantile(self.opts["quantiles"]),
+            index=pd.Index(self.opts["quantiles"], name="quantile"),
+        )
+
+        if display:
+            displayResult(
+                plotter.histogram(
+                    None,
+                    title=f"Distribution: {derivative.getName()}",
+                    counts=sketch.histogram.counts,
+                    bins=edges,
+                )
+            )
+            displayResult(quantiles)
+
+        return {
+            "histogram": histogram,
+            "quantiles": quantiles,
+            "underflow": sketch.histogram.underflow,
+            "overflow": sketch.histogram.overflow,
+        }
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from tradeframework.api.insights import Intermediate, registerIntermediate
+import tradeframework.operations.utils as utils
+from tradeframework.operations.autocorrelation import Correlogram
+from tradeframework.operations.ledger import derivativeLedger
+from tradeframework.operations.precision import getDtype
+
+# Intermediates shared between the generators in this package. Values are shared between
+# consumers, so generators must copy before modifying them.
+
+
+@registerIntermediate("periodReturns")
+def periodReturns(derivative, deps, asset=None):
+    asset = derivative if asset is None else asset
+    return utils.getPeriodReturns(asset.returns)["period"]
+
+
+@registerIntermediate("periodLogReturns")
+def periodLogReturns(derivative, deps, asset=None):
+    asset = derivative if asset is None else asset
+    return utils.getPeriodLogReturns(asset.returns)["period"]
+
+
+@registerIntermediate("tradedReturns")
+def tradedReturns(derivative, deps, asset=None):
+    asset = derivative if asset is None else asset
+    return utils.getTradedReturns(utils.getPeriodReturns(asset.returns))["period"]
+
+
+def _seriesRequires(derivative, series="returns"):
+    if isinstance(series, str) and series == "returns":
+        return {"returns": Intermediate("periodLogReturns")}
+    return {}
+
+
+@registerIntermediate("series", requires=_seriesRequires)
+def selectSeries(derivative, deps, series="returns"):
+    # The "series" option used by the time series generators: log prices, log returns or
+    # a user supplied series
+    if not isinstance(series, str):
+        return series
+    elif series == "prices":
+        return np.log(derivative.values["Close"])
+    elif series == "returns":
+        return deps["returns"]
+    raise Exception(f"Unknown series: {series}")
+
+
+def _correlogramRequires(derivative, series="returns", lags=30, alpha=0.05):
+    return {"series": Intermediate("series", series=series)}
+
+
+@registerIntermediate("correlogram", requires=_correlogramRequires)
+def correlogram(derivative, deps, series="returns", lags=30, alpha=0.05):
+    return Correlogram(deps["series"], nlags=lags, alpha=alpha)
+
+
+def _panelRequires(derivative, baseline=None, asset_list=None):
+    deps = {"derivative": Intermediate("periodLogReturns")}
+    if baseline is not None:
+        deps["baseline"] = Intermediate("periodLogReturns", asset=baseline)
+    if asset_list:
+        assets = {name: derivative.env.findAsset(name) for name in asset_list}
+    else:
+        assets = {
+            asset.getName(): asset
+            for asset in list(derivative.env.getAssetStore().store.values())
+        }
+    for name, asset in assets.items():
+        deps[f"asset:{name}"] = Intermediate("periodLogReturns", asset=asset)
+    return deps
+
+
+@registerIntermediate("returnsPanel", requires=_panelRequires)
+def returnsPanel(derivative, deps, baseline=None, asset_list=None):
+    # Aligned log returns of the derivative, baseline and assets, one column each, in the
+    # compute dtype
+    result = deps["derivative"].rename(derivative.getName()).to_frame()
+    if "baseline" in deps:
+        result = result.join(deps["baseline"].rename("Baseline"))
+    assets = [
+        deps[alias].rename(alias[len("asset:") :])
+        for alias in deps
+        if alias.startswith("asset:")
+    ]
+    if assets:
+        result = result.join(pd.concat(assets, axis=1))
+    return result.astype(getDtype(), copy=False)
+
+
+def _componentRequires(derivative, underlying=True):
+    deps = {"derivative": Intermediate("periodReturns")}
+    if underlying:
+        for asset in derivative.weightedAssets:
+            deps[f"asset:{asset.getName()}"] = Intermediate(
+                "periodReturns", asset=asset
+            )
+    return deps
+
+
+@registerIntermediate("componentReturns", requires=_componentRequires)
+def componentReturns(derivative, deps, underlying=True):
+    # Aligned period returns of the derivative and (optionally) each weighted underlying,
+    # one column each
+    return pd.concat(
+        [deps["derivative"].rename(derivative.getName())]
+        + [
+            deps[alias].rename(alias[len("asset:") :])
+            for alias in deps
+            if alias.startswith("asset:")
+        ],
+        axis=1,
+    )
+
+
+@registerIntermediate("ledger")
+def ledger(derivative, deps):
+    # (trades, allocation changes) of every underlying
+    return derivativeLedger(derivative)
@@ -1,10 +1,15 @@
-from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights import InsightGenerator, InsightResult, Intermediate
 import quantutils.core.statistics as stats
 import quantutils.dataset.pipeline as ppl
 import quantutils.dataset.ml as mlUtils
-import tradeframework.operations.utils as utils
 import numpy as np
+import pandas as pd
 import tradeframework.operations.plot as plotter
+from tradeframework.operations.evaluation import (
+    classify,
+    rollingRegressionMetrics,
+    rollingClassificationMetrics,
+)
 from IPython.display import display as displayResult
 
 import matplotlib.pyplot as plt
@@ -31,6 +36,8 @@ class PredictionPlot(InsightGenerator):
     If residuals, do not transform the predictions or residual to original data domain.
     """
 
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -40,18 +47,26 @@ class PredictionPlot(InsightGenerator):
         self.opts.setdefault("actuals", None)
         self.opts.setdefault("residuals", None)
 
-    def getInsight(self, derivative, display=True):
+    def requires(self):
+        requires = {}
+        if self.opts["predictions"] is None:
+            requires["predictions"] = Intermediate("periodLogReturns")
+        if self.opts["actuals"] is None:
+            requires["actual"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
         if self.opts["predictions"] is not None:
             x_series = self.opts["predictions"]
         else:
-            x_series = utils.getPeriodLogReturns(derivative.returns)["period"]
+            x_series = self.resolve("predictions", derivative, intermediates)
 
         if self.opts["actuals"] is not None:
             y_series = self.opts["actuals"]
         else:
-            y_series = utils.getPeriodLogReturns(self.opts["baseline"].returns)[
-                "period"
-            ]
+            y_series = self.resolve("actual", derivative, intermediates)
         if self.opts["residuals"] is not None:
             residuals = self.opts["residuals"]
         else:
@@ -114,6 +129,8 @@ class PredictionMetrics(InsightGenerator):
     MDA     Wins / Total
     """
 
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -122,48 +139,60 @@ class PredictionMetrics(InsightGenerator):
         self.opts.setdefault("ddof", 0)
         self.opts.setdefault("threshold", 0.5)
 
-    def getInsight(self, derivative, display=True):
+    def requires(self):
+        requires = {}
+        if self.opts["predictions"] is None:
+            requires["predictions"] = Intermediate("periodLogReturns")
+        if self.opts["actual"] is None:
+            requires["actual"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
         if self.opts["predictions"] is not None:
             predictions = self.opts["predictions"]
         else:
-            predictions = utils.getPeriodLogReturns(derivative.returns)["period"]
+            predictions = self.resolve("predictions", derivative, intermediates)
 
         if self.opts["actual"] is not None:
             actual = self.opts["actual"]
         else:
-            actual = utils.getPeriodLogReturns(self.opts["baseline"].returns)["period"]
-
-        mfe = stats.mean_forecast_err(actual, predictions)
-        mae = mean_absolute_error(actual, predictions)
-        mape = mean_absolute_percentage_error(actual, predictions)
-        mse = mean_squared_error(actual, predictions)
-        me = max_error(actual, predictions)
-        r2 = r2_score(actual, predictions)
-        rse = stats.residual_standard_error(actual, predictions)
-        mase = stats.mean_absolute_standard_error(actual, predictions)
-        mda = stats.mean_directional_accuracy(actual, predictions)
-        msa = stats.mean_sign_accuracy(actual, predictions)
-
-        print()
-        print("=================================================")
-        print("Regression Metrics")
-        print("=================================================")
-        print()
-        print(f"Mean Forecast Error (MFE): {np.format_float_positional(mfe)}")
-        print(f"Mean Absolute Error (MAE): {np.format_float_positional(mae)}")
-        print(f"Max. Error: {np.format_float_positional(me)}")
-        print(f"Residual Standard Error (RSE): {np.format_float_positional(rse)}")
-        print(
-            f"Mean Absolute Percentage Error (MAPE): {np.format_float_positional(mape)}"
-        )
-        print(
-            f"Mean Absolute Standard Error (MASE): {np.format_float_positional(mase)}"
-        )
-        # print(f"Mean Squared Error (MSE): {np.format_float_positional(mse)}")
-        print()
-        print(f"R-Squared: {np.format_float_positional(r2)}")
-        print(f"Mean Directional Accuracy (MDA): {np.format_float_positional(mda)}%")
-        print(f"Mean Sign Accuracy (MSA): {np.format_float_positional(msa)}%")
+            actual = self.resolve("actual", derivative, intermediates)
+
+        metrics = {
+            "mfe": stats.mean_forecast_err(actual, predictions),
+            "mae": mean_absolute_error(actual, predictions),
+            "mape": mean_absolute_percentage_error(actual, predictions),
+            "mse": mean_squared_error(actual, predictions),
+            "me": max_error(actual, predictions),
+            "r2": r2_score(actual, predictions),
+            "rse": stats.residual_standard_error(actual, predictions),
+            "mase": stats.mean_absolute_standard_error(actual, predictions),
+            "mda": stats.mean_directional_accuracy(actual, predictions),
+            "msa": stats.mean_sign_accuracy(actual, predictions),
+        }
+
+        if display:
+            fmt = {k: np.format_float_positional(v) for k, v in metrics.items()}
+            print()
+            print("=================================================")
+            print("Regression Metrics")
+            print("=================================================")
+            print()
+            print(f"Mean Forecast Error (MFE): {fmt['mfe']}")
+            print(f"Mean Absolute Error (MAE): {fmt['mae']}")
+            print(f"Max. Error: {fmt['me']}")
+            print(f"Residual Standard Error (RSE): {fmt['rse']}")
+            print(f"Mean Absolute Percentage Error (MAPE): {fmt['mape']}")
+            print(f"Mean Absolute Standard Error (MASE): {fmt['mase']}")
+            # print(f"Mean Squared Error (MSE): {fmt['mse']}")
+            print()
+            print(f"R-Squared: {fmt['r2']}")
+            print(f"Mean Directional Accuracy (MDA): {fmt['mda']}%")
+            print(f"Mean Sign Accuracy (MSA): {fmt['msa']}%")
+
+        return metrics
 
 
 class ConfusionMatrix(InsightGenerator):
@@ -174,6 +203,8 @@ class ConfusionMatrix(InsightGenerator):
     Can be used to provide alternative data.
     """
 
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -183,39 +214,41 @@ class ConfusionMatrix(InsightGenerator):
         self.opts.setdefault("normalize", None)
         self.opts.setdefault("returnsData", True)  # Convert to predictions?
 
-    def getInsight(self, derivative, display=True):
+    def requires(self):
+        requires = {}
+        if self.opts["predictions"] is None:
+            requires["predictions"] = Intermediate("periodLogReturns")
+        if self.opts["actual"] is None:
+            requires["actual"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        returnsData = self.opts["returnsData"]
         if self.opts["predictions"] is not None:
             predicted = self.opts["predictions"]
         else:
-            predicted = utils.getPeriodLogReturns(derivative.returns)["period"]
-            self.opts["returnsData"] = True
+            predicted = self.resolve("predictions", derivative, intermediates)
+            returnsData = True
 
         if self.opts["actual"] is not None:
             actuals = self.opts["actual"]
         else:
-            actuals = utils.getPeriodLogReturns(self.opts["baseline"].returns)["period"]
-            self.opts["returnsData"] = True
+            actuals = self.resolve("actual", derivative, intermediates)
+            returnsData = True
 
+        # Flip the sign if the predictions are returns and the baseline went down.
+        # If baseline went down, and our return went up, we must have predicted down correctly (True Negative)
+        # If baseline went down, and our return went down, we must have predicted up incorrectly (False Negative)
+        actual, predictions, labels = classify(
+            actuals, predicted, returnsData, self.opts["noHold"]
+        )
         if self.opts["noHold"]:
-            index = actuals[actuals != 0].index.intersection(
-                predicted[predicted != 0].index
-            )
-            actuals = actuals.loc[index]
-            predicted = predicted.loc[index]
+            actuals = actuals.loc[actual.index]
             displayLabels = ["Buy", "Sell"]
-            labels = [1, -1]
         else:
             displayLabels = ["Buy", "Hold", "Sell"]
-            abels = [1, 0, -1]
-
-        actual = np.sign(actuals)
-        predictions = np.sign(predicted)
-
-        # Flip the sign if the predictions are returns and the baseline went down.
-        # If baseline went down, and our return went up, we must have predicted down correctly (True Negative)
-        # If baseline went down, and our return went down, we must have predicted up incorrectly (False Negative)
-        if self.opts["returnsData"]:
-            predictions[actual == -1] = np.negative(predictions[actual == -1])
 
         cf = confusion_matrix(
             actual, predictions, labels=labels, normalize=self.opts["normalize"]
@@ -299,3 +332,150 @@ class ConfusionMatrix(InsightGenerator):
             displayResult(cm_display.figure_)
 
         return cf
+
+    def structure(self, insight):
+        displayLabels = (
+            ["Buy", "Sell"] if self.opts["noHold"] else ["Buy", "Hold", "Sell"]
+        )
+        table = pd.DataFrame(insight, index=displayLabels, columns=displayLabels)
+        scalars = {}
+        if self.opts["normalize"] in (None, "all"):
+            accuracy = np.trace(insight) / np.sum(insight)
+            scalars = {"accuracy": accuracy, "ic": (accuracy * 2) - 1}
+        return InsightResult(
+            self.getName(),
+            scalars=scalars,
+            tables={"confusion_matrix": table},
+            raw=insight,
+        )
+
+
+class RollingPredictionMetrics(InsightGenerator):
+    """
+    Walk-forward PredictionMetrics over rolling (or expanding) windows
+
+    Shows how the edge of a model decays over time: MFE, MAE, MSE, RSE, R2, MDA and MSA
+    of the window ending at each bar, computed in one pass from cumulative sums.
+    """
+
+    inputs = ("returns", "baseline")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("actual", None)
+        self.opts.setdefault("predictions", None)
+        self.opts.setdefault("ddof", 0)
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("expanding", False)
+        self.opts.setdefault("minPeriods", None)
+        self.opts.setdefault("metrics", ["mda", "msa"])  # Plotted
+
+    def requires(self):
+        requires = {}
+        if self.opts["predictions"] is None:
+            requires["predictions"] = Intermediate("periodLogReturns")
+        if self.opts["actual"] is None:
+            requires["actual"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["predictions"] is not None:
+            predictions = self.opts["predictions"]
+        else:
+            predictions = self.resolve("predictions", derivative, intermediates)
+
+        if self.opts["actual"] is not None:
+            actual = self.opts["actual"]
+        else:
+            actual = self.resolve("actual", derivative, intermediates)
+
+        result = rollingRegressionMetrics(
+            actual,
+            predictions,
+            window=self.opts["window"],
+            expanding=self.opts["expanding"],
+            minPeriods=self.opts["minPeriods"],
+            ddof=self.opts["ddof"],
+        )
+
+        if display:
+            feeds = [
+                {"data": result[metric], "opts": {"label": metric.upper()}}
+                for metric in self.opts["metrics"]
+            ]
+            plotter.basicPlot(
+                title=f"Rolling Prediction Metrics: {derivative.getName()}",
+                feeds=feeds,
+            )
+        return result
+
+
+class RollingConfusionMatrix(InsightGenerator):
+    """
+    Walk-forward ConfusionMatrix metrics over rolling (or expanding) windows
+
+    Accuracy, information coefficient and Buy/Sell precision and recall of the window
+    ending at each bar, from running confusion matrix counts.
+    """
+
+    inputs = ("returns", "baseline")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("actual", None)
+        self.opts.setdefault("predictions", None)
+        self.opts.setdefault("noHold", False)  # Eliminate 0 value entries
+        self.opts.setdefault("returnsData", True)  # Convert to predictions?
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("expanding", False)
+        self.opts.setdefault("minPeriods", None)
+        self.opts.setdefault("metrics", ["accuracy", "ic"])  # Plotted
+
+    def requires(self):
+        requires = {}
+        if self.opts["predictions"] is None:
+            requires["predictions"] = Intermediate("periodLogReturns")
+        if self.opts["actual"] is None:
+            requires["actual"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        returnsData = self.opts["returnsData"]
+        if self.opts["predictions"] is not None:
+            predicted = self.opts["predictions"]
+        else:
+            predicted = self.resolve("predictions", derivative, intermediates)
+            returnsData = True
+
+        if self.opts["actual"] is not None:
+            actuals = self.opts["actual"]
+        else:
+            actuals = self.resolve("actual", derivative, intermediates)
+            returnsData = True
+
+        result = rollingClassificationMetrics(
+            actuals,
+            predicted,
+            window=self.opts["window"],
+            expanding=self.opts["expanding"],
+            minPeriods=self.opts["minPeriods"],
+            returnsData=returnsData,
+            noHold=self.opts["noHold"],
+        )
+
+        if display:
+            feeds = [
+                {"data": result[metric], "opts": {"label": metric}}
+                for metric in self.opts["metrics"]
+            ]
+            plotter.basicPlot(
+                title=f"Rolling Classification Metrics: {derivative.getName()}",
+                feeds=feeds,
+            )
+        return result
@@ -1,7 +1,5 @@
-from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights import InsightGenerator, InsightResult, Intermediate
 import quantutils.core.statistics as stats
-import tradeframework.operations.utils as utils
-import numpy as np
 import warnings
 from IPython.display import display as displayResult
 
@@ -11,23 +9,27 @@ class ARIMAFit(InsightGenerator):
     Fits an ARIMA regression model to the specified time series
     """
 
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("order", None)  # Tuple of AR,I,MA
         self.opts.setdefault("series", "returns")
 
-    def getInsight(self, derivative, display=True):
-        warnings.filterwarnings("ignore")
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
 
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
 
-        result = stats.ARIMAFit(ts=series, order=self.opts["order"], display=True)
+        # Only the convergence and frequency warnings raised within statsmodels, and only
+        # for the duration of the fit
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", module="statsmodels")
+            result = stats.ARIMAFit(
+                ts=series, order=self.opts["order"], display=display
+            )
 
         if display:
             print("=================================================")
@@ -35,3 +37,11 @@ class ARIMAFit(InsightGenerator):
             print("=================================================")
             displayResult(result.params)
         return result
+
+    def structure(self, insight):
+        return InsightResult(
+            self.getName(),
+            scalars={"aic": insight.aic, "bic": insight.bic, "llf": insight.llf},
+            tables={"params": insight.params},
+            raw=insight,
+        )
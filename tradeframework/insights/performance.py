@@ -1,7 +1,9 @@
-from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights import InsightGenerator, Intermediate
 import quantutils.core.statistics as stats
-import tradeframework.operations.utils as utils
 from IPython.display import display as displayResult
+import tradeframework.operations.plot as plotter
+import tradeframework.operations.tearsheet as tearsheet
+from tradeframework.operations.regression import rollingBeta
 import warnings
 import pyfolio
 
@@ -10,16 +12,26 @@ import pyfolio
 
 
 class PerfSummary(InsightGenerator):
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("baseline", None)
 
-    def getInsight(self, derivative, display=True):
-        returns = utils.getPeriodReturns(derivative.returns)["period"]
-        baseline = self.opts["baseline"]
-        if baseline is not None:
-            baseline = utils.getPeriodLogReturns(baseline.returns)["period"]
+    def requires(self):
+        requires = {"returns": Intermediate("periodReturns")}
+        if self.opts["baseline"] is not None:
+            requires["baseline"] = Intermediate(
+                "periodLogReturns", asset=self.opts["baseline"]
+            )
+        return requires
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        returns = self.resolve("returns", derivative, intermediates)
+        baseline = None
+        if self.opts["baseline"] is not None:
+            baseline = self.resolve("baseline", derivative, intermediates)
 
         if display:
             stats.statistics(ts=returns, baseline=baseline)
@@ -27,34 +39,243 @@ class PerfSummary(InsightGenerator):
 
 
 class Merton(InsightGenerator):
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         if not opts["baseline"]:
             raise Exception("Missing parameter: baseline")
 
-    def getInsight(self, derivative, display=True):
-        returns = utils.getPeriodReturns(derivative.returns)["period"]
-        baseline = utils.getPeriodReturns(self.opts["baseline"].returns)["period"]
+    def requires(self):
+        return {
+            "returns": Intermediate("periodReturns"),
+            "baseline": Intermediate("periodReturns", asset=self.opts["baseline"]),
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        returns = self.resolve("returns", derivative, intermediates)
+        baseline = self.resolve("baseline", derivative, intermediates)
         return stats.merton(model_ret=returns, baseline_ret=baseline, display=display)
 
 
+class RollingBeta(InsightGenerator):
+    """
+    Alpha and beta against the baseline over rolling (or expanding) windows, or with
+    exponentially decaying weights when a halflife (in bars) is given.
+    """
+
+    inputs = ("returns", "baseline")
+    timing = False
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        if not opts["baseline"]:
+            raise Exception("Missing parameter: baseline")
+
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("expanding", False)
+        self.opts.setdefault("minPeriods", None)
+        self.opts.setdefault("halflife", None)
+
+    def requires(self):
+        return {
+            "returns": Intermediate("periodReturns"),
+            "baseline": Intermediate("periodReturns", asset=self.opts["baseline"]),
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        result = rollingBeta(
+            self.resolve("returns", derivative, intermediates),
+            self.resolve("baseline", derivative, intermediates),
+            timing=self.timing,
+            window=self.opts["window"],
+            expanding=self.opts["expanding"],
+            minPeriods=self.opts["minPeriods"],
+            halflife=self.opts["halflife"],
+        )
+
+        if display:
+            coefficients = ["beta", "timing"] if self.timing else ["beta"]
+            plotter.basicPlot(
+                title=f"{self.getName()}: {derivative.getName()}",
+                feeds=[
+                    {"data": result[name], "opts": {"label": name}}
+                    for name in coefficients
+                ],
+            )
+            plotter.basicPlot(
+                title=f"{self.getName()} t-stats: {derivative.getName()}",
+                feeds=[
+                    {"data": result[f"{name}_t"], "opts": {"label": name}}
+                    for name in ["alpha"] + coefficients
+                ],
+            )
+        return result
+
+
+class RollingMerton(RollingBeta):
+    """
+    Henriksson-Merton market timing regression against the baseline over rolling
+    windows (as RollingBeta): alpha, beta and the timing coefficient of max(0, -baseline).
+    """
+
+    timing = True
+
+
 class PyfolioSummary(InsightGenerator):
+    inputs = ("returns",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         if not opts["baseline"]:
             raise Exception("Missing parameter: baseline")
 
-    def getInsight(self, derivative, display=True):
+    def requires(self):
+        return {"returns": Intermediate("periodReturns")}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
         # Show generic statistics
-        warnings.filterwarnings("ignore")
-        pyfolio.create_returns_tear_sheet(
-            utils.getPeriodReturns(derivative.returns)["period"]
+        # Only the deprecation warnings raised within pyfolio and empyrical
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", module="pyfolio|empyrical")
+            pyfolio.create_returns_tear_sheet(
+                self.resolve("returns", derivative, intermediates)
+            )
+
+
+class TearSheet(InsightGenerator):
+    """
+    Returns tear sheet (as PyfolioSummary) computed natively: summary statistics,
+    cumulative returns, rolling volatility and Sharpe, drawdowns, monthly and annual
+    returns and return quantiles. The figure is only drawn when displaying.
+    """
+
+    inputs = ("returns",)
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("window", 126)
+        self.opts.setdefault("periods", 252)
+        self.opts.setdefault("top", 5)
+
+    def requires(self):
+        return {"returns": Intermediate("periodReturns")}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        sheet = tearsheet.tearSheet(
+            self.resolve("returns", derivative, intermediates),
+            window=self.opts["window"],
+            periods=self.opts["periods"],
+            top=self.opts["top"],
+        )
+        if display:
+            displayResult(plotter.tearSheetPlot(sheet, title=self.getName()))
+            displayResult(sheet["drawdowns"])
+        return sheet
+
+
+class RollingPerformance(InsightGenerator):
+    """
+    Rolling annualised mean, volatility, downside deviation, Sharpe and Sortino ratios
+    over several window lengths, for the derivative and each weighted underlying.
+    """
+
+    inputs = ("returns", "weights", "assetStore")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("windows", [20, 60, 252])
+        self.opts.setdefault("periods", 252)
+        self.opts.setdefault("underlying", True)
+
+    def requires(self):
+        return {
+            "returns": Intermediate(
+                "componentReturns", underlying=self.opts["underlying"]
+            )
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        result = tearsheet.rollingPerformance(
+            self.resolve("returns", derivative, intermediates),
+            windows=self.opts["windows"],
+            periods=self.opts["periods"],
+        )
+
+        if display:
+            for metric in ["sharpe", "sortino"]:
+                plotter.basicPlot(
+                    title=f"Rolling {metric.capitalize()}: {derivative.getName()}",
+                    feeds=[
+                        {
+                            "data": result[(derivative.getName(), window, metric)],
+                            "opts": {"label": f"{window} bars"},
+                        }
+                        for window in self.opts["windows"]
+                    ],
+                )
+        return result
+
+
+class Drawdowns(InsightGenerator):
+    """
+    Drawdown analytics of many return series at once: underwater curves, max drawdown,
+    longest drawdown, time to recovery and the worst episodes of each.
+
+    The "returns" opt takes a (time x strategy) DataFrame of simple returns, e.g. the
+    variants of a parameter sweep; by default the derivative and its weighted
+    underlyings are used.
+    """
+
+    inputs = ("returns", "weights", "assetStore")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("returns", None)
+        self.opts.setdefault("underlying", True)
+        self.opts.setdefault("top", 5)
+
+    def requires(self):
+        if self.opts["returns"] is not None:
+            return {}
+        return {
+            "returns": Intermediate(
+                "componentReturns", underlying=self.opts["underlying"]
+            )
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        returns = self.opts["returns"]
+        if returns is None:
+            returns = self.resolve("returns", derivative, intermediates)
+
+        summary, episodes, underwater = tearsheet.drawdownAnalysis(
+            returns, top=self.opts["top"]
         )
 
+        if display:
+            displayResult(summary)
+            displayResult(episodes)
+            # The five deepest drawdowns
+            plotter.basicPlot(
+                title=f"Underwater: {self.getName()}",
+                feeds=[
+                    {"data": underwater[column], "opts": {"label": column}}
+                    for column in summary.index[-5:]
+                ],
+            )
+        return {"summary": summary, "episodes": episodes, "underwater": underwater}
+
 
 class StatisticalTests(InsightGenerator):
+    inputs = ("returns", "baseline")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -64,18 +285,20 @@ class StatisticalTests(InsightGenerator):
         self.opts.setdefault("level", 0.95)
         self.opts.setdefault("iterations", 1000)
 
-    def getInsight(self, derivative, display=True):
+    def requires(self):
+        return {
+            "returns": Intermediate("tradedReturns"),
+            "baseline": Intermediate("tradedReturns", asset=self.opts["baseline"]),
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
         sim_results = stats.bootstrap(
-            ts=utils.getTradedReturns(
-                utils.getPeriodReturns(self.opts["baseline"].returns)
-            )["period"],
+            ts=self.resolve("baseline", derivative, intermediates),
             iterations=self.opts["iterations"],
         )
         if display:
             stats.statistical_tests(
-                utils.getTradedReturns(utils.getPeriodReturns(derivative.returns))[
-                    "period"
-                ],
+                self.resolve("returns", derivative, intermediates),
                 sim_results,
                 self.opts["level"],
             )
@@ -1,5 +1,6 @@
 from tradeframework.api.insights import InsightGenerator
 import tradeframework.operations.trader as trader
+from tradeframework.operations.views import TailView
 
 
 class Predictions(InsightGenerator):
@@ -11,9 +12,13 @@ class Predictions(InsightGenerator):
         self.opts.setdefault("capital", 1)
         self.opts.setdefault("target", None)
         self.opts.setdefault("filter", [])
+        self.opts.setdefault("tail", None)  # Only pass the last N bars to the trader
 
     def getInsight(self, derivative, display=True):
-        result = trader.predictSignals(derivative=derivative, **self.opts)
+        opts = {k: v for k, v in self.opts.items() if k != "tail"}
+        if self.opts["tail"]:
+            derivative = TailView(derivative, self.opts["tail"])
+        result = trader.predictSignals(derivative=derivative, **opts)
         if display:
             for i in range(len(result)):
                 print()
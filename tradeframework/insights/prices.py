@@ -6,6 +6,8 @@ from IPython.display import display as displayResult
 
 class RollingPrice(InsightGenerator):
 
+    inputs = ("values",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
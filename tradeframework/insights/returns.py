@@ -10,6 +10,8 @@ import statsmodels.api as sm
 
 class RollingReturns(InsightGenerator):
 
+    inputs = ("returns",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -41,6 +43,8 @@ class RollingReturns(InsightGenerator):
 
 class ReturnsPlot(InsightGenerator):
 
+    inputs = ("returns",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -0,0 +1,57 @@
+import pandas as pd
+from tradeframework.api.insights import InsightGenerator
+import tradeframework.operations.utils as utils
+import tradeframework.operations.plot as plotter
+from tradeframework.operations.risk import rollingVaR
+
+
+class RollingRisk(InsightGenerator):
+    """
+    Rolling historical Value at Risk and Expected Shortfall
+
+    Computed for the derivative and each weighted underlying, at every confidence level,
+    in a single batch of order-statistic queries per series. Losses are reported as
+    positive numbers.
+    """
+
+    inputs = ("returns", "weights", "assetStore")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("window", 250)
+        self.opts.setdefault("levels", [0.95, 0.99])
+        self.opts.setdefault("underlying", True)
+
+    def getInsight(self, derivative, display=True):
+        assets = [derivative]
+        if self.opts["underlying"]:
+            assets += list(derivative.weightedAssets)
+
+        result = pd.concat(
+            {
+                asset.getName(): rollingVaR(
+                    utils.getPeriodReturns(asset.returns)["period"],
+                    window=self.opts["window"],
+                    levels=self.opts["levels"],
+                )
+                for asset in assets
+            },
+            axis=1,
+        )
+
+        if display:
+            feeds = []
+            for level in self.opts["levels"]:
+                for measure in ["VaR", "ES"]:
+                    feeds.append(
+                        {
+                            "data": result[(derivative.getName(), measure, level)],
+                            "opts": {"label": f"{measure} {level:.1%}"},
+                        }
+                    )
+            plotter.basicPlot(
+                title=f"Rolling Risk: {derivative.getName()}",
+                feeds=feeds,
+            )
+        return result
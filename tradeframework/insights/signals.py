@@ -1,5 +1,11 @@
 from tradeframework.api.insights import InsightGenerator
 import tradeframework.operations.trader as trader
+from tradeframework.operations.views import TailView, tailViews
+from tradeframework.operations.ledger import (
+    barWeights,
+    underlyingPrices,
+    currentSignals,
+)
 from IPython.display import display as displayResult
 
 
@@ -11,15 +17,27 @@ class Signals(InsightGenerator):
         self.opts.setdefault("capital", 1)
         self.opts.setdefault("target", None)
         self.opts.setdefault("filter", [])
+        self.opts.setdefault("tail", None)  # Only pass the last N bars to the trader
 
     def getInsight(self, derivative, display=True):
-        result = trader.getCurrentSignal(derivative=derivative, **self.opts)
+        opts = {k: v for k, v in self.opts.items() if k != "tail"}
+        if self.opts["tail"]:
+            derivative = TailView(derivative, self.opts["tail"])
+        result = trader.getCurrentSignal(derivative=derivative, **opts)
         if result and display:
             trader.printSignals(result)
         return result
 
 
 class UnderlyingSignals(InsightGenerator):
+    """
+    Current signal of every underlying of a derivative.
+
+    By default (native) the signals are read from the last two bars of the bar weights
+    and Close prices, for all underlyings at once, and returned as a DataFrame indexed
+    by asset. A target or filter is applied by the trader, so with either set (or with
+    native off) the trader is asked for each underlying's signal in turn.
+    """
 
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
@@ -27,13 +45,37 @@ class UnderlyingSignals(InsightGenerator):
         self.opts.setdefault("capital", 1)
         self.opts.setdefault("target", None)
         self.opts.setdefault("filter", [])
+        self.opts.setdefault("tail", None)  # Only pass the last N bars to the trader
+        # Read the signals of every underlying from the bar weights at once
+        self.opts.setdefault("native", True)
 
     def getInsight(self, derivative, display=True):
+        if (
+            self.opts["native"]
+            and self.opts["target"] is None
+            and not self.opts["filter"]
+        ):
+            return self._nativeSignals(derivative, display)
+        opts = {k: v for k, v in self.opts.items() if k not in ("tail", "native")}
+        assets = derivative.weightedAssets
+        if self.opts["tail"]:
+            # Slice every underlying's series in one batch; shared frames are sliced once
+            assets = tailViews(assets, self.opts["tail"])
         result = []
-        for asset in derivative.weightedAssets:
-            signal = trader.getCurrentSignal(asset, **self.opts)
+        for asset in assets:
+            signal = trader.getCurrentSignal(asset, **opts)
             if signal:
                 result.append(signal)
         if display:
             trader.printSignals(result)
         return result
+
+    def _nativeSignals(self, derivative, display):
+        # Only the last two bars are read, whatever the tail
+        derivative = TailView(derivative, 2)
+        weights = barWeights(derivative)
+        _, closes = underlyingPrices(derivative, weights.columns, weights.index)
+        result = currentSignals(weights, closes, capital=self.opts["capital"])
+        if display:
+            displayResult(result)
+        return result
@@ -1,55 +1,74 @@
 import pandas as pd
 import numpy as np
-from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights import InsightGenerator, Intermediate
 import tradeframework.operations.utils as utils
 import quantutils.core.timeseries as tsUtils
 from IPython.display import display as displayResult
 import tradeframework.operations.plot as plotter
-from statsmodels.graphics.tsaplots import plot_acf
+from tradeframework.operations.rolling import movingAutocorrelation
 import statsmodels.api as sm
 
 
 class TimeSeriesPlot(InsightGenerator):
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("lags", 30)
         self.opts.setdefault("series", "returns")
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
-
-        fig = plotter.tsplot(series, lags=self.opts["lags"], show=False)
+    def requires(self):
+        return {
+            "series": Intermediate("series", series=self.opts["series"]),
+            "correlogram": Intermediate(
+                "correlogram", series=self.opts["series"], lags=self.opts["lags"]
+            ),
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        correlogram = self.resolve("correlogram", derivative, intermediates)
+        fig = plotter.tsplot(
+            series, lags=self.opts["lags"], show=False, correlogram=correlogram
+        )
         if display:
             displayResult(fig)
         return fig
 
 
 class AutoCorrelationPlot(InsightGenerator):
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
         self.opts.setdefault("lags", 30)
+        self.opts.setdefault("alpha", 0.05)
         self.opts.setdefault("series", "returns")
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
-
-        del self.opts["series"]
-        acf_results = pd.DataFrame(tsUtils.autocorr(series), index=series.index)
+    def requires(self):
+        return {
+            "correlogram": Intermediate(
+                "correlogram",
+                series=self.opts["series"],
+                lags=self.opts["lags"],
+                alpha=self.opts["alpha"],
+            )
+        }
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        correlogram = self.resolve("correlogram", derivative, intermediates)
+        acf_results = correlogram.toFrame()
         if display:
             ax = plotter.outlinePlot(title="AutoCorrelation Plot")
-            plot_acf(x=series, ax=ax, **self.opts)
+            plotter.plotCorrelogram(
+                correlogram.acf,
+                correlogram.acfBand,
+                ax=ax,
+                title="AutoCorrelation Plot",
+            )
         return acf_results
 
 
@@ -57,6 +76,8 @@ class AutoCorrelationPlot(InsightGenerator):
 
 
 class MACFPlot(InsightGenerator):
+    inputs = ("returns", "values")
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
@@ -65,17 +86,15 @@ class MACFPlot(InsightGenerator):
         self.opts.setdefault("offset", int(self.opts["window"] / 2))
         self.opts.setdefault("series", "returns")
 
-    def getInsight(self, derivative, display=True):
-        if not isinstance(self.opts["series"], str):
-            series = self.opts["series"]
-        elif self.opts["series"] == "prices":
-            series = np.log(derivative.values["Close"])
-        elif self.opts["series"] == "returns":
-            series = utils.getPeriodLogReturns(derivative.returns)["period"]
-
-        del self.opts["series"]
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        opts = {k: v for k, v in self.opts.items() if k != "series"}
         macf_results = pd.DataFrame(
-            tsUtils.MACF(series.values, **self.opts), index=series.index
+            tsUtils.MACF(series.values, **opts), index=series.index
         )
         if display:
             feeds = []
@@ -98,10 +117,59 @@ class MACFPlot(InsightGenerator):
         return macf_results
 
 
+# Moving AutoCorrelation Surface (all lags in one pass)
+
+
+class MACFSurface(InsightGenerator):
+    inputs = ("returns", "values")
+
+    def __init__(self, name, opts):
+        InsightGenerator.__init__(self, name, opts)
+
+        self.opts.setdefault("lags", 50)  # Max lag, or explicit list of lags
+        self.opts.setdefault("window", 14)
+        self.opts.setdefault("offset", int(self.opts["window"] / 2))
+        self.opts.setdefault("series", "returns")
+
+    def requires(self):
+        return {"series": Intermediate("series", series=self.opts["series"])}
+
+    def getInsight(self, derivative, display=True, intermediates=None):
+        series = self.resolve("series", derivative, intermediates)
+
+        lags = self.opts["lags"]
+        if np.isscalar(lags):
+            lags = range(1, lags + 1)
+
+        series = series.dropna()
+        surface = pd.DataFrame(
+            movingAutocorrelation(
+                series.values,
+                lags=list(lags),
+                window=self.opts["window"],
+                offset=self.opts["offset"],
+            ),
+            index=pd.Index(list(lags), name="lag"),
+            columns=series.index,
+        )
+        if display:
+            displayResult(
+                plotter.heatmapPlot(
+                    surface,
+                    title=f"Moving AutoCorrelation Surface: {derivative.getName()}",
+                    y_axis="Lag",
+                )
+            )
+
+        return surface
+
+
 # Regime identification
 
 
 class MarkovRegimeFit(InsightGenerator):
+    inputs = ("returns",)
+
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
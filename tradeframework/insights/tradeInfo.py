@@ -1,31 +1,62 @@
-from tradeframework.api.insights import InsightGenerator
+from tradeframework.api.insights import InsightGenerator, Intermediate
 import tradeframework.operations.trader as trader
+from tradeframework.operations.ledger import tradeSummary
 from IPython.display import display as displayResult
 
 
-class TradeInfo(InsightGenerator):
+class LedgerGenerator(InsightGenerator):
+    """
+    Base of the generators rendered from the trade ledger. By default (native) this is
+    the vectorised ledger shared between generators; with native off the trader builds
+    it, and is passed the remaining opts.
+    """
 
     def __init__(self, name, opts):
         InsightGenerator.__init__(self, name, opts)
 
+        self.opts.setdefault("native", True)  # Use the vectorised trade ledger
+
+    def requires(self):
+        if not self.opts["native"]:
+            return {}
+        return {"ledger": Intermediate("ledger")}
+
+    def traderOpts(self):
+        return {k: v for k, v in self.opts.items() if k != "native"}
+
+
+class TradeInfo(LedgerGenerator):
+
+    def __init__(self, name, opts):
+        LedgerGenerator.__init__(self, name, opts)
+
         self.opts.setdefault("startCapital", 1)
         self.opts.setdefault("unitAllocations", True)
         self.opts.setdefault("summary", True)
 
-    def getInsight(self, derivative, display=True):
-        result = trader.getTradingInfo(derivative=derivative, **self.opts)
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["native"]:
+            trades, _ = self.resolve("ledger", derivative, intermediates)
+            if not self.opts["unitAllocations"]:
+                # Weights are fractions of capital
+                trades = trades.assign(pnl=trades["return"] * self.opts["startCapital"])
+            result = tradeSummary(trades) if self.opts["summary"] else trades
+        else:
+            result = trader.getTradingInfo(derivative=derivative, **self.traderOpts())
         if display:
             displayResult(result)
         return result
 
 
-class UnderlyingAllocations(InsightGenerator):
-
-    def __init__(self, name, opts):
-        InsightGenerator.__init__(self, name, opts)
+class UnderlyingAllocations(LedgerGenerator):
 
-    def getInsight(self, derivative, display=True):
-        result = trader.getUnderlyingAllocations(derivative=derivative, **self.opts)
+    def getInsight(self, derivative, display=True, intermediates=None):
+        if self.opts["native"]:
+            _, result = self.resolve("ledger", derivative, intermediates)
+        else:
+            result = trader.getUnderlyingAllocations(
+                derivative=derivative, **self.traderOpts()
+            )
         if display:
             displayResult(result)
         return result
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from scipy import stats as scipy_stats
+
+# FFT based autocovariance engine. The ACF, PACF and their confidence bands are all
+# derived from a single autocovariance pass, so plots and tests share one result.
+
+
+def chi2PValue(statistic, df):
+    """
+    Chi-squared upper tail probability of a Q statistic, NaN where there are no degrees
+    of freedom left (lags <= model_df), as statsmodels' acorr_ljungbox.
+    """
+    df = np.asarray(df)
+    with np.errstate(invalid="ignore"):
+        return np.where(
+            df > 0, scipy_stats.chi2.sf(statistic, np.maximum(df, 1)), np.nan
+        )
+
+
+def _fftLength(n):
+    # Smallest power of 2 that holds the full linear correlation (no circular wrap)
+    return 1 << int(np.ceil(np.log2(max(2 * n - 1, 1))))
+
+
+def autocovariance(x, nlags=None, demean=True):
+    """
+    Biased autocovariance of x for lags 0..nlags, computed in O(n log n) via the FFT.
+    If x is 2D, the autocovariance of each column is computed in the same pass.
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[0]
+    if nlags is None:
+        nlags = n - 1
+    nlags = min(int(nlags), n - 1)
+    if demean:
+        x = x - x.mean(axis=0)
+    spectrum = np.fft.rfft(x, n=_fftLength(n), axis=0)
+    acov = np.fft.irfft(spectrum * np.conj(spectrum), axis=0)[: nlags + 1]
+    return acov / n
+
+
+def durbinLevinson(acf):
+    """
+    Partial autocorrelations from the autocorrelations acf[0..nlags] using the
+    Durbin-Levinson recursion.
+    """
+    acf = np.asarray(acf, dtype=float)
+    nlags = len(acf) - 1
+    pacf = np.zeros(nlags + 1)
+    pacf[0] = 1.0
+    if nlags == 0:
+        return pacf
+    phi = np.zeros(nlags + 1)
+    v = acf[0]
+    for k in range(1, nlags + 1):
+        if v <= 0:
+            pacf[k:] = np.nan
+            break
+        phi_kk = (acf[k] - np.dot(phi[1:k], acf[k - 1 : 0 : -1])) / v
+        phi[1:k] = phi[1:k] - phi_kk * phi[k - 1 : 0 : -1]
+        phi[k] = phi_kk
+        pacf[k] = phi_kk
+        v = v * (1 - phi_kk**2)
+    return pacf
+
+
+class Correlogram:
+    """
+    ACF, PACF and confidence bands for a single series.
+
+    ACF bands use Bartlett's formula, PACF bands use the 1/sqrt(n) approximation, matching
+    the statsmodels plot_acf/plot_pacf defaults.
+    """
+
+    def __init__(self, series, nlags=30, alpha=0.05):
+        if not isinstance(series, pd.Series):
+            series = pd.Series(series)
+        series = series.dropna()
+
+        self.nobs = len(series)
+        self.nlags = min(int(nlags), self.nobs - 1)
+        self.alpha = alpha
+
+        self.acov = autocovariance(series.values, self.nlags)
+        self.acf = self.acov / self.acov[0]
+        self.pacf = durbinLevinson(self.acf)
+
+        z = scipy_stats.norm.ppf(1 - alpha / 2.0)
+        acfVar = np.ones(self.nlags + 1) / self.nobs
+        acfVar[0] = 0
+        acfVar[2:] *= 1 + 2 * np.cumsum(self.acf[1:-1] ** 2)
+        self.acfBand = z * np.sqrt(acfVar)
+
+        self.pacfBand = np.full(self.nlags + 1, z / np.sqrt(self.nobs))
+        self.pacfBand[0] = 0
+
+    def lags(self):
+        return np.arange(self.nlags + 1)
+
+    def ljungBox(self, lags=None, boxpierce=False, model_df=0):
+        """
+        Ljung-Box (and optionally Box-Pierce) statistics from the shared ACF.
+        Returns arrays in the same layout as acorr_ljungbox(..., return_df=False).
+        """
+        if lags is None:
+            lags = min(self.nlags, 10)
+        if np.isscalar(lags):
+            lags = np.arange(1, lags + 1)
+        lags = np.asarray(lags, dtype=int)
+        if lags.max() > self.nlags:
+            raise Exception(
+                f"Correlogram computed for {self.nlags} lags, {lags.max()} requested"
+            )
+        n = self.nobs
+        r2 = self.acf[1 : lags.max() + 1] ** 2
+        k = np.arange(1, lags.max() + 1)
+        df = lags - model_df
+
+        lb = (n * (n + 2) * np.cumsum(r2 / (n - k)))[lags - 1]
+        result = (lb, chi2PValue(lb, df))
+        if boxpierce:
+            bp = (n * np.cumsum(r2))[lags - 1]
+            result = result + (bp, chi2PValue(bp, df))
+        return result
+
+    def toFrame(self):
+        return pd.DataFrame(
+            {
+                "acf": self.acf,
+                "acf_lower": self.acf - self.acfBand,
+                "acf_upper": self.acf + self.acfBand,
+                "pacf": self.pacf,
+                "pacf_lower": self.pacf - self.pacfBand,
+                "pacf_upper": self.pacf + self.pacfBand,
+            },
+            index=pd.Index(self.lags(), name="lag"),
+        )
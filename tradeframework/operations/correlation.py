@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+from tradeframework.operations.precision import asFloat
+
+# Correlation of large universes. The matrix is computed in tiles across a thread pool,
+# with missing data handled by masked matrix products, and can be written straight to a
+# memory-mapped file. Hierarchical clustering of assets lets a correlation matrix be
+# reordered (correlated assets next to each other) or collapsed into blocks of clusters.
+
+
+def _tile(x, mask, squares, i, j, minPeriods):
+    # Pairwise-complete moments of the columns in tiles i and j as GEMMs: every sum only
+    # runs over the rows where both columns are present
+    mi, mj = mask[:, i], mask[:, j]
+    n = mi.T @ mj
+    sx = x[:, i].T @ mj
+    sy = mi.T @ x[:, j]
+    sxx = squares[:, i].T @ mj
+    syy = mi.T @ squares[:, j]
+    sxy = x[:, i].T @ x[:, j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / n
+        var = (sxx - sx**2 / n) * (syy - sy**2 / n)
+        corr = cov / np.sqrt(var)
+    corr[(n < max(minPeriods, 2)) | ~(var > 0)] = np.nan
+    return np.clip(corr, -1, 1, out=corr), n
+
+
+def _prepare(data):
+    x = asFloat(data)
+    mask = ~np.isnan(x)
+    # Centring by the column means leaves the correlation unchanged but avoids
+    # cancellation in the sums of squares
+    x = np.where(mask, x, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = x.sum(axis=0) / mask.sum(axis=0)
+    x = np.where(mask, x - means, 0).astype(x.dtype, copy=False)
+    return x, mask.astype(x.dtype), x**2
+
+
+def _tiles(columns, blockSize):
+    return [slice(k, min(k + blockSize, columns)) for k in range(0, columns, blockSize)]
+
+
+def correlation(data, blockSize=512, workers=None, path=None, minPeriods=1):
+    """
+    Pairwise-complete Pearson correlation of the columns of data (as DataFrame.corr).
+
+    Columns are processed in tiles of blockSize, one tile pair per task on a thread pool
+    (the products release the GIL). If path is given the matrix is written to a .npy
+    memory-mapped file rather than held in memory. Returns the (N x N) array or memmap.
+    """
+    x, weights, squares = _prepare(data)
+
+    columns = x.shape[1]
+    if path is not None:
+        out = np.lib.format.open_memmap(
+            path, mode="w+", dtype=x.dtype, shape=(columns, columns)
+        )
+    else:
+        out = np.empty((columns, columns), dtype=x.dtype)
+
+    tiles = _tiles(columns, blockSize)
+
+    def compute(pair):
+        i, j = pair
+        corr, _ = _tile(x, weights, squares, i, j, minPeriods)
+        out[i, j] = corr
+        if i != j:
+            out[j, i] = corr.T
+
+    pairs = [(i, j) for a, i in enumerate(tiles) for j in tiles[a:]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(compute, pairs))
+
+    diagonal = np.diagonal(out)
+    out[np.diag_indices(columns)] = np.where(np.isnan(diagonal), np.nan, 1)
+    if path is not None:
+        out.flush()
+    return out
+
+
+def correlationMatrix(data, **kwargs):
+    """
+    correlation() of a DataFrame, labelled with its columns.
+    """
+    return pd.DataFrame(
+        correlation(data.values, **kwargs),
+        index=data.columns,
+        columns=data.columns,
+        copy=False,
+    )
+
+
+def _strength(corr, threshold):
+    # Ranking score of each pair: |correlation|, -inf when missing or below threshold
+    score = np.abs(corr)
+    score[~(score >= (threshold or 0))] = -np.inf
+    return score
+
+
+def _best(score, topK, axis):
+    # Positions of the topK scores along axis (unordered)
+    k = min(topK, score.shape[axis])
+    return np.argpartition(-score, k - 1, axis=axis).take(np.arange(k), axis=axis)
+
+
+def _topPartners(edges, topK):
+    # Keep an edge if it is among the topK strongest of either of its columns: a bounded
+    # heap of partners per column
+    both = pd.concat(
+        [
+            edges.assign(node=edges["a"], edge=edges.index),
+            edges.assign(node=edges["b"], edge=edges.index),
+        ]
+    )
+    both["strength"] = both["correlation"].abs()
+    top = both.sort_values("strength", ascending=False).groupby("node").head(topK)
+    return edges.loc[np.unique(top["edge"])].reset_index(drop=True)
+
+
+def correlatedPairs(
+    data,
+    threshold=0.8,
+    topK=None,
+    focus=None,
+    blockSize=512,
+    workers=None,
+    minPeriods=1,
+):
+    """
+    Sparse search for highly correlated pairs of columns of data.
+
+    Streams through tiles of columns (as correlation()) keeping only the pairs with
+    |correlation| >= threshold or, with topK, the topK strongest partners of each column
+    (above the threshold, if one is given). With focus (column positions) only pairs
+    involving those columns are searched. Memory is proportional to the number of hits,
+    never N x N. Returns an edge list (a, b, correlation, nobs) of column positions, with
+    a < b, strongest first.
+    """
+    x, weights, squares = _prepare(data)
+    columns = x.shape[1]
+    tiles = _tiles(columns, blockSize)
+    if focus is not None:
+        focus = np.asarray(focus)
+        pairs = [(focus, j) for j in tiles]
+    else:
+        pairs = [(i, j) for a, i in enumerate(tiles) for j in tiles[a:]]
+
+    def compute(pair):
+        i, j = pair
+        corr, n = _tile(x, weights, squares, i, j, minPeriods)
+        rows, cols = np.arange(columns)[i], np.arange(columns)[j]
+        score = _strength(corr, threshold)
+        # Each undirected pair once, and never a column with itself
+        if focus is None:
+            score[rows[:, None] >= cols[None, :]] = -np.inf
+        else:
+            twice = np.isin(cols, focus)[None, :] & (rows[:, None] > cols[None, :])
+            score[twice | (rows[:, None] == cols[None, :])] = -np.inf
+
+        if topK:
+            # Candidates: the best partners of every row, and of every column
+            r = np.concatenate(
+                [
+                    np.repeat(np.arange(len(rows)), min(topK, len(cols))),
+                    _best(score, topK, axis=0).ravel(),
+                ]
+            )
+            c = np.concatenate(
+                [
+                    _best(score, topK, axis=1).ravel(),
+                    np.tile(np.arange(len(cols)), min(topK, len(rows))),
+                ]
+            )
+            keep = np.isfinite(score[r, c])
+            r, c = r[keep], c[keep]
+        else:
+            r, c = np.nonzero(np.isfinite(score))
+        return pd.DataFrame(
+            {"a": rows[r], "b": cols[c], "correlation": corr[r, c], "nobs": n[r, c]}
+        ).drop_duplicates(["a", "b"])
+
+    # Hits are collected and concatenated once. With topK at most topK * columns edges
+    # survive pruning, so pruning once twice that many have gathered bounds memory at
+    # linear total cost.
+    hits = [
+        pd.DataFrame({"a": [], "b": [], "correlation": [], "nobs": []}).astype(
+            {"a": np.int64, "b": np.int64}
+        )
+    ]
+    gathered = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for tile in pool.map(compute, pairs):
+            hits.append(tile)
+            gathered += len(tile)
+            if topK and gathered > 2 * topK * columns:
+                hits = [_topPartners(pd.concat(hits, ignore_index=True), topK)]
+                gathered = len(hits[0])
+    edges = pd.concat(hits, ignore_index=True)
+    if topK:
+        edges = _topPartners(edges, topK)
+
+    a, b = edges["a"].values, edges["b"].values
+    edges["a"], edges["b"] = np.minimum(a, b), np.maximum(a, b)
+    edges["nobs"] = edges["nobs"].astype(np.int64)
+    return edges.sort_values(
+        "correlation", key=np.abs, ascending=False, ignore_index=True
+    )
+
+
+def selectPairs(corr, threshold=None, topK=None):
+    """
+    The pairs of a computed correlation matrix that correlatedPairs() would keep: those
+    with |correlation| >= threshold and, with topK, the topK strongest partners of each
+    column. Returns an edge list (a, b, correlation) of positions, a < b, strongest first.
+    """
+    values = np.asarray(corr, dtype=float)
+    a, b = np.triu_indices(len(values), k=1)
+    pairs = values[a, b]
+    keep = np.abs(pairs) >= (threshold or 0)
+    edges = pd.DataFrame({"a": a[keep], "b": b[keep], "correlation": pairs[keep]})
+    if topK:
+        edges = _topPartners(edges, topK)
+    return edges.sort_values(
+        "correlation", key=np.abs, ascending=False, ignore_index=True
+    )
+
+
+def _linkage(corr, method="average"):
+    values = np.nan_to_num(np.asarray(corr, dtype=float))
+    np.fill_diagonal(values, 1)
+    # Correlation distance, 0 for identical series and 1 for opposite ones
+    distance = np.sqrt(np.clip((1 - values) / 2, 0, None))
+    np.fill_diagonal(distance, 0)
+    return hierarchy.linkage(squareform(distance, checks=False), method=method)
+
+
+def clusterOrder(corr, method="average"):
+    """
+    Permutation of the assets of a correlation matrix that places clusters together.
+    """
+    if len(corr) < 3:
+        return np.arange(len(corr))
+    return hierarchy.leaves_list(_linkage(corr, method))
+
+
+def clusterLabels(corr, clusters, method="average"):
+    """
+    Cluster label (1..clusters) of each asset, cutting the hierarchy into at most
+    `clusters` clusters.
+    """
+    if len(corr) < 3:
+        return np.arange(1, len(corr) + 1)
+    return hierarchy.fcluster(_linkage(corr, method), clusters, criterion="maxclust")
+
+
+def blockCorrelation(corr, labels):
+    """
+    Mean correlation between (and within) clusters. Within a cluster the diagonal is
+    excluded; single asset clusters have a within correlation of 1.
+    """
+    values = np.nan_to_num(np.asarray(corr, dtype=float))
+    np.fill_diagonal(values, 0)
+    clusters, members = np.unique(labels, return_inverse=True)
+    indicator = np.zeros((len(labels), len(clusters)))
+    indicator[np.arange(len(labels)), members] = 1
+    sizes = indicator.sum(axis=0)
+
+    sums = indicator.T @ values @ indicator
+    pairs = np.outer(sizes, sizes)
+    np.fill_diagonal(pairs, sizes * (sizes - 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        blocks = np.where(pairs > 0, sums / pairs, 1.0)
+
+    names = [f"C{c} ({int(n)})" for c, n in zip(clusters, sizes)]
+    return pd.DataFrame(blocks, index=names, columns=names)
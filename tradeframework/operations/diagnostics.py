@@ -0,0 +1,249 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import stats as scipy_stats
+from statsmodels.tsa.adfvalues import mackinnonp
+
+from tradeframework.operations.rolling import (
+    prefixSum,
+    takePrefix,
+    windowSum,
+    windowBounds,
+    laggedProducts,
+)
+from tradeframework.operations.autocorrelation import autocovariance, chi2PValue
+from tradeframework.operations.precision import asFloat
+
+# Rolling/expanding versions of the statistical tests in tradeframework.insights.analysis.
+# Both tests are evaluated for every window from shared prefix sums, so the cost of the
+# sums is paid once and each additional window only costs a handful of differences.
+# Batch versions test every column of a panel at once.
+
+
+def rollingLjungBox(
+    x, lags=20, window=250, expanding=False, minPeriods=None, model_df=0
+):
+    """
+    Ljung-Box Q statistic and p-value (for `lags` lags) of the window ending at each bar.
+
+    Autocovariances for each window are rebuilt from prefix sums of x, x^2 and the lagged
+    products x[t] * x[t-k], so all windows are computed in O(n * lags).
+    Returns (statistic, pvalue), NaN where the window is not valid.
+    """
+    x = asFloat(x)
+    x = x - x.mean()
+    n = len(x)
+    k = np.arange(1, lags + 1)[:, None]
+
+    start, end, valid = windowBounds(n, window, expanding, minPeriods)
+    valid &= (end - start) > lags + 1
+    start, end = start[valid], end[valid]
+    m = end - start
+
+    s1 = prefixSum(x)
+    s2 = prefixSum(x**2)
+    sp = prefixSum(laggedProducts(x, k[:, 0]), axis=1)
+
+    mean = (s1[end] - s1[start]) / m
+    c0 = (s2[end] - s2[start]) / m - mean**2
+
+    head = start + k
+    lagged = takePrefix(sp, np.broadcast_to(end, head.shape), axis=1)
+    lagged = lagged - takePrefix(sp, head, axis=1)
+    ck = (
+        lagged
+        - mean * ((s1[end] - s1[head]) + (s1[end - k] - s1[start]))
+        + (m - k) * mean**2
+    ) / m
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = m * (m + 2) * np.sum((ck / c0) ** 2 / (m - k), axis=0)
+
+    statistic = np.full(n, np.nan)
+    pvalue = np.full(n, np.nan)
+    statistic[valid] = q
+    pvalue[valid] = chi2PValue(q, lags - model_df)
+    return statistic, pvalue
+
+
+def _adfDesign(y, maxlag):
+    # Rows of the ADF regression dy[t] ~ 1 + y[t-1] + dy[t-1..t-maxlag] for each bar t
+    n = len(y)
+    dy = np.diff(y, prepend=np.nan)
+    design = np.zeros((n, maxlag + 2), dtype=y.dtype)
+    design[:, 0] = 1
+    design[1:, 1] = y[:-1]
+    for j in range(1, maxlag + 1):
+        design[j + 1 :, j + 1] = dy[1 : n - j]
+    target = np.nan_to_num(dy)
+    return design, target
+
+
+def _adfPValues(tstat, gridSize=2001):
+    # MacKinnon p-values are smooth and monotone in the statistic, so evaluate them on a
+    # dense grid once and interpolate rather than calling mackinnonp per window
+    pvalue = np.full(len(tstat), np.nan)
+    finite = np.isfinite(tstat)
+    if not finite.any():
+        return pvalue
+    grid = np.linspace(tstat[finite].min(), tstat[finite].max(), gridSize)
+    pgrid = np.array([mackinnonp(t, regression="c", N=1) for t in grid])
+    pvalue[finite] = np.interp(tstat[finite], grid, pgrid)
+    return pvalue
+
+
+def _adfSolve(xtx, xty, yty, nobs):
+    # Batch solve of the windowed normal equations; t-stat of the y[t-1] coefficient.
+    # Solved in float64 whatever the compute dtype, the systems are small.
+    xtx, xty, yty = (np.asarray(a, dtype=np.float64) for a in (xtx, xty, yty))
+    try:
+        xtxInv = np.linalg.inv(xtx)
+    except np.linalg.LinAlgError:
+        # Degenerate windows (e.g. flat prices); fall back to the pseudo-inverse
+        xtxInv = np.linalg.pinv(xtx)
+    beta = np.einsum("wij,wj->wi", xtxInv, xty)
+    rss = yty - np.einsum("wi,wi->w", beta, xty)
+    dof = nobs - xtx.shape[1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se = np.sqrt(np.clip(rss, 0, None) / dof * xtxInv[:, 1, 1])
+        return beta[:, 1] / se
+
+
+def rollingADF(
+    y,
+    maxlag=1,
+    window=250,
+    expanding=False,
+    minPeriods=None,
+    workers=None,
+    chunkSize=10000,
+):
+    """
+    Augmented Dickey-Fuller statistic (constant, fixed lag order) of the window ending at
+    each bar, matching adfuller(window, maxlag=maxlag, autolag=None).
+
+    The regression cross products are accumulated as prefix sums, so each window's normal
+    equations are a difference of two prefix entries. Windows are solved in chunks across
+    a thread pool. Returns (statistic, pvalue, nobs), NaN where the window is not valid.
+    """
+    y = asFloat(y)
+    y = y - y.mean()
+    n = len(y)
+
+    design, target = _adfDesign(y, maxlag)
+    sxx = prefixSum(np.einsum("ti,tj->tij", design, design))
+    sxy = prefixSum(design * target[:, None])
+    syy = prefixSum(target**2)
+
+    start, end, valid = windowBounds(n, window, expanding, minPeriods)
+    first = start + maxlag + 1
+    nobs = end - first
+    valid &= nobs > design.shape[1]
+
+    windows = np.flatnonzero(valid)
+    chunks = [windows[i : i + chunkSize] for i in range(0, len(windows), chunkSize)]
+
+    def solve(chunk):
+        # Window sums in float64: the regression on y[t-1] cancels most of each sum
+        e, f = end[chunk], first[chunk]
+        return _adfSolve(
+            windowSum(sxx, e, f, np.float64),
+            windowSum(sxy, e, f, np.float64),
+            windowSum(syy, e, f, np.float64),
+            nobs[chunk],
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(solve, chunks))
+
+    statistic = np.full(n, np.nan)
+    if results:
+        statistic[windows] = np.concatenate(results)
+    return statistic, _adfPValues(statistic), np.where(valid, nobs, 0)
+
+
+def _compact(panel):
+    # Each column's present values moved to the top (in order) and zero padded, with the
+    # number present: the series each test would see after dropna()
+    x = asFloat(panel)
+    present = ~np.isnan(x)
+    lengths = present.sum(axis=0)
+    gaps = np.flatnonzero(lengths < len(x))
+    if len(gaps):
+        x = x.copy()
+        order = np.argsort(~present[:, gaps], axis=0, kind="stable")
+        compacted = np.take_along_axis(x[:, gaps], order, axis=0)
+        compacted[np.arange(len(x))[:, None] >= lengths[gaps]] = 0
+        x[:, gaps] = compacted
+    return x, lengths
+
+
+def batchJarqueBera(panel):
+    """
+    Jarque-Bera statistic, p-value, skew and kurtosis of every column of a (time x
+    series) panel, ignoring missing values (as jarque_bera of each column). Returns
+    (statistic, pvalue, skew, kurtosis).
+    """
+    x, n = _compact(panel)
+    inside = np.arange(len(x))[:, None] < n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d = np.where(inside, x - x.sum(axis=0) / n, 0)
+        d2 = d * d
+        m2, m3, m4 = ((d2 * e).sum(axis=0) / n for e in (1, d, d2))
+        skew = m3 / m2**1.5
+        kurtosis = m4 / m2**2
+        statistic = n / 6 * (skew**2 + (kurtosis - 3) ** 2 / 4)
+    return statistic, scipy_stats.chi2.sf(statistic, 2), skew, kurtosis
+
+
+def batchLjungBox(panel, lags=20, model_df=0):
+    """
+    Ljung-Box Q statistic and p-value (for `lags` lags) of every column of a panel,
+    ignoring missing values, from one batched FFT autocovariance pass.
+    """
+    x, n = _compact(panel)
+    inside = np.arange(len(x))[:, None] < n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(inside, x - x.sum(axis=0) / n, 0)
+        # autocovariance() divides by the padded length
+        acov = autocovariance(x, nlags=lags, demean=False) * len(x) / n
+        k = np.arange(1, len(acov))[:, None]
+        q = n * (n + 2) * np.sum((acov[1:] / acov[0]) ** 2 / (n - k), axis=0)
+    return q, chi2PValue(q, lags - model_df)
+
+
+def batchADF(panel, maxlag=1, workers=None, chunkSize=256):
+    """
+    Augmented Dickey-Fuller statistic (constant, fixed lag order) of every column of a
+    panel, ignoring missing values, matching adfuller(column, maxlag=maxlag,
+    autolag=None). The lag regressions of chunks of columns are built and solved as
+    batches across a thread pool. Returns (statistic, pvalue, nobs).
+    """
+    x, n = _compact(panel)
+    rows = np.arange(len(x))[:, None]
+    inside = rows < n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(inside, x - x.sum(axis=0) / n, 0)
+    nobs = np.clip(n - maxlag - 1, 0, None)
+    # Regression rows of each column: after the lags, before the padding
+    used = (rows >= maxlag + 1) & inside
+
+    def solve(columns):
+        design, target = zip(*(_adfDesign(x[:, j], maxlag) for j in columns))
+        design = np.stack(design, axis=1) * used[:, columns, None]
+        target = np.stack(target, axis=1) * used[:, columns]
+        return _adfSolve(
+            np.einsum("tcp,tcq->cpq", design, design),
+            np.einsum("tcp,tc->cp", design, target),
+            np.einsum("tc,tc->c", target, target),
+            nobs[columns],
+        )
+
+    columns = np.flatnonzero(nobs > maxlag + 2)
+    chunks = [columns[i : i + chunkSize] for i in range(0, len(columns), chunkSize)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(solve, chunks))
+
+    statistic = np.full(x.shape[1], np.nan)
+    if results:
+        statistic[columns] = np.concatenate(results)
+    return statistic, _adfPValues(statistic), nobs
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from tradeframework.operations.rolling import prefixSum, windowSum, windowBounds
+from tradeframework.operations.precision import asFloat
+
+# Walk-forward scoring of predictions. Errors, absolute and squared errors, sign hits and
+# confusion matrix cells are accumulated once as prefix sums, so the metrics of every
+# rolling (or expanding) window are differences of two prefix entries: O(n) in total,
+# whatever the window length.
+
+
+def align(actual, predictions):
+    """
+    Actual and predicted values on their common, non-missing index.
+    """
+    data = pd.concat([actual, predictions], axis=1, join="inner").dropna()
+    return data.iloc[:, 0], data.iloc[:, 1]
+
+
+def classify(actuals, predicted, returnsData=True, noHold=False):
+    """
+    Signs of the actual and predicted values, and the labels to score them over.
+
+    If the predictions are returns (returnsData) their sign is flipped where the actual
+    went down: a positive return against a falling baseline means down was predicted.
+    With noHold, entries where either value is 0 are dropped.
+    """
+    if noHold:
+        index = actuals[actuals != 0].index.intersection(
+            predicted[predicted != 0].index
+        )
+        actuals = actuals.loc[index]
+        predicted = predicted.loc[index]
+        labels = [1, -1]
+    else:
+        labels = [1, 0, -1]
+
+    actual = np.sign(actuals)
+    predictions = np.sign(predicted)
+    if returnsData:
+        predictions = predictions.where(actual != -1, -predictions)
+    return actual, predictions, labels
+
+
+def _windows(n, window, expanding, minPeriods):
+    start, end, valid = windowBounds(n, window, expanding, minPeriods)
+    return start, end, valid, end - start
+
+
+def rollingRegressionMetrics(
+    actual, predictions, window=250, expanding=False, minPeriods=None, ddof=0
+):
+    """
+    Regression metrics of the predictions over the window ending at each bar.
+
+    mfe     Mean forecast error (actual - prediction)
+    mae     Mean absolute error
+    mse     Mean squared error
+    rse     Residual standard error (standard deviation of the errors)
+    r2      Coefficient of determination
+    mda     Mean directional accuracy: sign(a[t] - a[t-1]) == sign(p[t] - a[t-1])
+    msa     Mean sign accuracy: sign(a[t]) == sign(p[t])
+
+    Accuracies are fractions. Returns a DataFrame indexed like the aligned inputs, NaN
+    where the window is not valid.
+    """
+    actual, predictions = align(actual, predictions)
+    a = asFloat(actual.values)
+    p = asFloat(predictions.values)
+    e = a - p
+    previous = np.concatenate([[np.nan], a[:-1]])
+    with np.errstate(invalid="ignore"):
+        direction = np.sign(a - previous) == np.sign(p - previous)
+    direction[0] = False
+
+    start, end, valid, m = _windows(len(a), window, expanding, minPeriods)
+    # The first bar has no direction, so windows starting there score one bar less
+    directed = m - (start == 0)
+
+    def sums(x):
+        return windowSum(prefixSum(x), end, start)
+
+    se, sae, see = sums(e), sums(np.abs(e)), sums(e**2)
+    sa, saa = sums(a), sums(a**2)
+    sdir, ssign = sums(direction), sums(np.sign(a) == np.sign(p))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = pd.DataFrame(
+            {
+                "mfe": se / m,
+                "mae": sae / m,
+                "mse": see / m,
+                "rse": np.sqrt(np.clip(see - se**2 / m, 0, None) / (m - ddof)),
+                "r2": 1 - see / (saa - sa**2 / m),
+                "mda": sdir / directed,
+                "msa": ssign / m,
+            },
+            index=actual.index,
+        )
+    result[~valid] = np.nan
+    return result
+
+
+def rollingConfusionCounts(
+    actual, predictions, labels, window=250, expanding=False, minPeriods=None
+):
+    """
+    Confusion matrix counts over the window ending at each bar, from the classified signs
+    returned by classify(). Returns (counts, valid) where counts[t, i, j] is the number of
+    bars in the window with actual label i and predicted label j.
+    """
+    a = np.asarray(actual)
+    p = np.asarray(predictions)
+    cells = np.stack(
+        [(a == i) & (p == j) for i in labels for j in labels], axis=1
+    ).astype(np.int64)
+    start, end, valid, _ = _windows(len(a), window, expanding, minPeriods)
+    prefix = np.concatenate(
+        [np.zeros((1, cells.shape[1]), dtype=np.int64), np.cumsum(cells, axis=0)]
+    )
+    counts = (prefix[end] - prefix[start]).reshape(len(a), len(labels), len(labels))
+    return counts, valid
+
+
+def rollingClassificationMetrics(
+    actual,
+    predictions,
+    window=250,
+    expanding=False,
+    minPeriods=None,
+    returnsData=True,
+    noHold=False,
+):
+    """
+    Classification metrics (as ConfusionMatrix) over the window ending at each bar:
+    accuracy, information coefficient (2 * accuracy - 1), and precision and recall of
+    the Buy and Sell labels. Returns a DataFrame, NaN where the window is not valid.
+    """
+    actual, predictions = align(actual, predictions)
+    actual, predictions, labels = classify(actual, predictions, returnsData, noHold)
+    counts, valid = rollingConfusionCounts(
+        actual, predictions, labels, window, expanding, minPeriods
+    )
+
+    total = counts.sum(axis=(1, 2))
+    hits = np.trace(counts, axis1=1, axis2=2)
+    predicted = counts.sum(axis=1)
+    actuals = counts.sum(axis=2)
+    buy, sell = labels.index(1), labels.index(-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = hits / total
+        result = pd.DataFrame(
+            {
+                "accuracy": accuracy,
+                "ic": accuracy * 2 - 1,
+                "precision_buy": counts[:, buy, buy] / predicted[:, buy],
+                "precision_sell": counts[:, sell, sell] / predicted[:, sell],
+                "recall_buy": counts[:, buy, buy] / actuals[:, buy],
+                "recall_sell": counts[:, sell, sell] / actuals[:, sell],
+            },
+            index=actual.index,
+        )
+    result[~valid] = np.nan
+    return result
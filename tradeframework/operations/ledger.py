@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+# Trade ledger. Positions are read from a derivative's bar weights (the allocation to each
+# underlying held from a bar's open to its close). Trades are runs of a position in the
+# same direction, found for every underlying at once by run length encoding the signs of
+# the weight matrix; per-trade sums are reductions over the runs, so building the ledger
+# is a handful of array passes however long the history.
+
+
+def _runs(codes):
+    # Runs of equal values down each column of a (time x asset) matrix, as (column,
+    # start, end) with end exclusive, ordered by column then start. Positions index the
+    # column-major flattening of the matrix.
+    n, k = codes.shape
+    flat = codes.T.ravel()
+    first = np.zeros(n * k, dtype=bool)
+    first[::n] = True
+    first[1:] |= flat[1:] != flat[:-1]
+    start = np.flatnonzero(first)
+    end = np.append(start[1:], n * k)
+    return start // n, start, end
+
+
+def _segmentSums(x, start, end):
+    prefix = np.concatenate([[0], np.cumsum(x)])
+    return prefix[end] - prefix[start]
+
+
+def _segmentMax(x, start, end):
+    # Only the runs left out between start and end separate the segments; they hold no
+    # position, so a reduction from each start to the next covers the same maximum
+    if not len(start):
+        return np.empty(0)
+    return np.maximum.reduceat(x, start)
+
+
+def barWeights(derivative):
+    """
+    (time x underlying) bar weights of a derivative, missing weights as 0.
+    """
+    return derivative.weights.xs("bar", axis=1, level=1).fillna(0)
+
+
+def underlyingPrices(derivative, names, index):
+    """
+    (time x underlying) Open and Close prices of the weighted underlyings, aligned to
+    index.
+    """
+    assets = {asset.getName(): asset for asset in derivative.weightedAssets}
+    values = {name: assets[name].values.reindex(index) for name in names}
+    return (
+        pd.DataFrame({name: v["Open"] for name, v in values.items()}, index=index),
+        pd.DataFrame({name: v["Close"] for name, v in values.items()}, index=index),
+    )
+
+
+def tradeLedger(weights, opens, closes):
+    """
+    Trades of every underlying from (time x underlying) weights and Open/Close prices.
+
+    A trade is a run of bars holding a position in the same direction; the ledger has one
+    row per trade: asset, direction, entry and exit bars (the first and last bars held),
+    bars held, mean and maximum absolute position, entry (open) and exit (close) prices,
+    pnl (sum of weight * (Close - Open), i.e. weights as units) and return (sum of
+    weight * (Close / Open - 1), i.e. weights as fractions of capital). Trades still held
+    at the last bar are flagged as open.
+    """
+    w = np.nan_to_num(np.asarray(weights, dtype=float))
+    o = np.asarray(opens, dtype=float)
+    c = np.asarray(closes, dtype=float)
+    n = len(w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl = np.nan_to_num(w * (c - o)).T.ravel()
+        ret = np.nan_to_num(w * (c / o - 1)).T.ravel()
+
+    column, start, end = _runs(np.sign(w).astype(np.int8))
+    flat = w.T.ravel()
+    held = flat[start] != 0
+    column, start, end = column[held], start[held], end[held]
+    bars = end - start
+    first, last = start - column * n, end - 1 - column * n
+    index, assets = weights.index, weights.columns
+    return pd.DataFrame(
+        {
+            "asset": pd.Categorical.from_codes(column, categories=assets),
+            "direction": np.sign(flat[start]).astype(np.int8),
+            "entry": index[first],
+            "exit": index[last],
+            "bars": bars,
+            "position": _segmentSums(flat, start, end) / bars,
+            "maxPosition": _segmentMax(np.abs(flat), start, end),
+            "entryPrice": o.T.ravel()[start],
+            "exitPrice": c.T.ravel()[end - 1],
+            "pnl": _segmentSums(pnl, start, end),
+            "return": _segmentSums(ret, start, end),
+            "open": last == n - 1,
+        }
+    )
+
+
+def allocationChanges(weights):
+    """
+    Every change of the weight of an underlying, in time order: bar, asset, previous and
+    new weight, and the change.
+    """
+    w = np.nan_to_num(np.asarray(weights, dtype=float))
+    previous = np.vstack([np.zeros((1, w.shape[1])), w[:-1]])
+    rows, columns = np.nonzero(w != previous)
+    return pd.DataFrame(
+        {
+            "bar": weights.index[rows],
+            "asset": pd.Categorical.from_codes(columns, categories=weights.columns),
+            "previous": previous[rows, columns],
+            "weight": w[rows, columns],
+            "change": w[rows, columns] - previous[rows, columns],
+        }
+    )
+
+
+def currentSignals(weights, closes, capital=1):
+    """
+    Latest signal of every underlying from (time x underlying) weights and Close prices,
+    read from the last two bars at once: weight held, previous weight, change, signal
+    (BUY, SELL or HOLD by the sign of the change), last Close and allocation (weight
+    scaled by capital).
+    """
+    w = np.nan_to_num(np.asarray(weights, dtype=float)[-2:])
+    w = np.vstack([np.zeros((2 - len(w), w.shape[1])), w])
+    change = w[1] - w[0]
+    return pd.DataFrame(
+        {
+            "bar": weights.index[-1],
+            "weight": w[1],
+            "previous": w[0],
+            "change": change,
+            "signal": np.select([change > 0, change < 0], ["BUY", "SELL"], "HOLD"),
+            "price": np.asarray(closes, dtype=float)[-1],
+            "allocation": w[1] * capital,
+        },
+        index=pd.Index(weights.columns, name="asset"),
+    )
+
+
+def tradeSummary(trades):
+    """
+    Per-asset summary of a trade ledger: number of trades, win rate, total and mean pnl,
+    total return and mean bars held.
+    """
+    grouped = trades.groupby("asset", observed=False)
+    return pd.DataFrame(
+        {
+            "trades": grouped.size(),
+            "winRate": (trades["pnl"] > 0)
+            .groupby(trades["asset"], observed=False)
+            .mean(),
+            "pnl": grouped["pnl"].sum(),
+            "meanPnl": grouped["pnl"].mean(),
+            "return": grouped["return"].sum(),
+            "meanBars": grouped["bars"].mean(),
+        }
+    )
+
+
+def derivativeLedger(derivative):
+    """
+    Trade ledger and allocation changes of every underlying of a derivative.
+    """
+    weights = barWeights(derivative)
+    opens, closes = underlyingPrices(derivative, weights.columns, weights.index)
+    return tradeLedger(weights, opens, closes), allocationChanges(weights)
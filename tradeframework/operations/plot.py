@@ -6,39 +6,101 @@ from quantutils.core.plot import OHLCChart
 
 import statsmodels.api as sm
 from scipy import stats as scipy_stats
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
 
 import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.dates import AutoDateLocator, AutoDateFormatter
 import tradeframework.operations.utils as utils
+from tradeframework.operations.autocorrelation import Correlogram
+from tradeframework.operations.correlation import selectPairs
 
 import warnings
 import pyfolio
 from IPython.display import display
 
+# Re-aggregate OHLC bars to chart resolution
+
+
+def aggregateOHLC(data, index, columns, maxBars=None):
+    """
+    Resample an OHLC array to at most maxBars equal-count bars (open=first, high=max,
+    low=min, close=last, volume=sum), ignoring NaN bars. Each bar is labelled with the
+    timestamp of its first source bar.
+    """
+    data = np.asarray(data, dtype=float)
+    n = len(data)
+    if maxBars is None or n <= maxBars:
+        return pd.DataFrame(data, index=index, columns=columns)
+
+    starts = np.unique(np.linspace(0, n, maxBars, endpoint=False).astype(int))
+    valid = ~np.isnan(data)
+    positions = np.arange(n)[:, None]
+    first = np.minimum.reduceat(np.where(valid, positions, n), starts, axis=0)
+    last = np.maximum.reduceat(np.where(valid, positions, -1), starts, axis=0)
+
+    result = np.empty((len(starts), data.shape[1]))
+    for i, column in enumerate(columns):
+        if column == "Open":
+            pos = first[:, i]
+            result[:, i] = np.where(pos < n, data[np.minimum(pos, n - 1), i], np.nan)
+        elif column == "High":
+            result[:, i] = np.fmax.reduceat(data[:, i], starts)
+        elif column == "Low":
+            result[:, i] = np.fmin.reduceat(data[:, i], starts)
+        elif column == "Volume":
+            result[:, i] = np.add.reduceat(np.nan_to_num(data[:, i]), starts)
+        else:
+            pos = last[:, i]
+            result[:, i] = np.where(pos >= 0, data[pos, i], np.nan)
+    return pd.DataFrame(result, index=index[starts], columns=columns)
+
+
+def _barRange(index, start=None, end=None):
+    # Positional slice of the bars between start and end (inclusive), for zooming
+    if start is None and end is None:
+        return slice(None)
+    return index.slice_indexer(start, end)
+
+
 # Plot Candlestick chart for an asset
+# maxBars limits the chart payload; pass start/end with maxBars=None to zoom back to
+# full resolution over a date range.
 
 
-def plotAsset(asset, options=None):
+def plotAsset(asset, options=None, maxBars=None, start=None, end=None):
+    values = asset.values.iloc[_barRange(asset.values.index, start, end)]
     chart = OHLCChart(options)
-    chart.addSeries(asset.getName(), asset.values)
+    chart.addSeries(
+        asset.getName(),
+        aggregateOHLC(values.values, values.index, values.columns, maxBars),
+    )
     display(chart.getChart())
     return chart
 
 
-def plotAssetByName(derivative, assetName, options=None):
-    return plotAsset(derivative.findAsset(assetName), options)
+def plotAssetByName(
+    derivative, assetName, options=None, maxBars=None, start=None, end=None
+):
+    return plotAsset(derivative.findAsset(assetName), options, maxBars, start, end)
 
 
-def plotWeightedUnderlying(derivative, underlyingName, options=None):
+def plotWeightedUnderlying(
+    derivative, underlyingName, options=None, maxBars=None, start=None, end=None
+):
     underlying = derivative.env.getAssetStore().getAsset(underlyingName)
-    asset = underlying.values.mul(
-        derivative.weights[underlyingName]["bar"].values, axis=0
-    )
-    asset.replace(0, np.nan, inplace=True)
+    bars = _barRange(underlying.values.index, start, end)
+    values = underlying.values.iloc[bars]
+    weights = derivative.weights[underlyingName]["bar"].values[bars]
+
+    # Weight and mask in a single buffer, rather than through intermediate frames
+    weighted = np.multiply(values.values, weights[:, None], dtype=float)
+    weighted[weighted == 0] = np.nan
+
     chart = OHLCChart(options)
-    chart.addSeries(underlyingName, asset)
+    chart.addSeries(
+        underlyingName,
+        aggregateOHLC(weighted, values.index, values.columns, maxBars),
+    )
     display(chart.getChart())
     return chart
 
@@ -72,35 +134,31 @@ def plotReturns(
     for userdata in custom:
         assets.append(userdata)
 
-    if log:
-
-        def pnl(x):
-            return np.cumsum(
-                np.log(
-                    (
-                        utils.getPeriodReturns(
-                            x.returns[np.prod(derivative.values, axis=1) != 1]
-                        )
-                        + 1
-                    )
-                    .resample("B")
-                    .agg("prod")
-                )
-            )
+    # Traded bars are derived once from the derivative and shared by every series
+    traded = pd.Series(
+        np.prod(derivative.values.values, axis=1) != 1, index=derivative.values.index
+    )
 
-    else:
-
-        def pnl(x):
-            return np.cumprod(
-                (
-                    utils.getPeriodReturns(
-                        x.returns[np.prod(derivative.values, axis=1) != 1]
-                    )
-                    + 1
-                )
-                .resample("B")
-                .agg("prod")
-            )
+    def tradedReturns(x):
+        key = traded
+        if not x.returns.index.equals(traded.index):
+            key = traded.reindex(x.returns.index, fill_value=False)
+        return utils.getPeriodReturns(x.returns[key.values])["period"]
+
+    returns = pd.concat(
+        [tradedReturns(asset) for asset in assets], axis=1, keys=range(len(assets))
+    )
+
+    # Compound every series to business days in one grouped reduction (in log space)
+    grouped = np.log1p(returns).resample("B")
+    logReturns = grouped.sum()
+
+    # Restrict each series to its own date range, as if it were resampled on its own
+    observed = grouped.count() > 0
+    inRange = (observed.cumsum() > 0) & (observed[::-1].cumsum()[::-1] > 0)
+    data = logReturns.where(inRange).cumsum()
+    if not log:
+        data = np.exp(data)
 
     # quarters = MonthLocator([1, 3, 6, 9])
     # allmonths = MonthLocator()
@@ -118,11 +176,11 @@ def plotReturns(
     # ax.xaxis.set_minor_locator(allmonths)
     ax.xaxis.set_major_formatter(auto_formatter)
 
-    for asset in assets:
-        data = pnl(asset)
-        if normalise:
-            data = data / data[-1]
-        ax.plot(data, label=asset.name)
+    if normalise:
+        data = data / data.ffill().iloc[-1]
+
+    for i, asset in enumerate(assets):
+        ax.plot(data[i], label=asset.name)
 
     ax.xaxis_date()
     ax.autoscale_view()
@@ -210,13 +268,23 @@ def displaySummary(
 
 
 def tsplot(
-    y, lags=None, figsize=(15, 10), style="seaborn-darkgrid", title=None, show=False
+    y,
+    lags=None,
+    figsize=(15, 10),
+    style="seaborn-darkgrid",
+    title=None,
+    show=False,
+    correlogram=None,
 ):
     """
     For a summary of any time series data.
+
+    A precomputed Correlogram can be supplied to avoid recomputing the ACF/PACF.
     """
     if not isinstance(y, pd.Series):
         y = pd.Series(y)
+    if correlogram is None:
+        correlogram = Correlogram(y, nlags=30 if lags is None else lags, alpha=0.05)
     with plt.style.context(style):
         fig = plt.figure(figsize=figsize)
         # mpl.rcParams['font.family'] = 'Ubuntu Mono'
@@ -233,8 +301,15 @@ def tsplot(
         if title:
             description = f"{description}: {title}"
         ts_ax.set_title(description)
-        plot_acf(y, lags=lags, ax=acf_ax, alpha=0.05)
-        plot_pacf(y, lags=lags, ax=pacf_ax, alpha=0.05)
+        plotCorrelogram(
+            correlogram.acf, correlogram.acfBand, ax=acf_ax, title="Autocorrelation"
+        )
+        plotCorrelogram(
+            correlogram.pacf,
+            correlogram.pacfBand,
+            ax=pacf_ax,
+            title="Partial Autocorrelation",
+        )
         sm.qqplot(y, line="s", ax=qq_ax)
         qq_ax.set_title("QQ Plot")
         scipy_stats.probplot(y, sparams=(y.mean(), y.std()), plot=pp_ax)
@@ -247,6 +322,187 @@ def tsplot(
     return fig
 
 
+def plotCorrelogram(values, band, ax, title="Autocorrelation"):
+    """
+    Stem plot of (partial) autocorrelations with a shaded confidence band around zero,
+    in the style of statsmodels plot_acf.
+    """
+    lags = np.arange(len(values))
+    ax.vlines(lags, [0], values)
+    ax.axhline(0)
+    ax.plot(lags, values, marker="o", markersize=5, linestyle="None")
+    ax.fill_between(lags, -band, band, alpha=0.25, linewidth=0)
+    ax.set_xlim(-1, len(values))
+    ax.set_title(title)
+    return ax.get_figure()
+
+
+def heatmapPlot(
+    surface,
+    figsize=(15, 6),
+    style="seaborn-darkgrid",
+    title="Heatmap",
+    y_axis="y",
+    cmap="RdBu_r",
+    vmin=-1,
+    vmax=1,
+    show=False,
+):
+    """
+    Render a (rows x time) DataFrame as a single raster image, with time on the x axis.
+    Rows are drawn as equal bands labelled with their index values (e.g. lags), so they
+    need not be contiguous or evenly spaced.
+    """
+    with plt.style.context(style):
+        fig, ax = plt.subplots(figsize=figsize)
+        if isinstance(surface.columns, pd.DatetimeIndex):
+            x0, x1 = matplotlib.dates.date2num(surface.columns[[0, -1]])
+        else:
+            x0, x1 = 0, surface.shape[1] - 1
+        rows = len(surface.index)
+        image = ax.imshow(
+            surface.values,
+            aspect="auto",
+            interpolation="nearest",
+            origin="lower",
+            cmap=cmap,
+            vmin=vmin,
+            vmax=vmax,
+            extent=(x0, x1, -0.5, rows - 0.5),
+        )
+        ticks = np.unique(np.linspace(0, rows - 1, min(rows, 20)).round().astype(int))
+        ax.set_yticks(ticks)
+        ax.set_yticklabels([str(surface.index[i]) for i in ticks])
+        if isinstance(surface.columns, pd.DatetimeIndex):
+            auto_locator = AutoDateLocator()
+            ax.xaxis.set_major_locator(auto_locator)
+            ax.xaxis.set_major_formatter(AutoDateFormatter(auto_locator))
+            plt.setp(ax.get_xticklabels(), rotation=45, horizontalalignment="right")
+        fig.colorbar(image, ax=ax)
+        ax.set_ylabel(y_axis)
+        ax.set_title(title)
+        ax.grid(False)
+        if not show:
+            plt.close()
+    return fig
+
+
+def correlationPlot(
+    corr,
+    threshold=None,
+    topK=None,
+    maxAnnotations=100,
+    maxLabels=60,
+    figsize=(15, 10),
+    style="seaborn-darkgrid",
+    title="Correlation Map",
+    cmap="RdBu_r",
+    show=False,
+):
+    """
+    Render a correlation matrix as a single raster image.
+
+    Only the pairs selected as by correlatedPairs (|correlation| >= threshold and, with
+    topK, the topK strongest partners of each asset) are annotated, the strongest
+    maxAnnotations of them, and asset names are only shown for up to maxLabels assets,
+    so drawing does not grow with the universe. The threshold defaults to 0.8, or to
+    none with topK.
+    """
+    if threshold is None and not topK:
+        threshold = 0.8
+    values = np.asarray(corr, dtype=float)
+    n = len(values)
+    pairs = selectPairs(values, threshold, topK).iloc[:maxAnnotations]
+    rows, cols = pairs["a"].values, pairs["b"].values
+
+    with plt.style.context(style):
+        fig, ax = plt.subplots(figsize=figsize)
+        image = ax.imshow(values, interpolation="nearest", cmap=cmap, vmin=-1, vmax=1)
+        fontsize = max(4, min(10, 400 / max(n, 1)))
+        for i, j in zip(rows, cols):
+            ax.text(
+                j,
+                i,
+                f"{values[i, j]:.2f}",
+                ha="center",
+                va="center",
+                fontsize=fontsize,
+            )
+        if n <= maxLabels:
+            ax.set_xticks(range(n))
+            ax.set_yticks(range(n))
+            ax.set_xticklabels(corr.columns, rotation=90)
+            ax.set_yticklabels(corr.index)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+        fig.colorbar(image, ax=ax)
+        ax.set_title(title)
+        ax.grid(False)
+        if not show:
+            plt.close()
+    return fig
+
+
+def tearSheetPlot(
+    sheet, figsize=(15, 20), style="seaborn-darkgrid", title="Tear Sheet", show=False
+):
+    """
+    Render the panels of a tear sheet (see operations/tearsheet.py) in one figure.
+    """
+    with plt.style.context(style):
+        fig, axes = plt.subplots(4, 2, figsize=figsize)
+        (
+            (cumulative, underwater),
+            (volatility, sharpe),
+            (monthly, annual),
+            (
+                quantiles,
+                table,
+            ),
+        ) = axes
+
+        cumulative.plot(sheet["cumulative"].index, sheet["cumulative"].values)
+        cumulative.set_title("Cumulative returns")
+        underwater.fill_between(
+            sheet["underwater"].index, sheet["underwater"].values, 0, color="red"
+        )
+        underwater.set_title("Underwater")
+        volatility.plot(sheet["rolling"].index, sheet["rolling"]["volatility"].values)
+        volatility.set_title("Rolling volatility")
+        sharpe.plot(sheet["rolling"].index, sheet["rolling"]["sharpe"].values)
+        sharpe.axhline(0, color="black", linewidth=0.5)
+        sharpe.set_title("Rolling Sharpe ratio")
+
+        image = monthly.imshow(
+            sheet["monthly"].values * 100, aspect="auto", cmap="RdYlGn"
+        )
+        monthly.set_yticks(range(len(sheet["monthly"])))
+        monthly.set_yticklabels(sheet["monthly"].index)
+        monthly.set_xticks(range(sheet["monthly"].shape[1]))
+        monthly.set_xticklabels(sheet["monthly"].columns)
+        monthly.grid(False)
+        fig.colorbar(image, ax=monthly)
+        monthly.set_title("Monthly returns (%)")
+        annual.barh(sheet["annual"].index.astype(str), sheet["annual"].values * 100)
+        annual.set_title("Annual returns (%)")
+
+        (sheet["quantiles"] * 100).T.plot.bar(ax=quantiles, legend=True)
+        quantiles.set_title("Return quantiles (%)")
+
+        stats = pd.Series(sheet["stats"]).round(3)
+        table.axis("off")
+        table.table(cellText=stats.values[:, None], rowLabels=stats.index, loc="center")
+
+        for ax in (cumulative, underwater, volatility, sharpe):
+            plt.setp(ax.get_xticklabels(), rotation=45, horizontalalignment="right")
+        fig.suptitle(title)
+        fig.tight_layout()
+        if not show:
+            plt.close()
+    return fig
+
+
 def scatterPlot(
     x,
     y,
@@ -291,14 +547,19 @@ def histogram(
     x_axis="x",
     ax=None,
     show=False,
+    counts=None,
+    bins=100,
 ):
-    if not isinstance(x, pd.Series):
-        x = pd.Series(x)
+    """
+    Histogram of x. Precomputed counts (e.g. from a FixedHistogram sketch) can be
+    supplied with their bin edges as `bins`, in which case x is not scanned.
+    """
+    if counts is None:
+        counts, bins = np.histogram(x, bins=bins)
 
     with plt.style.context(style):
         if ax is None:
             _, ax = plt.subplots(figsize=figsize)
-        counts, bins = np.histogram(x, bins=100)
         # plt.stairs(counts, bins)
         ax.hist(bins[:-1], bins, weights=counts)
 
@@ -0,0 +1,115 @@
+import contextlib
+import contextvars
+import numpy as np
+
+# Compute precision. Kernels build their working arrays in the dtype returned by
+# getDtype() (float64 unless running inside a precision() block), so screening large
+# panels in float32 halves memory and bandwidth. Accumulated sums are the exception: prefix
+# sums are kept as compensated hi + lo pairs, so window sums taken as differences of long
+# prefixes do not lose the precision of the window. A compensated float32 prefix takes as
+# much memory as a float64 one; precision(dtype, compensated=False) keeps only hi, halving
+# it, at the cost of window sums that lose precision as the prefix grows.
+
+_dtype = contextvars.ContextVar("tradeframework.dtype", default=np.dtype(np.float64))
+_compensated = contextvars.ContextVar("tradeframework.compensated", default=True)
+
+# Rows accumulated at a time when building compensated prefix sums
+BLOCK = 65536
+
+
+def getDtype():
+    return _dtype.get()
+
+
+def isCompensated():
+    return _compensated.get()
+
+
+@contextlib.contextmanager
+def precision(dtype, compensated=True):
+    """
+    Run kernels in the given float dtype (e.g. np.float32) within the block, with
+    compensated (hi + lo) prefix sums unless compensated is False.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind != "f":
+        raise Exception(f"Unsupported dtype: {dtype}")
+    token = _dtype.set(dtype)
+    compensatedToken = _compensated.set(compensated)
+    try:
+        yield dtype
+    finally:
+        _compensated.reset(compensatedToken)
+        _dtype.reset(token)
+
+
+def asFloat(x):
+    """
+    x as an array of the compute dtype.
+    """
+    return np.asarray(x, dtype=getDtype())
+
+
+class _Pair:
+    def __init__(self, hi, lo):
+        self.hi = hi
+        self.lo = lo
+
+    def __sub__(self, other):
+        return (self.hi - other.hi) + (self.lo - other.lo)
+
+
+class CompensatedPrefix:
+    """
+    Prefix sums stored as hi + lo, where hi is the sum rounded to the compute dtype and lo
+    the rounding error. Indexing returns a pair; subtracting two pairs returns the window
+    sum in the compute dtype.
+    """
+
+    def __init__(self, hi, lo):
+        self.hi = hi
+        self.lo = lo
+        self.shape = hi.shape
+        self.dtype = hi.dtype
+
+    def __getitem__(self, index):
+        return _Pair(self.hi[index], self.lo[index])
+
+    def window(self, end, start, dtype=None):
+        """
+        Sums of the windows [start, end), optionally in a wider dtype than the prefix.
+        """
+        dtype = dtype or self.dtype
+        return (self.hi[end].astype(dtype) - self.hi[start]) + (
+            self.lo[end].astype(dtype) - self.lo[start]
+        )
+
+    def take(self, indices, axis):
+        return _Pair(
+            np.take_along_axis(self.hi, indices, axis=axis),
+            np.take_along_axis(self.lo, indices, axis=axis),
+        )
+
+
+def compensatedPrefixSum(x, axis=0, block=BLOCK, compensated=True):
+    """
+    Cumulative sum of x along axis with a leading zero, as a CompensatedPrefix. Each block
+    is accumulated in float64 from a float64 carry, so only one block is ever held at full
+    precision. Without compensation only the rounded sums are kept, as an array.
+    """
+    x = np.moveaxis(np.asarray(x), axis, 0)
+    shape = (len(x) + 1,) + x.shape[1:]
+    hi = np.zeros(shape, dtype=x.dtype)
+    lo = np.zeros(shape, dtype=x.dtype) if compensated else None
+    carry = np.zeros(x.shape[1:])
+    for i in range(0, len(x), block):
+        total = np.cumsum(x[i : i + block], axis=0, dtype=np.float64)
+        total += carry
+        rows = slice(i + 1, i + 1 + len(total))
+        hi[rows] = total
+        if compensated:
+            lo[rows] = total - hi[rows]
+        carry = total[-1]
+    if not compensated:
+        return np.moveaxis(hi, 0, axis)
+    return CompensatedPrefix(np.moveaxis(hi, 0, axis), np.moveaxis(lo, 0, axis))
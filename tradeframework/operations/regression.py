@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from tradeframework.operations.rolling import prefixSum, windowSum, windowBounds
+from tradeframework.operations.precision import asFloat
+
+# Rolling and exponentially weighted least squares. The cross products of [1, X, y] are
+# accumulated once, as prefix sums for rolling windows or as exponentially decaying sums
+# (a first order recursive filter) for the weighted variant, so each step only solves
+# its small normal equations: O(n) in total, whatever the window.
+
+
+def _products(design, target):
+    # Outer products of [X, y] at each bar, flattened to (n, (p + 1)^2)
+    z = np.column_stack([design, target])
+    return np.einsum("ti,tj->tij", z, z).reshape(len(z), -1)
+
+
+def _decayingSum(x, decay):
+    # s[t] = x[t] + decay * s[t-1], down axis 0 (filtered along contiguous rows)
+    return lfilter([1], [1, -decay], np.ascontiguousarray(x.T), axis=-1).T
+
+
+def _inverse(xtx):
+    try:
+        return np.linalg.inv(xtx)
+    except np.linalg.LinAlgError:
+        # Degenerate windows (e.g. a flat baseline, or no down bars yet for the timing
+        # term) take the pseudo-inverse; only those, the others are inverted in one batch
+        singular = np.linalg.det(xtx) == 0
+        result = np.empty_like(xtx)
+        result[~singular] = np.linalg.inv(xtx[~singular])
+        result[singular] = np.linalg.pinv(xtx[singular])
+        return result
+
+
+def _solve(sums, count, p):
+    # Batch solve of the normal equations, with t-stats from the (weighted) least squares
+    # covariance sigma^2 (X'WX)^-1, sigma^2 = weighted RSS / (count - p), as statsmodels
+    # WLS (OLS for equal weights). Solved in float64 whatever the compute dtype, the
+    # systems are small.
+    sums = np.asarray(sums, dtype=np.float64).reshape(-1, p + 1, p + 1)
+    xtx, xty, yty = sums[:, :p, :p], sums[:, :p, p], sums[:, p, p]
+    xtxInv = _inverse(xtx)
+    coef = np.einsum("wij,wj->wi", xtxInv, xty)
+    rss = yty - np.einsum("wi,wi->w", coef, xty)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma2 = np.clip(rss, 0, None) / (count - p)
+        tstat = coef / np.sqrt(sigma2[:, None] * np.diagonal(xtxInv, axis1=1, axis2=2))
+    return coef, tstat
+
+
+def rollingRegression(
+    y, X, window=250, expanding=False, minPeriods=None, halflife=None
+):
+    """
+    Least squares regression of y on a constant and the columns of X over the window
+    ending at each bar, or with exponentially decaying weights (halflife in bars) over
+    all the bars so far.
+
+    Returns (coef, tstat, nobs): coefficients and t-statistics of [constant, X...] at
+    each bar (NaN where the window is not valid), and the number of observations. The
+    t-statistics of the weighted fit are those of weighted least squares (statsmodels
+    WLS with weights decaying by halflife).
+    """
+    y = asFloat(y)
+    X = asFloat(X).reshape(len(y), -1)
+    n, p = len(y), X.shape[1] + 1
+    products = _products(np.column_stack([np.ones(n, dtype=X.dtype), X]), y)
+
+    if halflife is None:
+        start, end, valid = windowBounds(n, window, expanding, minPeriods)
+        sums = windowSum(prefixSum(products), end, start, np.float64)
+        count = (end - start).astype(float)
+    else:
+        decay = 0.5 ** (1 / halflife)
+        sums = _decayingSum(products.astype(np.float64), decay)
+        count = np.arange(1, n + 1, dtype=float)
+        valid = count >= (minPeriods or p + 1)
+
+    coef = np.full((n, p), np.nan)
+    tstat = np.full((n, p), np.nan)
+    nobs = np.full(n, np.nan)
+    valid &= count > p
+    if valid.any():
+        coef[valid], tstat[valid] = _solve(sums[valid], count[valid], p)
+        nobs[valid] = count[valid]
+    return coef, tstat, nobs
+
+
+def rollingBeta(returns, baseline, timing=False, **kwargs):
+    """
+    Rolling alpha and beta of returns against baseline returns, and with timing the
+    Henriksson-Merton market timing coefficient: returns ~ alpha + beta * baseline +
+    timing * max(0, -baseline). A positive timing coefficient means the returns held up
+    better than beta alone implies when the baseline fell.
+
+    kwargs are passed to rollingRegression. Returns a DataFrame of the coefficients,
+    their t-statistics and nobs, on the common index of the two series.
+    """
+    data = pd.concat([returns, baseline], axis=1, join="inner").dropna()
+    y, x = data.iloc[:, 0].values, data.iloc[:, 1].values
+    names = ["alpha", "beta"]
+    X = x[:, None]
+    if timing:
+        names.append("timing")
+        X = np.column_stack([x, np.maximum(0, -x)])
+
+    coef, tstat, nobs = rollingRegression(y, X, **kwargs)
+    result = pd.DataFrame(coef, index=data.index, columns=names)
+    for i, name in enumerate(names):
+        result[f"{name}_t"] = tstat[:, i]
+    result["nobs"] = nobs
+    return result
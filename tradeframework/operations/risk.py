@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Rolling historical tail risk. Order statistics for every window are answered by a
+# wavelet matrix built over the value ranks of a chunk of windows: each k-th smallest
+# (and sum of the k smallest) query costs O(log n), and all windows of a chunk and every
+# confidence level are resolved together as vectorised queries. A wavelet matrix holds
+# O(n log n) counts and sums, so it is built per chunk rather than over a whole (e.g.
+# intraday) series, which keeps memory at O(c log c) for chunks of c bars.
+
+
+class WaveletMatrix:
+    """
+    Static order-statistic index over a sequence of values.
+
+    kthSmallest(l, r, k) returns the k-th smallest (0-based) value in values[l:r] and the
+    sum of the k+1 smallest values, for arrays of queries at once.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        order = np.argsort(values, kind="mergesort")
+        ranks = np.empty(n, dtype=np.int64)
+        ranks[order] = np.arange(n)
+
+        self.sorted = values[order]
+        self.levels = max(int(n - 1).bit_length(), 1)
+        countType = np.int32 if n < 2**31 else np.int64
+        self.zeroCounts = np.empty((self.levels, n + 1), dtype=countType)
+        self.zeroSums = np.empty((self.levels, n + 1))
+        self.zeros = np.empty(self.levels, dtype=np.int64)
+
+        current = ranks
+        for level in range(self.levels):
+            isZero = ((current >> (self.levels - 1 - level)) & 1) == 0
+            self.zeroCounts[level, 0] = 0
+            np.cumsum(isZero, out=self.zeroCounts[level, 1:])
+            self.zeroSums[level, 0] = 0
+            np.cumsum(
+                np.where(isZero, self.sorted[current], 0), out=self.zeroSums[level, 1:]
+            )
+            self.zeros[level] = self.zeroCounts[level, -1]
+            current = np.concatenate([current[isZero], current[~isZero]])
+
+    def kthSmallest(self, l, r, k):
+        l = np.array(l, dtype=np.int64)
+        r = np.array(r, dtype=np.int64)
+        k = np.array(k, dtype=np.int64)
+        rank = np.zeros(len(k), dtype=np.int64)
+        below = np.zeros(len(k))
+        for level in range(self.levels):
+            zl = self.zeroCounts[level, l]
+            zr = self.zeroCounts[level, r]
+            zeros = zr - zl
+            right = k >= zeros
+            # Moving right: every element that went left is smaller than the answer
+            below += np.where(
+                right, self.zeroSums[level, r] - self.zeroSums[level, l], 0
+            )
+            rank |= right.astype(np.int64) << (self.levels - 1 - level)
+            k = np.where(right, k - zeros, k)
+            l = np.where(right, self.zeros[level] + l - zl, zl)
+            r = np.where(right, self.zeros[level] + r - zr, zr)
+        value = self.sorted[rank]
+        return value, below + value
+
+
+def rollingVaR(returns, window=250, levels=(0.95, 0.99), chunkSize=None):
+    """
+    Rolling historical Value at Risk and Expected Shortfall of a returns series.
+
+    For confidence level c and window w, the tail holds m = ceil(w * (1 - c)) returns;
+    VaR is minus the m-th smallest return and ES is minus the mean of the m smallest.
+    Both are reported as positive losses. Returns a DataFrame with (measure, level)
+    columns, NaN until a full window is available.
+
+    Windows are evaluated in chunks of chunkSize windows (default max(4 * window,
+    65536)), each indexing chunkSize + window - 1 bars.
+    """
+    returns = returns.dropna()
+    values = returns.values
+    n = len(values)
+    columns = pd.MultiIndex.from_product([["VaR", "ES"], levels])
+    result = pd.DataFrame(np.nan, index=returns.index, columns=columns)
+    if n < window:
+        return result
+
+    # Rounded first: window * (1 - c) is often whole but not exactly so in floating
+    # point (e.g. 500 * (1 - 0.99)), which would add an observation to the tail
+    tail = np.array([max(int(np.ceil(round(window * (1 - c), 9))), 1) for c in levels])
+    chunkSize = chunkSize or max(4 * window, 2**16)
+
+    measures = []
+    for first in range(window, n + 1, chunkSize):
+        end = np.arange(first, min(first + chunkSize, n + 1))
+        offset = first - window
+        matrix = WaveletMatrix(values[offset : end[-1]])
+
+        # One batch of queries covering every window of the chunk at every level
+        l = np.tile(end - window - offset, len(levels))
+        r = np.tile(end - offset, len(levels))
+        k = np.repeat(tail - 1, len(end))
+        value, total = matrix.kthSmallest(l, r, k)
+
+        value = -value.reshape(len(levels), -1).T
+        shortfall = -(total.reshape(len(levels), -1) / tail[:, None]).T
+        measures.append(np.hstack([value, shortfall]))
+    result.iloc[window - 1 :] = np.vstack(measures)
+    return result
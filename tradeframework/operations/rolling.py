@@ -0,0 +1,125 @@
+import numpy as np
+from tradeframework.operations.precision import (
+    asFloat,
+    isCompensated,
+    CompensatedPrefix,
+    compensatedPrefixSum,
+)
+
+# Rolling window kernels built on prefix sums. Every windowed sum is the difference of two
+# prefix sums, so a kernel costs O(n) regardless of the window length and many windows
+# or lags can share the same cumulative arrays.
+
+
+def prefixSum(x, axis=0):
+    """
+    Cumulative sum of x along axis with a leading zero, so that the sum of x[s:e] is
+    prefix[e] - prefix[s]. Below float64 the sums are accumulated in float64 and, unless
+    disabled, compensated (see precision.py).
+    """
+    x = asFloat(x)
+    if x.dtype != np.float64:
+        return compensatedPrefixSum(x, axis=axis, compensated=isCompensated())
+    shape = list(x.shape)
+    shape[axis] = 1
+    return np.concatenate([np.zeros(shape), np.cumsum(x, axis=axis)], axis=axis)
+
+
+def windowSum(prefix, end, start, dtype=None):
+    """
+    prefix[end] - prefix[start] for prefix sums returned by prefixSum, optionally
+    computed in a wider dtype.
+    """
+    if isinstance(prefix, CompensatedPrefix):
+        return prefix.window(end, start, dtype)
+    return (prefix[end] - prefix[start]).astype(dtype or prefix.dtype, copy=False)
+
+
+def takePrefix(prefix, indices, axis):
+    """
+    np.take_along_axis for prefix sums returned by prefixSum.
+    """
+    if isinstance(prefix, CompensatedPrefix):
+        return prefix.take(indices, axis)
+    return np.take_along_axis(prefix, indices, axis=axis)
+
+
+def windowBounds(n, window, expanding=False, minPeriods=None):
+    """
+    Start and end (exclusive) indices of the window ending at each bar.
+    Rolling windows span `window` bars; expanding windows start at bar 0. Windows are
+    valid once they hold at least `minPeriods` bars (default `window`).
+    """
+    end = np.arange(1, n + 1)
+    if expanding:
+        start = np.zeros(n, dtype=int)
+    else:
+        start = np.clip(end - window, 0, None)
+    if minPeriods is None:
+        minPeriods = window
+    valid = (end - start) >= minPeriods
+    return start, end, valid
+
+
+def laggedProducts(x, lags):
+    """
+    Matrix of lagged products p[k, t] = x[t] * x[t - lags[k]] (zero where t < lag).
+    """
+    x = asFloat(x)
+    lags = np.asarray(lags, dtype=int)
+    products = np.zeros((len(lags), len(x)), dtype=x.dtype)
+    for i, lag in enumerate(lags):
+        products[i, lag:] = x[lag:] * x[: len(x) - lag]
+    return products
+
+
+def shiftBack(values, offset, axis=-1):
+    """
+    Shift estimates back by `offset` bars along axis so that a trailing window is centred.
+    """
+    if not offset:
+        return values
+    values = np.moveaxis(values, axis, -1)
+    shifted = np.full(values.shape, np.nan, dtype=values.dtype)
+    shifted[..., : values.shape[-1] - offset] = values[..., offset:]
+    return np.moveaxis(shifted, -1, axis)
+
+
+def movingAutocorrelation(x, lags, window, offset=0):
+    """
+    Rolling-window autocorrelation of x for every lag in `lags` in a single pass.
+
+    Returns a (lags x time) matrix where entry [k, t] is the Pearson correlation between
+    x[t-window+1..t] and the same window lagged by lags[k]. Windows reaching before the
+    start of the series are NaN.
+    """
+    x = asFloat(x)
+    lags = np.asarray(lags, dtype=int)
+    n = len(x)
+
+    s1 = prefixSum(x)
+    s2 = prefixSum(x**2)
+    sp = prefixSum(laggedProducts(x, lags), axis=1)
+
+    shape = (len(lags), n)
+    end = np.broadcast_to(np.arange(1, n + 1), shape)
+    start = end - window
+    lagged = start - lags[:, None]
+    valid = lagged >= 0
+    start = np.clip(start, 0, None)
+    lagged = np.clip(lagged, 0, None)
+    lagEnd = np.clip(end - lags[:, None], 0, None)
+
+    sa = s1[end] - s1[start]
+    sb = s1[lagEnd] - s1[lagged]
+    saa = s2[end] - s2[start]
+    sbb = s2[lagEnd] - s2[lagged]
+    sab = takePrefix(sp, end, axis=1) - takePrefix(sp, start, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (window * sab - sa * sb) / np.sqrt(
+            (window * saa - sa**2) * (window * sbb - sb**2)
+        )
+    result[~valid] = np.nan
+
+    return shiftBack(result, offset)
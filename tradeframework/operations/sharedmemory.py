@@ -0,0 +1,296 @@
+import os
+import sys
+import weakref
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+# Shared memory publication of a derivative for process pool workers. The owning process
+# copies the pandas series of the derivative (returns, values, weights), of its weighted
+# underlyings and optionally of the asset store into a single shared memory segment once.
+# Workers receive a small picklable handle instead of the derivative, and open it as
+# read-only numpy/pandas views onto the segment, without copying.
+
+FRAMES = ("returns", "values", "weights")
+
+# Byte alignment of each array within the segment
+ALIGNMENT = 64
+
+# Segments attached by this process, by name, and segments it created
+_attached = {}
+_owned = set()
+
+
+def _sharesTracker(owner):
+    # Processes started by multiprocessing (fork, spawn or forkserver) from the owner
+    # share its resource tracker; other processes start their own. (A process forked
+    # before the owner's tracker was started has its own too: publish before forking.)
+    import multiprocessing
+
+    parent = multiprocessing.parent_process()
+    return parent is not None and parent.pid == owner
+
+
+def _attach(name, owner=None):
+    if name not in _attached:
+        if sys.version_info >= (3, 13):
+            segment = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shared = name in _owned or _sharesTracker(owner)
+            segment = shared_memory.SharedMemory(name=name)
+            if not shared:
+                # Only the owner unlinks the segment; stop this process's own resource
+                # tracker from unlinking it when the process exits. A tracker shared
+                # with the owner must keep the owner's registration, so it still
+                # unlinks the segment if the owner dies without closing it.
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(segment._name, "shared_memory")
+        _attached[name] = segment
+    return _attached[name]
+
+
+def detach():
+    """
+    Close the segments attached by this process. Segments with views still alive stay
+    attached.
+    """
+    for name, segment in list(_attached.items()):
+        try:
+            segment.close()
+            del _attached[name]
+        except BufferError:
+            pass
+
+
+class ArrayHandle:
+    """
+    Location of an array within a shared memory segment.
+    """
+
+    def __init__(self, segment, offset, shape, dtype, owner=None):
+        self.segment = segment
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+        # Process id of the owner
+        self.owner = owner
+
+    def open(self):
+        # frombuffer holds an export of the mapping, so it cannot be closed under the view
+        array = np.frombuffer(
+            _attach(self.segment, self.owner).buf,
+            dtype=self.dtype,
+            count=int(np.prod(self.shape)),
+            offset=self.offset,
+        ).reshape(self.shape)
+        array.flags.writeable = False
+        return array
+
+
+class FrameHandle:
+    """
+    A DataFrame or Series of a single numeric dtype: its values (and a DatetimeIndex) in
+    shared memory, other labels carried in the handle.
+    """
+
+    def __init__(self, values, index, columns=None, label=None, name=None, dtype=None):
+        self.values = values
+        self.index = index
+        self.columns = columns
+        self.label = label
+        self.name = name
+        self.dtype = dtype
+
+    def open(self):
+        index = self.index
+        if isinstance(index, ArrayHandle):
+            # Epoch timestamps, read as the original (possibly tz-aware) dtype
+            index = pd.DatetimeIndex(
+                index.open(), dtype=self.dtype, name=self.name, copy=False
+            )
+        values = self.values.open()
+        if self.columns is None:
+            return pd.Series(values, index=index, name=self.label, copy=False)
+        return pd.DataFrame(values, index=index, columns=self.columns, copy=False)
+
+
+class AssetHandle:
+    """
+    Picklable handle to an asset (or derivative) published in shared memory.
+    """
+
+    def __init__(self, name, frames, weighted=None, store=None):
+        self.name = name
+        self.frames = frames
+        self.weighted = weighted
+        self.store = store
+
+    def open(self, _opened=None):
+        """
+        Read-only view of the asset: getName(), its pandas series, weightedAssets and
+        (if published) env.getAssetStore() / env.findAsset(), sharing views of the
+        same assets.
+        """
+        opened = {} if _opened is None else _opened
+        if self.name in opened:
+            return opened[self.name]
+        view = SharedAssetView(self.name, {k: f.open() for k, f in self.frames.items()})
+        opened[self.name] = view
+        if self.weighted is not None:
+            view.weightedAssets = [a.open(opened) for a in self.weighted]
+        if self.store is not None:
+            view.env = SharedEnvironment([a.open(opened) for a in self.store])
+        return view
+
+
+class SharedAssetView:
+    """
+    Asset opened from an AssetHandle. The pandas series are read-only views onto shared
+    memory.
+    """
+
+    def __init__(self, name, frames):
+        self.name = name
+        for attr, frame in frames.items():
+            setattr(self, attr, frame)
+
+    def getName(self):
+        return self.name
+
+
+class SharedEnvironment:
+    """
+    Minimal environment of a SharedAssetView: the published asset store.
+    """
+
+    class _Store:
+        def __init__(self, assets):
+            self.store = {asset.getName(): asset for asset in assets}
+
+        def getAsset(self, name):
+            return self.store[name]
+
+    def __init__(self, assets):
+        self.assetStore = SharedEnvironment._Store(assets)
+
+    def getAssetStore(self):
+        return self.assetStore
+
+    def findAsset(self, name):
+        return self.assetStore.getAsset(name)
+
+
+class SharedDerivative:
+    """
+    Publish a derivative into shared memory.
+
+    The owner keeps this object (or uses it as a context manager) and sends `handle` to
+    workers, which call handle.open() for a read-only view. Frames must be numeric and
+    of a single dtype (mixed dtype frames raise rather than being upcast); frames shared
+    between assets are published once. close() (or leaving the context, or garbage
+    collection) unlinks the segment.
+    """
+
+    def __init__(self, derivative, assetStore=False):
+        self._arrays = []
+        self._published = {}
+        self.handle = self._asset(
+            derivative, hasattr(derivative, "weightedAssets"), assetStore
+        )
+
+        size = max([h.offset + a.nbytes for a, h in self._arrays] + [1])
+        self.segment = shared_memory.SharedMemory(create=True, size=size)
+        _owned.add(self.segment.name)
+        for array, handle in self._arrays:
+            handle.segment = self.segment.name
+            handle.owner = os.getpid()
+            np.ndarray(
+                array.shape,
+                dtype=array.dtype,
+                buffer=self.segment.buf,
+                offset=handle.offset,
+            )[...] = array
+        self._arrays = self._published = None
+        self._finalizer = weakref.finalize(self, SharedDerivative._unlink, self.segment)
+
+    def _array(self, array):
+        # Placed after the previous array, aligned; the segment is named once allocated
+        end = (
+            self._arrays[-1][1].offset + self._arrays[-1][0].nbytes
+            if self._arrays
+            else 0
+        )
+        offset = -(-end // ALIGNMENT) * ALIGNMENT
+        handle = ArrayHandle(None, offset, array.shape, array.dtype.str)
+        self._arrays.append((array, handle))
+        return handle
+
+    def _frame(self, data):
+        # Frames shared between assets are published once (kept alive here so their ids
+        # are not reused)
+        if id(data) not in self._published:
+            # A frame's values would be silently upcast to a common dtype
+            dtypes = sorted(
+                set(map(str, data.dtypes if data.ndim == 2 else [data.dtype]))
+            )
+            if len(dtypes) > 1:
+                raise Exception(f"Cannot share mixed dtype data: {', '.join(dtypes)}")
+            values = np.ascontiguousarray(data.values)
+            if values.dtype.kind not in "biuf":
+                raise Exception(f"Cannot share non-numeric data: {values.dtype}")
+            index = data.index
+            if isinstance(index, pd.DatetimeIndex):
+                index = self._array(np.ascontiguousarray(index.asi8))
+            frame = FrameHandle(
+                self._array(values),
+                index,
+                columns=getattr(data, "columns", None),
+                label=getattr(data, "name", None) if data.ndim == 1 else None,
+                name=data.index.name,
+                dtype=str(data.index.dtype),
+            )
+            self._published[id(data)] = (data, frame)
+        return self._published[id(data)][1]
+
+    def _asset(self, asset, weighted=False, store=False):
+        frames = {
+            attr: self._frame(getattr(asset, attr))
+            for attr in FRAMES
+            if isinstance(getattr(asset, attr, None), (pd.DataFrame, pd.Series))
+        }
+        return AssetHandle(
+            asset.getName(),
+            frames,
+            [self._asset(a) for a in asset.weightedAssets] if weighted else None,
+            (
+                [self._asset(a) for a in asset.env.getAssetStore().store.values()]
+                if store
+                else None
+            ),
+        )
+
+    @staticmethod
+    def _unlink(segment):
+        # Unlinked first: the memory itself is released once every mapping is closed
+        segment.unlink()
+        segment.close()
+        _owned.discard(segment.name)
+        attached = _attached.get(segment.name)
+        if attached is not None:
+            try:
+                attached.close()
+                del _attached[segment.name]
+            except BufferError:
+                # Views opened in this process are still alive; the mapping stays
+                # attached (the memory is released once it is closed, see detach())
+                pass
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,303 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Mergeable summaries of a distribution. Both sketches can be built independently per
+# chunk (e.g. per day), combined cheaply with merge(), and persisted, so distribution
+# plots and tail quantiles over long histories only need to sketch new data.
+
+
+class FixedHistogram:
+    """
+    Histogram over fixed bin edges, with underflow/overflow counts.
+    Histograms with identical edges merge by adding counts.
+    """
+
+    def __init__(self, edges, counts=None, underflow=0, overflow=0):
+        self.edges = np.asarray(edges, dtype=float)
+        if counts is None:
+            counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.underflow = int(underflow)
+        self.overflow = int(overflow)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        bins = np.searchsorted(self.edges, values, side="right") - 1
+        # Include the right-most edge in the last bin, as np.histogram does
+        bins[values == self.edges[-1]] = len(self.counts) - 1
+        inRange = (bins >= 0) & (bins < len(self.counts))
+        self.counts += np.bincount(bins[inRange], minlength=len(self.counts))
+        self.underflow += int(np.sum(values < self.edges[0]))
+        self.overflow += int(np.sum(values > self.edges[-1]))
+        return self
+
+    def merge(self, *others):
+        for other in others:
+            if not np.array_equal(self.edges, other.edges):
+                raise Exception("Cannot merge histograms with different edges")
+        histograms = (self,) + others
+        return FixedHistogram(
+            self.edges,
+            np.sum([h.counts for h in histograms], axis=0),
+            sum(h.underflow for h in histograms),
+            sum(h.overflow for h in histograms),
+        )
+
+    def total(self):
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+
+class QuantileSketch:
+    """
+    Merging t-digest quantile sketch.
+
+    Values are summarised as weighted centroids whose size is bounded by the k2 scale
+    function, so accuracy is highest in the tails. Compression is fully vectorised: the
+    cumulative weight of each sorted centroid is mapped to k-space and centroids falling
+    in the same unit of k are combined.
+    """
+
+    def __init__(
+        self, compression=500, means=None, weights=None, minimum=None, maximum=None
+    ):
+        self.compression = compression
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype=float)
+        self.weights = (
+            np.empty(0) if weights is None else np.asarray(weights, dtype=float)
+        )
+        self.minimum = np.inf if minimum is None else float(minimum)
+        self.maximum = -np.inf if maximum is None else float(maximum)
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        if total == 0:
+            return means, weights
+        # Scale function k2: k(q) = compression / Z * log(q / (1 - q)), which bounds the
+        # relative (rather than absolute) rank error, keeping extreme tails accurate
+        z = 4 * np.log(max(total / self.compression, 1)) + 24
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / z * np.log(q / (1 - q))
+        groups = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.diff(groups, prepend=-1))
+        groupWeights = np.add.reduceat(weights, starts)
+        groupMeans = np.add.reduceat(means * weights, starts) / groupWeights
+        return groupMeans, groupWeights
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=float)
+        if weights is None:
+            weights = np.ones(len(values))
+        keep = ~np.isnan(values)
+        values, weights = values[keep], np.asarray(weights, dtype=float)[keep]
+        if len(values) == 0:
+            return self
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+        self.means, self.weights = self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, weights]),
+        )
+        return self
+
+    def merge(self, *others):
+        sketches = (self,) + others
+        merged = QuantileSketch(
+            self.compression,
+            minimum=min(s.minimum for s in sketches),
+            maximum=max(s.maximum for s in sketches),
+        )
+        merged.means, merged.weights = merged._compress(
+            np.concatenate([s.means for s in sketches]),
+            np.concatenate([s.weights for s in sketches]),
+        )
+        return merged
+
+    def count(self):
+        return self.weights.sum()
+
+    def quantile(self, q):
+        """
+        Estimate quantiles q (scalar or array in [0, 1]) by interpolating between
+        centroid midpoints, anchored at the observed minimum and maximum.
+        """
+        q = np.asarray(q, dtype=float)
+        if len(self.means) == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centres = (np.cumsum(self.weights) - self.weights / 2) / total
+        positions = np.concatenate([[0], centres, [1]])
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+        return np.interp(q, positions, values)
+
+
+class DistributionSketch:
+    """
+    Histogram and quantile sketch of the same data, merged and persisted together.
+    """
+
+    def __init__(self, edges, compression=500, histogram=None, quantiles=None):
+        self.histogram = histogram if histogram is not None else FixedHistogram(edges)
+        self.quantiles = (
+            quantiles if quantiles is not None else QuantileSketch(compression)
+        )
+
+    def update(self, values):
+        self.histogram.update(values)
+        self.quantiles.update(values)
+        return self
+
+    def merge(self, *others):
+        return DistributionSketch(
+            self.histogram.edges,
+            histogram=self.histogram.merge(*[o.histogram for o in others]),
+            quantiles=self.quantiles.merge(*[o.quantiles for o in others]),
+        )
+
+    def toArrays(self, prefix=""):
+        flows = [self.histogram.underflow, self.histogram.overflow]
+        extent = [self.quantiles.minimum, self.quantiles.maximum]
+        return {
+            prefix + "counts": self.histogram.counts,
+            prefix + "flows": np.array(flows),
+            prefix + "means": self.quantiles.means,
+            prefix + "weights": self.quantiles.weights,
+            prefix + "range": np.array(extent),
+        }
+
+    @staticmethod
+    def fromArrays(arrays, edges, compression, prefix=""):
+        flows = arrays[prefix + "flows"]
+        extent = arrays[prefix + "range"]
+        return DistributionSketch(
+            edges,
+            histogram=FixedHistogram(
+                edges, arrays[prefix + "counts"], flows[0], flows[1]
+            ),
+            quantiles=QuantileSketch(
+                compression,
+                arrays[prefix + "means"],
+                arrays[prefix + "weights"],
+                extent[0],
+                extent[1],
+            ),
+        )
+
+
+class SketchStore:
+    """
+    Per-period (default daily) DistributionSketches of one series, persisted to .npz.
+
+    update() only sketches periods that are not already stored, plus the most recent
+    stored period, which may have been incomplete when it was last sketched.
+
+    The file records the key (e.g. derivative and series name), freq, edges and
+    compression it was built with. Stored sketches that do not match are discarded and
+    re-sketched rather than merged. If edges is None they are taken from the stored file,
+    or spread around the range of the first data sketched.
+    """
+
+    def __init__(
+        self, edges=None, compression=500, freq="D", path=None, key=None, bins=200
+    ):
+        self.edges = None if edges is None else np.asarray(edges, dtype=float)
+        self.compression = compression
+        self.freq = freq
+        self.key = "" if key is None else str(key)
+        self.bins = bins
+        if path is not None and not str(path).endswith(".npz"):
+            path = f"{path}.npz"
+        self.path = path
+        self.sketches = {}
+        if path is not None:
+            self.load()
+
+    def _matches(self, arrays):
+        return (
+            str(arrays["key"]) == self.key
+            and str(arrays["freq"]) == self.freq
+            and arrays["compression"] == self.compression
+            and (self.edges is None or np.array_equal(arrays["edges"], self.edges))
+        )
+
+    def load(self):
+        try:
+            arrays = np.load(self.path, allow_pickle=False)
+        except FileNotFoundError:
+            return self
+        with arrays:
+            if not self._matches(arrays):
+                return self
+            self.edges = arrays["edges"]
+            for key in arrays["periods"]:
+                period = pd.Timestamp(str(key))
+                self.sketches[period] = DistributionSketch.fromArrays(
+                    arrays, self.edges, self.compression, prefix=f"{key}_"
+                )
+        return self
+
+    def save(self):
+        arrays = {
+            "key": np.array(self.key),
+            "freq": np.array(self.freq),
+            "edges": self.edges,
+            "compression": np.array(self.compression),
+            "periods": np.array([p.isoformat() for p in self.sketches]),
+        }
+        for period, sketch in self.sketches.items():
+            arrays.update(sketch.toArrays(prefix=f"{period.isoformat()}_"))
+        # Write to a temporary file and rename it into place, so concurrent readers and
+        # writers only ever see a complete store
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(temp, self.path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        return self
+
+    def _defaultEdges(self, values):
+        low, high = values.min(), values.max()
+        margin = (high - low) / 2 or max(abs(low), 1) * 0.05
+        return np.linspace(low - margin, high + margin, self.bins + 1)
+
+    def update(self, series):
+        series = series.dropna().sort_index()
+        periods = series.index.floor(self.freq)
+        latest = max(self.sketches) if self.sketches else None
+        pending = ~periods.isin(list(self.sketches))
+        if latest is not None:
+            pending |= periods == latest
+        if pending.any():
+            values = series.values[pending]
+            if self.edges is None:
+                self.edges = self._defaultEdges(values)
+            keys = periods[pending]
+            bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                self.sketches[keys[start]] = DistributionSketch(
+                    self.edges, self.compression
+                ).update(values[start:end])
+            if self.path is not None:
+                self.save()
+        return self
+
+    def summary(self, start=None, end=None):
+        """
+        Merge the stored sketches for periods between start and end (inclusive).
+        """
+        selected = [
+            sketch
+            for period, sketch in self.sketches.items()
+            if (start is None or period >= pd.Timestamp(start))
+            and (end is None or period <= pd.Timestamp(end))
+        ]
+        return DistributionSketch(self.edges, self.compression).merge(*selected)
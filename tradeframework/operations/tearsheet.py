@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+from scipy import stats as scipy_stats
+from tradeframework.operations.rolling import prefixSum, windowSum, windowBounds
+
+# Returns tear sheet (the core panels of pyfolio's returns tear sheet) computed with
+# vectorised numpy: cumulative returns, rolling performance, drawdowns and their episodes,
+# monthly and annual returns, and return quantiles. Returns are simple period returns;
+# functions taking arrays work down axis 0, so a matrix of return series can be processed
+# at once.
+
+
+def wealth(returns):
+    """
+    Growth of 1 invested at the start: cumprod(1 + returns).
+    """
+    return np.cumprod(1 + np.nan_to_num(np.asarray(returns, dtype=float)), axis=0)
+
+
+def underwater(returns):
+    """
+    Drawdown from the running peak of wealth (0 at new highs, negative below).
+    """
+    value = wealth(returns)
+    return value / np.maximum.accumulate(value, axis=0) - 1
+
+
+def drawdownEpisodes(drawdown):
+    """
+    Episodes (runs) below zero of a drawdown series, or of every column of a time x
+    series matrix, by run length encoding.
+
+    Returns (column, start, valley, end, depth) with bar positions: the first bar under
+    water, the deepest bar, the first bar recovered (len(drawdown) if not recovered) and
+    the depth. Episodes are ordered by column, then start.
+    """
+    drawdown = np.asarray(drawdown, dtype=float)
+    if drawdown.ndim == 1:
+        drawdown = drawdown[:, None]
+    n = len(drawdown)
+    # Columns laid end to end, each followed by a 0 so no run crosses into the next
+    flat = np.zeros((drawdown.shape[1], n + 1))
+    flat[:, :n] = drawdown.T
+    flat = flat.ravel()
+
+    below = flat < 0
+    edges = np.diff(np.concatenate([[False], below]).astype(np.int8))
+    start = np.flatnonzero(edges == 1)
+    end = np.flatnonzero(edges == -1)
+    if not len(start):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, np.empty(0)
+    depth = np.minimum.reduceat(flat, start)
+    # Deepest bar of each run: the first bar under water at its run's depth
+    positions = np.flatnonzero(below)
+    run = np.repeat(np.arange(len(start)), end - start)
+    deepest = flat[positions] == depth[run]
+    positions, run = positions[deepest], run[deepest]
+    valley = positions[np.concatenate([[True], run[1:] != run[:-1]])]
+
+    column = start // (n + 1)
+    offset = column * (n + 1)
+    return column, start - offset, valley - offset, end - offset, depth
+
+
+def _duration(start, end, n):
+    # Bars from the peak (the bar before the first under water) to the recovery, both
+    # included, or to the last bar if not recovered
+    return np.minimum(end, n - 1) - start + 2
+
+
+def _episodeTable(index, start, valley, end, depth):
+    # Peak, valley and recovery dates of drawdown episodes (no recovery date if not
+    # recovered), net drawdown (%) and duration in bars from peak to recovery
+    recovered = end < len(index)
+    return pd.DataFrame(
+        {
+            "peak": index[np.clip(start - 1, 0, None)],
+            "valley": index[valley],
+            "recovery": pd.Series(index[np.clip(end, None, len(index) - 1)]).where(
+                recovered
+            ),
+            "net_drawdown": -depth * 100,
+            "duration": _duration(start, end, len(index)),
+        }
+    )
+
+
+def drawdownPeriods(returns, top=5):
+    """
+    The top worst drawdown episodes of a returns series: peak, valley and recovery dates,
+    net drawdown (%) and duration in bars. Unrecovered episodes have no recovery date.
+    """
+    _, start, valley, end, depth = drawdownEpisodes(underwater(returns.values))
+    order = np.argsort(depth, kind="stable")[:top]
+    return _episodeTable(
+        returns.index, start[order], valley[order], end[order], depth[order]
+    )
+
+
+def drawdownAnalysis(returns, top=5):
+    """
+    Drawdowns of every column of a (time x strategy) returns DataFrame in one pass.
+
+    Returns (summary, episodes, underwater):
+        summary     per strategy: max drawdown, longest drawdown and the time to recover
+                    from the max drawdown (bars, NaN if not recovered), current drawdown
+                    and the number of episodes, ordered from the smallest max drawdown
+        episodes    the top worst episodes of each strategy (as drawdownPeriods)
+        underwater  the drawdown curves
+    """
+    n = len(returns)
+    drawdown = underwater(returns.values)
+    column, start, valley, end, depth = drawdownEpisodes(drawdown)
+    duration = _duration(start, end, n)
+
+    # Rank episodes within each strategy, worst first
+    order = np.lexsort((depth, column))
+    first = np.searchsorted(column[order], column[order])
+    rank = np.arange(len(order)) - first
+    worst = order[rank == 0]
+
+    strategies = returns.columns
+    longest = np.zeros(len(strategies), dtype=np.int64)
+    np.maximum.at(longest, column, duration)
+    recovery = np.full(len(strategies), np.nan)
+    recovered = end[worst] < n
+    recovery[column[worst][recovered]] = (end[worst] - valley[worst])[recovered]
+    summary = pd.DataFrame(
+        {
+            "max_drawdown": drawdown.min(axis=0, initial=0),
+            "max_duration": longest,
+            "recovery": recovery,
+            "current_drawdown": drawdown[-1] if n else np.zeros(len(strategies)),
+            "episodes": np.bincount(column, minlength=len(strategies)),
+        },
+        index=strategies,
+    )
+    summary = summary.sort_values("max_drawdown", ascending=False, kind="stable")
+
+    keep = order[rank < top]
+    episodes = _episodeTable(
+        returns.index, start[keep], valley[keep], end[keep], depth[keep]
+    )
+    episodes.insert(0, "strategy", strategies[column[keep]])
+    episodes.insert(1, "rank", rank[rank < top] + 1)
+    return (
+        summary,
+        episodes,
+        pd.DataFrame(drawdown, index=returns.index, columns=strategies),
+    )
+
+
+def _rollingMoments(returns, window):
+    # Mean and standard deviation (ddof=1) of the window ending at each bar
+    r = np.asarray(returns, dtype=float)
+    start, end, valid = windowBounds(len(r), window)
+    m = end - start
+    s1 = windowSum(prefixSum(r), end, start)
+    s2 = windowSum(prefixSum(r**2), end, start)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / m
+        std = np.sqrt(np.clip(s2 - s1 * mean, 0, None) / (m - 1))
+    mean[~valid] = np.nan
+    std[~valid] = np.nan
+    return mean, std
+
+
+def rollingVolatility(returns, window=126, periods=252):
+    """
+    Annualised volatility of the window ending at each bar.
+    """
+    _, std = _rollingMoments(returns, window)
+    return std * np.sqrt(periods)
+
+
+def rollingSharpe(returns, window=126, periods=252):
+    """
+    Annualised Sharpe ratio (mean / std) of the window ending at each bar.
+    """
+    mean, std = _rollingMoments(returns, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return mean / std * np.sqrt(periods)
+
+
+def rollingPerformance(returns, windows=(20, 60, 252), periods=252):
+    """
+    Rolling performance of a returns series (or a time x series matrix) for several window
+    lengths at once: annualised mean, volatility, downside deviation (below 0), Sharpe
+    and Sortino ratios. The prefix sums are built once and shared by every window; as
+    pandas rolling, windows holding missing values are NaN.
+
+    Returns a DataFrame with (window, metric) columns, or (series, window, metric) columns
+    for a DataFrame of series.
+    """
+    frame = returns if isinstance(returns, pd.DataFrame) else returns.to_frame()
+    r = np.asarray(frame.values, dtype=float)
+    present = ~np.isnan(r)
+    r = np.where(present, r, 0)
+    # Count, sum, sum of squares and downside sum of squares, in one prefix array
+    prefix = prefixSum(np.stack([present, r, r**2, np.minimum(r, 0) ** 2], axis=1))
+
+    metrics = ["mean", "volatility", "downside", "sharpe", "sortino"]
+    result = np.empty((len(windows), len(metrics)) + r.shape)
+    for w, window in enumerate(windows):
+        start, end, _ = windowBounds(len(r), window)
+        count, s1, s2, sd = np.moveaxis(windowSum(prefix, end, start), 1, 0)
+        mean, volatility, downside, sharpe, sortino = result[w]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(s1, count, out=mean)
+            np.sqrt(np.clip(s2 - s1 * mean, 0, None) / (count - 1), out=volatility)
+            np.sqrt(sd / count, out=downside)
+            np.divide(mean, volatility, out=sharpe)
+            np.divide(mean, downside, out=sortino)
+        mean *= periods
+        result[w, 1:] *= np.sqrt(periods)
+        result[w, :, count < window] = np.nan
+
+    columns = pd.MultiIndex.from_product([frame.columns, windows, metrics])
+    result = pd.DataFrame(
+        np.moveaxis(result, (0, 1), (2, 3)).reshape(len(r), -1),
+        index=frame.index,
+        columns=columns,
+    )
+    if not isinstance(returns, pd.DataFrame):
+        result = result.droplevel(0, axis=1)
+    return result
+
+
+def periodTable(returns):
+    """
+    Compounded monthly returns as a (year x month) table, and annual returns.
+    """
+    growth = np.log1p(returns)
+    monthly = np.expm1(growth.groupby([returns.index.year, returns.index.month]).sum())
+    monthly.index.names = ["year", "month"]
+    annual = np.expm1(growth.groupby(returns.index.year).sum())
+    annual.index.name = "year"
+    return monthly.unstack("month"), annual
+
+
+def returnQuantiles(returns, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """
+    Quantiles of daily, weekly and monthly compounded returns.
+    """
+    growth = np.log1p(returns)
+    frequencies = {
+        "daily": returns,
+        "weekly": np.expm1(growth.groupby(returns.index.to_period("W")).sum()),
+        "monthly": np.expm1(growth.groupby(returns.index.to_period("M")).sum()),
+    }
+    return pd.DataFrame(
+        {name: r.quantile(list(quantiles)) for name, r in frequencies.items()}
+    )
+
+
+def performanceStats(returns, periods=252):
+    """
+    Summary statistics of a returns series, with the definitions of pyfolio's
+    perf_stats: skew and excess kurtosis are the (biased) sample moments, stability is the
+    R^2 of cumulative log returns against time and the daily value at risk is Gaussian,
+    mean - 2 * std.
+    """
+    r = returns.dropna().values
+    drawdown = underwater(r)
+    years = len(r) / periods
+    total = np.prod(1 + r) - 1
+    annual = (1 + total) ** (1 / years) - 1 if years > 0 else np.nan
+    volatility = np.std(r, ddof=1) * np.sqrt(periods)
+    downside = np.sqrt(np.mean(np.minimum(r, 0) ** 2)) * np.sqrt(periods)
+    maxDrawdown = drawdown.min() if len(drawdown) else np.nan
+    gains, losses = r[r > 0].sum(), -r[r < 0].sum()
+    stability = (
+        scipy_stats.linregress(np.arange(len(r)), np.cumsum(np.log1p(r))).rvalue ** 2
+        if len(r) > 1
+        else np.nan
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "annual_return": annual,
+            "cumulative_returns": total,
+            "annual_volatility": volatility,
+            "sharpe_ratio": np.mean(r) / np.std(r, ddof=1) * np.sqrt(periods),
+            "calmar_ratio": annual / -maxDrawdown,
+            "stability": stability,
+            "max_drawdown": maxDrawdown,
+            "omega_ratio": gains / losses,
+            "sortino_ratio": np.mean(r) * periods / downside,
+            "skew": scipy_stats.skew(r),
+            "kurtosis": scipy_stats.kurtosis(r),
+            "tail_ratio": np.abs(np.percentile(r, 95)) / np.abs(np.percentile(r, 5)),
+            "daily_value_at_risk": np.mean(r) - 2 * np.std(r, ddof=1),
+        }
+
+
+def tearSheet(returns, window=126, periods=252, top=5):
+    """
+    All the panels of the tear sheet for a returns series, as structured data.
+    """
+    returns = returns.dropna()
+    mean, std = _rollingMoments(returns.values, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = mean / std * np.sqrt(periods)
+    monthly, annual = periodTable(returns)
+    return {
+        "stats": performanceStats(returns, periods),
+        "cumulative": pd.Series(wealth(returns.values) - 1, index=returns.index),
+        "rolling": pd.DataFrame(
+            {"volatility": std * np.sqrt(periods), "sharpe": sharpe},
+            index=returns.index,
+        ),
+        "underwater": pd.Series(underwater(returns.values), index=returns.index),
+        "drawdowns": drawdownPeriods(returns, top),
+        "monthly": monthly,
+        "annual": annual,
+        "quantiles": returnQuantiles(returns),
+    }
@@ -0,0 +1,56 @@
+import types
+import pandas as pd
+
+# Lightweight read-only views of a derivative or asset, used to keep latency-sensitive
+# generators independent of the length of the history.
+
+
+class TailView:
+    """
+    View of the last `bars` bars of a derivative or asset.
+
+    Time-indexed pandas attributes (returns, values, weights) are sliced to the tail on
+    first access; weighted assets are wrapped in TailViews of the same length. All other
+    attributes are delegated to the wrapped object, and its methods are bound to the view
+    so that they read the tail too.
+    """
+
+    SERIES = ("returns", "values", "weights")
+
+    def __init__(self, asset, bars):
+        self._asset = asset
+        self._bars = bars
+        self._cache = {}
+
+    def __getattr__(self, name):
+        if name in self._cache:
+            return self._cache[name]
+        value = getattr(self._asset, name)
+        if name in TailView.SERIES and isinstance(value, (pd.DataFrame, pd.Series)):
+            value = value.iloc[-self._bars :]
+        elif name == "weightedAssets":
+            value = tailViews(value, self._bars)
+        elif isinstance(value, types.MethodType) and value.__self__ is self._asset:
+            return types.MethodType(value.__func__, self)
+        else:
+            return value
+        self._cache[name] = value
+        return value
+
+
+def tailViews(assets, bars):
+    """
+    TailViews of several assets. Assets sharing the same pandas objects share one slice.
+    """
+    slices = {}
+    views = []
+    for asset in assets:
+        view = TailView(asset, bars)
+        for name in TailView.SERIES:
+            value = getattr(asset, name, None)
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                if id(value) not in slices:
+                    slices[id(value)] = value.iloc[-bars:]
+                view._cache[name] = slices[id(value)]
+        views.append(view)
+    return views